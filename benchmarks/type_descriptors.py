@@ -0,0 +1,119 @@
+"""Benchmark the prompt-token footprint of the type descriptors.
+
+Run with:
+
+    python -m benchmarks.type_descriptors
+
+Tokens are counted with tiktoken (cl100k_base) when it is installed, and
+estimated from the number of characters otherwise.
+"""
+import enum
+from typing import Callable, Dict, List, Optional
+
+from pydantic import BaseModel, Field
+
+from kor import (
+    JSONEncoder,
+    Number,
+    Object,
+    Option,
+    Selection,
+    Text,
+    from_pydantic,
+)
+from kor.prompts import create_langchain_prompt
+from kor.tokens import estimate_num_tokens
+from kor.type_descriptors import (
+    BulletPointDescriptor,
+    CompactDescriptor,
+    TypeDescriptor,
+    TypeScriptDescriptor,
+)
+
+
+def _get_token_counter() -> Callable[[str], int]:
+    """Get a token counter."""
+    try:
+        import tiktoken
+    except ImportError:
+        return estimate_num_tokens
+    encoding = tiktoken.get_encoding("cl100k_base")
+    return lambda text: len(encoding.encode(text))
+
+
+class Country(enum.Enum):
+    US = "us"
+    FR = "fr"
+    DE = "de"
+
+
+class Address(BaseModel):
+    street: str
+    city: str
+    zip_code: Optional[str] = None
+    country: Country
+
+
+class Order(BaseModel):
+    order_id: str = Field(description="The identifier of the order")
+    customer_name: str
+    billing_address: Address
+    shipping_address: Address
+    items: List[str] = Field(description="Names of the purchased products")
+    total: float = Field(description="Total amount, taxes included")
+    gift: bool = False
+
+
+def _make_schemas() -> Dict[str, Object]:
+    """Make representative schemas."""
+    flat = Object(
+        id="person",
+        description="Personal information",
+        many=True,
+        attributes=[
+            Text(id="first_name", description="The first name of the person"),
+            Text(id="last_name", description="The last name of the person"),
+            Number(id="age", description="The age of the person in years"),
+            Selection(
+                id="gender",
+                options=[Option(id="female"), Option(id="male"), Option(id="other")],
+            ),
+        ],
+        examples=[("Alice is 30", [{"first_name": "Alice", "age": 30}])],
+    )
+    wide = Object(
+        id="product",
+        description="Product sheet",
+        attributes=[
+            Text(id=f"attribute_{idx}", description=f"Specification number {idx}")
+            for idx in range(40)
+        ],
+    )
+    order, _ = from_pydantic(Order, many=True)
+    return {"flat": flat, "wide": wide, "nested (pydantic)": order}
+
+
+def main() -> None:
+    """Print the number of tokens per schema and descriptor."""
+    count_tokens = _get_token_counter()
+    descriptors: Dict[str, TypeDescriptor] = {
+        "typescript": TypeScriptDescriptor(),
+        "bullet_point": BulletPointDescriptor(),
+        "compact": CompactDescriptor(),
+    }
+    header = f"{'schema':<20}{'descriptor':<14}{'description':>12}{'prompt':>8}"
+    rows: List[str] = [header, "-" * len(header)]
+    for schema_name, schema in _make_schemas().items():
+        for descriptor_name, descriptor in descriptors.items():
+            prompt = create_langchain_prompt(schema, JSONEncoder(), descriptor)
+            description_tokens = count_tokens(descriptor.describe(schema))
+            prompt_tokens = count_tokens(prompt.format_prompt("").to_string())
+            rows.append(
+                f"{schema_name:<20}{descriptor_name:<14}"
+                f"{description_tokens:>12}{prompt_tokens:>8}"
+            )
+    print("\n".join(rows))
+
+
+if __name__ == "__main__":
+    main()
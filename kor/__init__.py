@@ -5,10 +5,13 @@ from .extraction import (
     Extraction,
     create_extraction_chain,
     extract_from_documents,
+    extract_from_documents_iter,
+    extract_from_documents_sync,
 )
 from .nodes import Bool, Number, Object, Option, Selection, Text
 from .type_descriptors import (
     BulletPointDescriptor,
+    CompactDescriptor,
     TypeDescriptor,
     TypeScriptDescriptor,
 )
@@ -16,6 +19,7 @@ from .version import __version__
 
 __all__ = (
     "BulletPointDescriptor",
+    "CompactDescriptor",
     "create_extraction_chain",
     "CSVEncoder",
     "DocumentExtraction",
@@ -31,6 +35,8 @@ __all__ = (
     "TypeDescriptor",
     "TypeScriptDescriptor",
     "extract_from_documents",
+    "extract_from_documents_iter",
+    "extract_from_documents_sync",
     "__version__",
     "XMLEncoder",
 )
@@ -1,9 +1,13 @@
 """Adapters to convert from validation frameworks to Kor internal representation."""
 import enum
+import threading
+import types
+from collections import OrderedDict
 from typing import (
     Any,
-    Dict,
+    Hashable,
     List,
+    Mapping,
     Optional,
     Sequence,
     Tuple,
@@ -25,52 +29,74 @@ from .validators import PydanticValidator, Validator
 # Not worth the effort, until it's clear that folks are using this functionality.
 PRIMITIVE_TYPES = {str, float, int, type(None)}
 
+# Origins of Union annotations, including the `X | Y` syntax.
+_UNION_TYPES = (Union, getattr(types, "UnionType", Union))
 
-def _is_many(annotation: Any) -> bool:
-    """Determine if the given annotation should map to field many.
+# Translations of from_pydantic, by model class and arguments.
+_CACHE_SIZE = 512
+_cache: "OrderedDict[Hashable, Tuple[Object, Validator]]" = OrderedDict()
+_cache_lock = threading.Lock()
 
-    Map to field many if the annotation is a list or a Union where at least one
-    of the arguments is a list type.
+
+def _is_list(origin: Any) -> bool:
+    """Determine if the origin of an annotation is a list type."""
+    return isinstance(origin, type) and issubclass(origin, List)
+
+
+def _unwrap_annotation(annotation: Any) -> Tuple[Any, bool]:
+    """Unwrap optional and list annotations in a single pass.
+
+    E.g., Optional[List[Model]] -> (Model, True), List[Optional[str]] -> (str, True)
 
     Args:
-        annotation: The annotation to check.
+        annotation: The annotation to unwrap.
 
     Returns:
-        bool
+        Tuple[Any, bool]; the inner annotation (a type, a Union of several types or
+        an unsupported generic) and whether it maps to field many
     """
-    origin = get_origin(annotation)
-    if origin is Union:
-        for arg in get_args(annotation):
-            arg_origin = get_origin(arg)
-            if isinstance(arg_origin, type) and issubclass(arg_origin, List):
-                return True
-    if isinstance(origin, type) and issubclass(origin, List):
-        return True
-    return False
+    many = False
+    while True:
+        origin = get_origin(annotation)
+        if origin in _UNION_TYPES:
+            args = [arg for arg in get_args(annotation) if arg is not type(None)]
+            if len(args) == 1:  # Equivalent to an Optional
+                annotation = args[0]
+                continue
+            many = many or any(_is_list(get_origin(arg)) for arg in args)
+            return annotation, many
+        if _is_list(origin):
+            many = True
+            list_args = get_args(annotation)
+            annotation = list_args[0] if list_args else str
+            continue
+        return annotation, many
 
 
-def _unpack_if_optional_equivalent(annotation: Any) -> Tuple[bool, Any]:
-    """Determine if type is equivalent to an Optional and if so return the inner type.
+def _is_many(annotation: Any) -> bool:
+    """Determine if the given annotation should map to field many.
+
+    Map to field many if the annotation is a list or a Union where at least one
+    of the arguments is a list type.
 
     Args:
         annotation: The annotation to check.
 
     Returns:
-        Tuple[bool, Any]; e.g., Optional[str] -> (True, str)
+        bool
     """
-    origin = get_origin(annotation)
-    if origin is Union:
-        args = get_args(annotation)
-        if len(args) == 2 and type(None) in args:
-            if args[0] is type(None):
-                return True, args[1]
-            else:
-                return True, args[0]
+    return _unwrap_annotation(annotation)[1]
 
-    if origin is Optional:
-        return True, get_args(annotation)[0]
 
-    return False, None
+def _freeze(value: Any) -> Hashable:
+    """Convert a value to a hashable equivalent, used for cache keys."""
+    if isinstance(value, Mapping):
+        return tuple(sorted((key, _freeze(item)) for key, item in value.items()))
+    if isinstance(value, (list, tuple)):
+        return tuple(_freeze(item) for item in value)
+    if isinstance(value, (set, frozenset)):
+        return frozenset(_freeze(item) for item in value)
+    return value
 
 
 def _translate_pydantic_to_kor(
@@ -78,7 +104,9 @@ def _translate_pydantic_to_kor(
     *,
     name: Optional[str] = None,
     description: str = "",
-    examples: Sequence[Tuple[str, Dict[str, Any]]] = tuple(),
+    examples: Sequence[
+        Tuple[str, Union[Sequence[Mapping[str, Any]], Mapping[str, Any]]]
+    ] = tuple(),
     many: bool = False,
 ) -> Object:
     """Convert a pydantic model to Kor internal representation.
@@ -115,17 +143,13 @@ def _translate_pydantic_to_kor(
             field_examples = field.examples or tuple()  # type: ignore[attr-defined]
             field_description = getattr(field, "description") or ""
 
-        field_many = _is_many(type_)
+        type_to_use, field_many = _unwrap_annotation(type_)
 
         attribute: Union[ExtractionSchemaNode, Selection, "Object"]
 
-        is_optional_equivalent, unpacked_optional = _unpack_if_optional_equivalent(
-            type_
-        )
-
-        if get_origin(type_) is Union and not is_optional_equivalent:
+        if get_origin(type_to_use) in _UNION_TYPES:
             # Verify that all arguments are primitive types
-            args = get_args(type_)
+            args = get_args(type_to_use)
 
             if not all(arg in PRIMITIVE_TYPES for arg in args):
                 raise NotImplementedError(
@@ -139,57 +163,47 @@ def _translate_pydantic_to_kor(
                 description=field_description,
                 many=field_many,
             )
+        elif not isinstance(type_to_use, type):  # e.g., Dict[str, int]
+            raise NotImplementedError(f"Unsupported type: {type_to_use}")
+        elif issubclass(type_to_use, BaseModel):
+            attribute = _translate_pydantic_to_kor(
+                type_to_use,
+                description=field_description,
+                examples=field_examples,
+                many=field_many,
+                name=field_name,
+            )
+        # Precedence matters here since bool is a subclass of int
+        elif issubclass(type_to_use, bool):
+            attribute = Bool(
+                id=field_name,
+                examples=field_examples,
+                description=field_description,
+                many=field_many,
+            )
+        elif issubclass(type_to_use, (int, float)):
+            attribute = Number(
+                id=field_name,
+                examples=field_examples,
+                description=field_description,
+                many=field_many,
+            )
+        elif issubclass(type_to_use, enum.Enum):
+            enum_choices = list(type_to_use)
+            attribute = Selection(
+                id=field_name,
+                description=field_description,
+                many=field_many,
+                examples=field_examples,
+                options=[Option(id=choice.value) for choice in enum_choices],
+            )
         else:
-            # If the type is an Optional or Union equivalent, use the inner type
-            type_to_use = unpacked_optional if is_optional_equivalent else type_
-
-            # If the type is a parameterized generic, we want to extract
-            # the inner type; e.g., List[str] -> str
-            if not isinstance(type_to_use, type):  # i.e., parameterized generic
-                origin_ = get_origin(type_to_use)
-                if not isinstance(origin_, type) or not issubclass(origin_, List):
-                    raise NotImplementedError(f"Unsupported type: {type_to_use}")
-                type_to_use = get_args(type_to_use)[0]  # extract the argument
-
-            if issubclass(type_to_use, BaseModel):
-                attribute = _translate_pydantic_to_kor(
-                    type_to_use,
-                    description=field_description,
-                    examples=field_examples,
-                    many=field_many,
-                    name=field_name,
-                )
-            # Precedence matters here since bool is a subclass of int
-            elif issubclass(type_to_use, bool):
-                attribute = Bool(
-                    id=field_name,
-                    examples=field_examples,
-                    description=field_description,
-                    many=field_many,
-                )
-            elif issubclass(type_to_use, (int, float)):
-                attribute = Number(
-                    id=field_name,
-                    examples=field_examples,
-                    description=field_description,
-                    many=field_many,
-                )
-            elif issubclass(type_to_use, enum.Enum):
-                enum_choices = list(type_to_use)
-                attribute = Selection(
-                    id=field_name,
-                    description=field_description,
-                    many=field_many,
-                    examples=field_examples,
-                    options=[Option(id=choice.value) for choice in enum_choices],
-                )
-            else:
-                attribute = Text(
-                    id=field_name,
-                    examples=field_examples,
-                    description=field_description,
-                    many=field_many,
-                )
+            attribute = Text(
+                id=field_name,
+                examples=field_examples,
+                description=field_description,
+                many=field_many,
+            )
 
         attributes.append(attribute)
 
@@ -209,11 +223,18 @@ def from_pydantic(
     model_class: Type[BaseModel],
     *,
     description: str = "",
-    examples: Sequence[Tuple[str, Dict[str, Any]]] = tuple(),
+    examples: Sequence[
+        Tuple[str, Union[Sequence[Mapping[str, Any]], Mapping[str, Any]]]
+    ] = tuple(),
     many: bool = False,
 ) -> Tuple[Object, Validator]:
     """Convert a pydantic model to Kor internal representation.
 
+    Translations are cached by model class and arguments, so repeated calls
+    return the same schema and validator objects. They are shared by all the
+    callers and must not be modified: use `copy.deepcopy` on the schema to
+    modify it.
+
     Args:
         model_class: The pydantic model class to convert.
         description: The description of the model.
@@ -223,6 +244,19 @@ def from_pydantic(
     Returns:
         A tuple of the Kor internal representation of the model and a validator.
     """
+    key: Optional[Hashable] = (model_class, description, _freeze(examples), many)
+    try:
+        hash(key)
+    except TypeError:  # Examples with values that cannot be hashed
+        key = None
+
+    if key is not None:
+        with _cache_lock:
+            cached = _cache.get(key)
+            if cached is not None:
+                _cache.move_to_end(key)
+                return cached
+
     schema = _translate_pydantic_to_kor(
         model_class,
         description=description,
@@ -230,4 +264,15 @@ def from_pydantic(
         many=many,
     )
     validator = PydanticValidator(model_class, schema.many)
+    if key is not None:
+        with _cache_lock:
+            _cache[key] = (schema, validator)
+            if len(_cache) > _CACHE_SIZE:
+                _cache.popitem(last=False)
     return schema, validator
+
+
+def clear_from_pydantic_cache() -> None:
+    """Clear the cache of `from_pydantic`, e.g., after redefining models."""
+    with _cache_lock:
+        _cache.clear()
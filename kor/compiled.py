@@ -0,0 +1,518 @@
+"""Compiled, immutable representation of a schema.
+
+Schema nodes are mutable pydantic models that are walked with visitors every
+time a prompt is described, examples are aggregated or data is encoded. A
+schema can instead be compiled once into a frozen structure that precomputes
+what these steps need:
+
+* an index from the path of ids of every node to the node
+* the order of the fields of objects, and whether each node is a list
+* the option ids of selections
+* the aggregated examples
+* a stable content hash (the fingerprint)
+* optionally, short aliases for the ids of attributes
+
+With aliases (`compile_schema(node, use_aliases=True)`), attributes get short
+ids (`a1`, `a2`, ...) that are used in the type description, in the examples
+and by the model in its output, instead of ids like
+`customer_billing_address_line_1` which cost tokens in every example and in
+every extracted record. The original id is moved to the description of the node
+so the model still knows what to extract, and `from_aliases` restores the
+original ids in the output.
+
+Options of selections keep their ids: they are values that the model picks by
+meaning, and type descriptors do not render the descriptions of options.
+
+The fingerprint only depends on the content of the schema (types, ids,
+descriptions, examples...) so it can be used as the key of caches for
+prompts, results and validators.
+
+The compiled schema holds a deep copy of the node, so changes made to the node
+after compilation are not reflected.
+"""
+from __future__ import annotations
+
+import copy
+import hashlib
+import json
+import threading
+from collections import OrderedDict
+from types import MappingProxyType
+from typing import Any, Dict, Mapping, Optional, Sequence, Set, Tuple, Union
+
+from kor.examples import generate_examples
+from kor.nodes import AbstractSchemaNode, Object, Selection
+from kor.serialization import (
+    schema_from_bytes,
+    schema_from_dict,
+    schema_from_json,
+    schema_to_dict,
+)
+
+Path = Tuple[str, ...]
+
+ALIAS_PREFIX = "a"
+
+
+class _Frozen:
+    """Base class for objects whose attributes cannot be changed."""
+
+    __slots__ = ()
+
+    def __setattr__(self, name: str, value: Any) -> None:
+        """Forbid setting attributes."""
+        raise AttributeError(f"{type(self).__name__} is immutable")
+
+    def __delattr__(self, name: str) -> None:
+        """Forbid deleting attributes."""
+        raise AttributeError(f"{type(self).__name__} is immutable")
+
+
+def _collect_ids(node: AbstractSchemaNode, ids: Set[str]) -> None:
+    """Collect the ids of all the nodes and options of a schema."""
+    ids.add(node.id)
+    if isinstance(node, Object):
+        for attribute in node.attributes:
+            _collect_ids(attribute, ids)
+    elif isinstance(node, Selection):
+        ids.update(option.id for option in node.options)
+
+
+def _assign_aliases(node: Object) -> Dict[Path, str]:
+    """Assign short aliases to the attributes of a schema.
+
+    Aliases are keyed by the path of the node. Ids that are not longer than their
+    alias keep their id, and aliases never collide with an id (or an option id)
+    of the schema.
+    """
+    taken: Set[str] = set()
+    _collect_ids(node, taken)
+    aliases: Dict[Path, str] = {}
+    counter = 0
+
+    def _next_alias(current_id: str) -> str:
+        nonlocal counter
+        while True:
+            counter += 1
+            alias = f"{ALIAS_PREFIX}{counter}"
+            if alias not in taken:
+                break
+        if len(alias) >= len(current_id):
+            counter -= 1
+            return current_id
+        return alias
+
+    def _visit(current: AbstractSchemaNode, path: Path) -> None:
+        if isinstance(current, Object):
+            for attribute in current.attributes:
+                attribute_path = path + (attribute.id,)
+                aliases[attribute_path] = _next_alias(attribute.id)
+                _visit(attribute, attribute_path)
+
+    _visit(node, (node.id,))
+    return aliases
+
+
+def _describe_alias(node_id: str, description: str) -> str:
+    """Keep the original id of an aliased node in its description."""
+    return f"{node_id}: {description}" if description else node_id
+
+
+def _remap(compiled_node: CompiledNode, value: Any, to_alias: bool) -> Any:
+    """Rename the keys of data between ids and aliases."""
+    if isinstance(value, list):
+        return [_remap(compiled_node, item, to_alias) for item in value]
+    if compiled_node.kind == "Object":
+        if not isinstance(value, Mapping):
+            return value
+        lookup = (
+            compiled_node._attributes_by_id
+            if to_alias
+            else compiled_node._attributes_by_alias
+        )
+        remapped = {}
+        for key, item in value.items():
+            attribute = lookup.get(key)
+            if attribute is None:
+                remapped[key] = item
+            else:
+                new_key = attribute.alias if to_alias else attribute.id
+                remapped[new_key] = _remap(attribute, item, to_alias)
+        return remapped
+    return value
+
+
+def _alias_node(compiled_node: CompiledNode) -> AbstractSchemaNode:
+    """Make a copy of a node that uses the aliases as ids."""
+    node = compiled_node.node
+    aliased = copy.copy(node)
+    aliased.id = compiled_node.alias
+    if compiled_node.alias != compiled_node.id:
+        aliased.description = _describe_alias(node.id, node.description)
+    if isinstance(aliased, Object):
+        aliased.examples = [
+            (text, _remap(compiled_node, output, to_alias=True))
+            for text, output in aliased.examples
+        ]
+    if isinstance(aliased, Object):
+        aliased.attributes = [
+            _alias_node(attribute)  # type: ignore[misc]
+            for attribute in compiled_node.attributes
+        ]
+    return aliased
+
+
+def _load_compiled_schema(node: Object, use_aliases: bool) -> CompiledSchema:
+    """Compile a schema again when unpickling."""
+    return CompiledSchema(node, use_aliases=use_aliases)
+
+
+# PUBLIC API
+
+
+def get_fingerprint(node: AbstractSchemaNode) -> str:
+    """Get a stable hash of the content of a schema.
+
+    Two schemas with the same types, ids, descriptions, options and examples have
+    the same fingerprint, across processes and runs.
+
+    Args:
+        node: the schema
+
+    Returns:
+        the hex digest of the SHA-256 of the canonical JSON form of the schema
+    """
+    canonical = json.dumps(
+        schema_to_dict(node),
+        sort_keys=True,
+        separators=(",", ":"),
+        ensure_ascii=False,
+        default=repr,
+    )
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+class CompiledNode(_Frozen):
+    """An immutable node of a compiled schema."""
+
+    __slots__ = (
+        "node",
+        "kind",
+        "id",
+        "description",
+        "many",
+        "path",
+        "attributes",
+        "attribute_ids",
+        "option_ids",
+        "alias",
+        "_attributes_by_id",
+        "_attributes_by_alias",
+    )
+
+    node: AbstractSchemaNode
+    """The schema node (a copy owned by the compiled schema)."""
+    kind: str
+    """The type of the node, e.g., "Object" or "Text"."""
+    id: str
+    description: str
+    many: bool
+    path: Path
+    """Ids of the node and of its ancestors, starting from the root."""
+    attributes: Tuple[CompiledNode, ...]
+    """Attributes of an object, in declaration order (empty for other nodes)."""
+    attribute_ids: Tuple[str, ...]
+    """Ids of the attributes of an object, in declaration order."""
+    option_ids: Optional[frozenset]
+    """Ids of the options of a selection (None for other nodes)."""
+    alias: str
+    """The id used in prompts and outputs, the id itself without aliases."""
+    _attributes_by_id: Mapping[str, CompiledNode]
+    _attributes_by_alias: Mapping[str, CompiledNode]
+
+    def __init__(
+        self,
+        node: AbstractSchemaNode,
+        path: Path,
+        aliases: Optional[Mapping[Path, str]] = None,
+    ) -> None:
+        """Compile a node and its descendants."""
+        aliases = aliases or {}
+        attributes: Tuple[CompiledNode, ...] = ()
+        if isinstance(node, Object):
+            attributes = tuple(
+                CompiledNode(attribute, path + (attribute.id,), aliases)
+                for attribute in node.attributes
+            )
+        option_ids = None
+        if isinstance(node, Selection):
+            option_ids = frozenset(option.id for option in node.options)
+
+        values: Dict[str, Any] = {
+            "node": node,
+            "kind": type(node).__name__,
+            "id": node.id,
+            "description": node.description,
+            "many": node.many,
+            "path": path,
+            "attributes": attributes,
+            "attribute_ids": tuple(attribute.id for attribute in attributes),
+            "option_ids": option_ids,
+            "alias": aliases.get(path, node.id),
+            "_attributes_by_id": MappingProxyType(
+                {attribute.id: attribute for attribute in attributes}
+            ),
+            "_attributes_by_alias": MappingProxyType(
+                {attribute.alias: attribute for attribute in attributes}
+            ),
+        }
+        for name, value in values.items():
+            object.__setattr__(self, name, value)
+
+    def __reduce__(self) -> Any:
+        """Pickle the node by compiling it again."""
+        return type(self), (self.node, self.path, self._get_aliases())
+
+    def __repr__(self) -> str:
+        """Represent the node."""
+        return f"CompiledNode(kind={self.kind!r}, path={self.path!r})"
+
+    def get_attribute(self, attribute_id: str) -> Optional[CompiledNode]:
+        """Get an attribute of an object by id."""
+        return self._attributes_by_id.get(attribute_id)
+
+    def _get_aliases(self) -> Dict[Path, str]:
+        """Get the aliases of the node and of its descendants by path."""
+        aliases = {self.path: self.alias}
+        for attribute in self.attributes:
+            aliases.update(attribute._get_aliases())
+        return aliases
+
+
+class CompiledSchema(_Frozen):
+    """An immutable, precomputed representation of a schema.
+
+    Use `compile_schema` to create one.
+    """
+
+    __slots__ = (
+        "node",
+        "root",
+        "fingerprint",
+        "index",
+        "examples",
+        "use_aliases",
+        "aliased_node",
+    )
+
+    node: Object
+    """A copy of the compiled schema, it must not be modified."""
+    root: CompiledNode
+    fingerprint: str
+    """Stable hash of the content of the schema, see `get_fingerprint`."""
+    index: Mapping[Path, CompiledNode]
+    """Every node of the schema by its path of ids."""
+    examples: Tuple[Tuple[str, Any], ...]
+    """The examples of all the nodes, aggregated for the root node.
+
+    With aliases, the examples use the aliases.
+    """
+    use_aliases: bool
+    aliased_node: Optional[Object]
+    """A copy of the schema using the aliases as ids (None without aliases)."""
+
+    def __init__(
+        self, node: Object, *, copy_node: bool = True, use_aliases: bool = False
+    ) -> None:
+        """Compile the schema, use `compile_schema` instead.
+
+        Args:
+            node: the schema
+            copy_node: whether to copy the node, only skip the copy for nodes
+                       that are not referenced anywhere else
+            use_aliases: whether to assign short aliases to attributes
+        """
+        if copy_node:
+            node = copy.deepcopy(node)
+        aliases = _assign_aliases(node) if use_aliases else None
+        root = CompiledNode(node, (node.id,), aliases)
+        index: Dict[Path, CompiledNode] = {}
+        stack = [root]
+        while stack:
+            compiled_node = stack.pop()
+            index[compiled_node.path] = compiled_node
+            stack.extend(compiled_node.attributes)
+
+        aliased_node = _alias_node(root) if use_aliases else None
+        prompt_node = aliased_node or node
+        values: Dict[str, Any] = {
+            "node": node,
+            "root": root,
+            # The prompts differ with aliases, so does the fingerprint.
+            "fingerprint": get_fingerprint(prompt_node),
+            "index": MappingProxyType(index),
+            "examples": tuple(generate_examples(prompt_node)),  # type: ignore[arg-type]
+            "use_aliases": use_aliases,
+            "aliased_node": aliased_node,
+        }
+        for name, value in values.items():
+            object.__setattr__(self, name, value)
+
+    def __reduce__(self) -> Any:
+        """Pickle the schema by compiling it again."""
+        return _load_compiled_schema, (self.node, self.use_aliases)
+
+    @property
+    def prompt_node(self) -> Object:
+        """The schema to describe in prompts, using the aliases if any."""
+        return self.aliased_node or self.node
+
+    def __repr__(self) -> str:
+        """Represent the schema."""
+        return f"CompiledSchema(id={self.root.id!r}, fingerprint={self.fingerprint!r})"
+
+    def __eq__(self, other: Any) -> bool:
+        """Compiled schemas are equal if their content is."""
+        if not isinstance(other, CompiledSchema):
+            return NotImplemented
+        return self.fingerprint == other.fingerprint
+
+    def __hash__(self) -> int:
+        """Hash on the fingerprint."""
+        return hash(self.fingerprint)
+
+    def get_node(self, path: Sequence[str]) -> Optional[CompiledNode]:
+        """Get a node by its path of ids, starting with the id of the root."""
+        return self.index.get(tuple(path))
+
+    def to_aliases(self, data: Any) -> Any:
+        """Replace the ids of attributes in data by their aliases.
+
+        Args:
+            data: data for the root node, i.e., a record or a list of records
+
+        Returns:
+            the data using aliases, unchanged without aliases
+        """
+        if not self.use_aliases:
+            return data
+        return _remap(self.root, data, to_alias=True)
+
+    def from_aliases(self, data: Any) -> Any:
+        """Restore the ids of attributes in data using aliases.
+
+        Keys that are not aliases are kept as is.
+
+        Args:
+            data: data for the root node, i.e., a record or a list of records
+
+        Returns:
+            the data using the ids of the schema, unchanged without aliases
+        """
+        if not self.use_aliases:
+            return data
+        return _remap(self.root, data, to_alias=False)
+
+
+def compile_schema(node: Object, *, use_aliases: bool = False) -> CompiledSchema:
+    """Compile a schema into an immutable representation.
+
+    Args:
+        node: the schema to compile
+        use_aliases: whether to assign short aliases (`a1`, `a2`, ...) to the
+                     attributes, see `CompiledSchema.prompt_node`
+
+    Returns:
+        the compiled schema
+
+    Examples:
+
+    .. code-block:: python
+
+        compiled = compile_schema(schema)
+        compiled.fingerprint  # stable key for caches
+        compiled.get_node(["person", "address", "city"]).many
+    """
+    if not isinstance(node, Object):
+        raise TypeError(f"Expected an Object node, got {type(node)}")
+    return CompiledSchema(node, use_aliases=use_aliases)
+
+
+class SchemaLoader:
+    """Load serialized schemas and cache the compiled schemas.
+
+    Schemas are cached by the hash of their serialized content, so loading the
+    same payload again only costs a hash. The loader is thread safe.
+
+    Examples:
+
+    .. code-block:: python
+
+        loader = SchemaLoader()
+        schemas = [loader.load(path.read_bytes()) for path in paths]
+        chain = create_extraction_chain(llm, schemas[0].node)
+    """
+
+    def __init__(self, maxsize: Optional[int] = None) -> None:
+        """Initialize the loader.
+
+        Args:
+            maxsize: maximal number of cached schemas, the least recently used
+                     ones are evicted first; unbounded by default
+        """
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._cache: OrderedDict[str, CompiledSchema] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        """Get the number of cached schemas."""
+        return len(self._cache)
+
+    def clear(self) -> None:
+        """Clear the cache."""
+        with self._lock:
+            self._cache.clear()
+
+    def load(self, data: Union[str, bytes, Mapping[str, Any]]) -> CompiledSchema:
+        """Load a schema.
+
+        Args:
+            data: the schema, serialized with `schema_to_json` (str),
+                  `schema_to_bytes` (bytes) or `schema_to_dict` (mapping)
+
+        Returns:
+            the compiled schema
+        """
+        if isinstance(data, str):
+            payload = data.encode("utf-8")
+        elif isinstance(data, bytes):
+            payload = data
+        else:
+            payload = json.dumps(data, sort_keys=True, default=repr).encode("utf-8")
+        key = hashlib.sha256(payload).hexdigest()
+
+        with self._lock:
+            compiled = self._cache.get(key)
+            if compiled is not None:
+                self.hits += 1
+                self._cache.move_to_end(key)
+                return compiled
+
+        if isinstance(data, str):
+            node = schema_from_json(data)
+        elif isinstance(data, bytes):
+            node = schema_from_bytes(data)
+        else:
+            node = schema_from_dict(data)
+        # The node was just created, so it does not need to be copied.
+        compiled = CompiledSchema(node, copy_node=False)
+
+        with self._lock:
+            self.misses += 1
+            self._cache[key] = compiled
+            if self.maxsize is not None:
+                while len(self._cache) > self.maxsize:
+                    self._cache.popitem(last=False)
+        return compiled
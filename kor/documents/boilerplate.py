@@ -0,0 +1,312 @@
+"""Keep the main content of HTML pages and drop the boilerplate.
+
+Navigation, footers, cookie banners and sidebars end up in the prompt as
+tokens that do not carry any information for extraction. The processor in
+this module removes them in three steps:
+
+1. Tags that are boilerplate by nature (e.g., `nav`, `footer`, `form`) and
+   elements whose id or class names boilerplate (e.g., `cookie-banner`) are
+   removed.
+2. Blocks of text are scored with a text density heuristic: every paragraph
+   with enough text adds to the score of its parent and grand parent. The
+   container with the highest score, discounted by its link density, is the
+   main content; siblings that score well are kept as well. Blocks that are
+   mostly made of links are dropped from the main content.
+3. After conversion to markdown, lines repeated within the document and lines
+   repeated across the pages of a site (see `find_repeated_lines`) are dropped.
+
+The number of tokens saved is recorded in the metadata of every document.
+"""
+import re
+from collections import Counter
+from typing import Any, Dict, FrozenSet, Iterable, List, Set, Tuple
+
+from langchain_core.documents import Document
+from typing_extensions import TypedDict
+
+from kor.documents.html import (
+    CONSECUTIVE_NEW_LINES,
+    _get_markdown_converter,
+    _parse_html,
+)
+from kor.documents.typedefs import AbstractDocumentProcessor
+from kor.tokens import TokenCounter, estimate_num_tokens
+
+# Tags that never contain main content.
+BOILERPLATE_TAGS = (
+    "svg",
+    "img",
+    "script",
+    "style",
+    "nav",
+    "footer",
+    "aside",
+    "form",
+    "noscript",
+    "iframe",
+    "button",
+)
+
+# Words in ids and class names that indicate boilerplate.
+BOILERPLATE_HINTS = frozenset(
+    """
+    ad ads advert banner breadcrumb breadcrumbs consent cookie cookies footer
+    menu modal nav navbar navigation newsletter popup promo related share
+    sidebar social sponsored subscribe
+    """.split()
+)
+
+# Blocks whose text is scored.
+_PARAGRAPH_TAGS = ("p", "pre", "td", "blockquote", "dd")
+# Blocks that are dropped from the main content when they are mostly links.
+_LINK_BLOCK_TAGS = ("div", "section", "ul", "ol", "table", "header")
+# Tags that are never removed based on their id or class.
+_PROTECTED_TAGS = frozenset(["html", "body", "main", "article"])
+_HINT_SEPARATORS = re.compile(r"[-_\s]+")
+
+# Metadata key of the token savings.
+TOKEN_SAVINGS_KEY = "token_savings"
+
+
+def _has_boilerplate_hint(tag: Any) -> bool:
+    """Determine whether the id or the class of the tag names boilerplate."""
+    if tag.name in _PROTECTED_TAGS or tag.attrs is None:
+        return False
+    names = [tag.get("id") or ""] + list(tag.get("class") or [])
+    words = set(_HINT_SEPARATORS.split(" ".join(names).lower()))
+    return not words.isdisjoint(BOILERPLATE_HINTS)
+
+
+def _get_link_density(tag: Any, text_length: int) -> float:
+    """Get the fraction of the text of a tag that is link text."""
+    link_length = sum(len(link.get_text(" ", strip=True)) for link in tag.find_all("a"))
+    return link_length / max(text_length, 1)
+
+
+def _score_candidates(root: Any, min_paragraph_length: int) -> Dict[int, Tuple]:
+    """Score the containers of the paragraphs of the page."""
+    candidates: Dict[int, Tuple[Any, float]] = {}
+    for paragraph in root.find_all(_PARAGRAPH_TAGS):
+        text = paragraph.get_text(" ", strip=True)
+        if len(text) < min_paragraph_length:
+            continue
+        score = 1 + text.count(",") + min(len(text) // 100, 3)
+        for container, weight in [
+            (paragraph.parent, 1.0),
+            (paragraph.parent.parent if paragraph.parent else None, 0.5),
+        ]:
+            if container is None or container.name is None:
+                continue
+            _, previous = candidates.get(id(container), (container, 0.0))
+            candidates[id(container)] = (container, previous + score * weight)
+    return candidates
+
+
+def _select_main_content(root: Any, min_paragraph_length: int) -> List[Any]:
+    """Select the elements that make up the main content."""
+    for tag_name in ("main", "article"):
+        main = root.find(tag_name)
+        if main is not None and len(main.get_text(strip=True)) > min_paragraph_length:
+            return [main]
+
+    candidates = _score_candidates(root, min_paragraph_length)
+    if not candidates:
+        return [root.body or root]
+
+    scored = []
+    for container, score in candidates.values():
+        text_length = len(container.get_text(" ", strip=True))
+        density = _get_link_density(container, text_length)
+        scored.append((score * (1 - density), container))
+    best_score, best = max(scored, key=lambda item: item[0])
+    if best.parent is None:
+        return [best]
+
+    # Keep siblings that are part of the content, e.g., consecutive sections.
+    scores = {id(container): score for score, container in scored}
+    threshold = max(10.0, best_score * 0.2)
+    selected = []
+    for sibling in best.parent.find_all(recursive=False):
+        if sibling is best or scores.get(id(sibling), 0.0) >= threshold:
+            selected.append(sibling)
+        elif sibling.name == "p":
+            text = sibling.get_text(" ", strip=True)
+            if len(text) > 80 and _get_link_density(sibling, len(text)) < 0.25:
+                selected.append(sibling)
+    return selected
+
+
+def _remove_link_blocks(element: Any, max_link_density: float) -> None:
+    """Remove blocks that are mostly made of links from the element."""
+    for block in element.find_all(_LINK_BLOCK_TAGS):
+        if block.decomposed:
+            continue
+        text_length = len(block.get_text(" ", strip=True))
+        if _get_link_density(block, text_length) > max_link_density:
+            block.decompose()
+
+
+def _iter_lines(text: str) -> Iterable[str]:
+    """Iterate over the non empty stripped lines of a text."""
+    for line in text.splitlines():
+        stripped = line.strip()
+        if stripped:
+            yield stripped
+
+
+# PUBLIC API
+
+
+class TokenSavings(TypedDict):
+    """Type-definition for the tokens saved by processing a document."""
+
+    original: int
+    """Number of tokens of the original content."""
+    processed: int
+    """Number of tokens of the processed content."""
+    saved: int
+    """Number of tokens saved."""
+
+
+def find_repeated_lines(
+    documents: Iterable[Document],
+    *,
+    min_fraction: float = 0.5,
+    min_documents: int = 2,
+) -> FrozenSet[str]:
+    """Find the lines that are repeated across the pages of a site.
+
+    Use it on the output of the processor for a sample of pages of a site,
+    and pass the result to the processor as `repeated_lines`.
+
+    Args:
+        documents: processed documents from the same site
+        min_fraction: minimal fraction of the documents a line must appear in
+        min_documents: minimal number of documents a line must appear in
+
+    Returns:
+        the repeated lines (stripped)
+    """
+    counts: Counter = Counter()
+    num_documents = 0
+    for document in documents:
+        num_documents += 1
+        counts.update(set(_iter_lines(document.page_content)))
+    min_count = max(min_documents, min_fraction * num_documents)
+    return frozenset(line for line, count in counts.items() if count >= min_count)
+
+
+class MainContentHTMLProcessor(AbstractDocumentProcessor):
+    """Extract the main content of HTML pages as markdown, without boilerplate.
+
+    The tokens saved are recorded under the "token_savings" key of the metadata
+    of every processed document (see `TokenSavings`), relative to the original
+    content of the document.
+
+    Examples:
+
+    .. code-block:: python
+
+        processor = MainContentHTMLProcessor()
+        sample = processor.process_batch(documents[:50])
+        processor = MainContentHTMLProcessor(
+            repeated_lines=find_repeated_lines(sample)
+        )
+        results = await extract_from_documents(
+            chain, documents, document_processor=processor
+        )
+    """
+
+    def __init__(
+        self,
+        *,
+        tags_to_remove: Tuple[str, ...] = BOILERPLATE_TAGS,
+        max_link_density: float = 0.5,
+        min_paragraph_length: int = 25,
+        min_duplicate_length: int = 20,
+        repeated_lines: Iterable[str] = (),
+        parser: str = "html.parser",
+        token_counter: TokenCounter = estimate_num_tokens,
+    ) -> None:
+        """Initialize the processor.
+
+        Args:
+            tags_to_remove: tags that never contain main content
+            max_link_density: blocks with a larger fraction of link text are
+                              dropped from the main content
+            min_paragraph_length: paragraphs with fewer characters are not scored
+            min_duplicate_length: lines of at least this many characters that
+                                  are repeated within a document are only kept
+                                  once
+            repeated_lines: lines to drop, see `find_repeated_lines`
+            parser: the BeautifulSoup parser to use, see MarkdownifyHTMLProcessor
+            token_counter: function used to count the tokens saved
+        """
+        self.tags_to_remove = tags_to_remove
+        self.max_link_density = max_link_density
+        self.min_paragraph_length = min_paragraph_length
+        self.min_duplicate_length = min_duplicate_length
+        self.repeated_lines = frozenset(line.strip() for line in repeated_lines)
+        self.parser = parser
+        self.token_counter = token_counter
+        self._converter = _get_markdown_converter()
+
+    def _drop_duplicate_lines(self, markdown: str) -> str:
+        """Drop repeated lines and lines repeated across the site."""
+        seen: Set[str] = set()
+        lines = []
+        for line in markdown.splitlines():
+            stripped = line.strip()
+            if stripped in self.repeated_lines:
+                continue
+            if len(stripped) >= self.min_duplicate_length:
+                if stripped in seen:
+                    continue
+                seen.add(stripped)
+            lines.append(line)
+        return "\n".join(lines)
+
+    def get_main_content(self, html: str) -> str:
+        """Get the main content of an HTML page as markdown.
+
+        Args:
+            html: the HTML page
+
+        Returns:
+            the main content as markdown
+        """
+        soup = _parse_html(html, tags_to_remove=self.tags_to_remove, parser=self.parser)
+        for tag in soup.find_all(_has_boilerplate_hint):
+            if not tag.decomposed:
+                tag.decompose()
+
+        elements = _select_main_content(soup, self.min_paragraph_length)
+        wrapper = soup.new_tag("div")
+        for element in elements:
+            wrapper.append(element.extract())
+        _remove_link_blocks(wrapper, self.max_link_density)
+
+        markdown = self._drop_duplicate_lines(self._converter.convert_soup(wrapper))
+        return CONSECUTIVE_NEW_LINES.sub("\n\n", markdown).strip()
+
+    def process(self, document: Document) -> Document:
+        """Keep the main content of the HTML document as markdown.
+
+        Args:
+            document: a document with HTML content
+
+        Returns:
+            The main content, with the token savings in the metadata
+        """
+        content = self.get_main_content(document.page_content)
+        original = self.token_counter(document.page_content)
+        processed = self.token_counter(content)
+        savings: TokenSavings = {
+            "original": original,
+            "processed": processed,
+            "saved": original - processed,
+        }
+        return Document(
+            page_content=content,
+            metadata={**document.metadata, TOKEN_SAVINGS_KEY: savings},
+        )
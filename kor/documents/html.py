@@ -1,19 +1,27 @@
 """Load and chunk HTMLs with potential pre-processing to clean the html."""
 
+import csv
 import re
-from typing import Tuple
+from io import StringIO
+from typing import Any, Dict, List, Sequence, Tuple
 
 from langchain_core.documents import Document
 
 from kor.documents.typedefs import AbstractDocumentProcessor
+from kor.encoders.csv_data import DELIMITER
 
 # Regular expression pattern to detect multiple new lines in a row with optional
 # whitespace in between
 CONSECUTIVE_NEW_LINES = re.compile(r"\n(\s*\n)+", flags=re.UNICODE)
 
 
-def _get_mini_html(html: str, *, tags_to_remove: Tuple[str, ...] = tuple()) -> str:
-    """Clean up HTML tags."""
+def _parse_html(
+    html: str,
+    *,
+    tags_to_remove: Tuple[str, ...] = tuple(),
+    parser: str = "html.parser",
+) -> Any:
+    """Parse the HTML and remove unwanted tags from the parse tree."""
     try:
         from bs4 import BeautifulSoup
     except ImportError:
@@ -21,24 +29,77 @@ def _get_mini_html(html: str, *, tags_to_remove: Tuple[str, ...] = tuple()) -> s
             "Please install BeautifulSoup to use the HTML document processor. "
             "You can do so by running `pip install beautifulsoup4`."
         )
-    # Parse the HTML document using BeautifulSoup
-    soup = BeautifulSoup(html, "html.parser")
-
-    # Remove all CSS stylesheets
-    for stylesheet in soup.find_all("link", rel="stylesheet"):
-        stylesheet.extract()
-
-    for tag_to_remove in tags_to_remove:
-        # Remove all matching tags
-        for tag in soup.find_all(tag_to_remove):
-            tag.extract()
-
-    new_html = repr(soup)
-    return new_html
+    soup = BeautifulSoup(html, parser)
+    names = frozenset(tags_to_remove)
 
+    def _should_remove(tag: Any) -> bool:
+        """Match unwanted tags and CSS stylesheets."""
+        return tag.name in names or (
+            tag.name == "link" and "stylesheet" in (tag.get("rel") or ())
+        )
 
-def _clean_html(html: str, *, tags_to_remove: Tuple[str, ...] = tuple()) -> str:
-    """Clean up HTML and convert to markdown using markdownify."""
+    # A single traversal collects all the unwanted tags.
+    for tag in soup.find_all(_should_remove):
+        # Tags nested in a removed tag may already be gone.
+        if not tag.decomposed:
+            tag.decompose()
+    return soup
+
+
+def _get_cell_text(cell: Any) -> str:
+    """Get the text of a table cell on a single line."""
+    return " ".join(cell.get_text(" ", strip=True).split())
+
+
+def _get_table_rows(table: Any) -> List[List[str]]:
+    """Get the rows of a table, ignoring the rows of nested tables."""
+    rows = []
+    for row in table.find_all("tr"):
+        if row.find_parent("table") is not table:
+            continue
+        values = []
+        for cell in row.find_all(["th", "td"], recursive=False):
+            try:
+                span = max(int(cell.get("colspan") or 1), 1)
+            except ValueError:
+                span = 1
+            values.append(_get_cell_text(cell))
+            values.extend([""] * (span - 1))
+        if any(values):
+            rows.append(values)
+    return rows
+
+
+def _iter_top_level_tables(soup: Any) -> List[Any]:
+    """Get the tables that are not nested in another table."""
+    return [
+        table for table in soup.find_all("table") if table.find_parent("table") is None
+    ]
+
+
+def _compact_tables(soup: Any) -> Dict[str, str]:
+    """Replace the tables of the parse tree with placeholders.
+
+    Returns:
+        a mapping from placeholder to the compact serialization of the table
+    """
+    tables = {}
+    for idx, table in enumerate(_iter_top_level_tables(soup)):
+        rows = _get_table_rows(table)
+        if not rows:
+            table.decompose()
+            continue
+        # Only letters and digits so that markdownify does not escape it.
+        placeholder = f"kortable{idx}end"
+        paragraph = soup.new_tag("p")
+        paragraph.string = placeholder
+        table.replace_with(paragraph)
+        tables[placeholder] = format_table(rows)
+    return tables
+
+
+def _get_markdown_converter() -> Any:
+    """Get a markdownify converter."""
     try:
         import markdownify
     except ImportError:
@@ -46,28 +107,91 @@ def _clean_html(html: str, *, tags_to_remove: Tuple[str, ...] = tuple()) -> str:
             "Please install markdownify to use the HTML document processor. "
             "You can do so by running `pip install markdownify`."
         )
-
-    html = _get_mini_html(html, tags_to_remove=tags_to_remove)
-    md = markdownify.markdownify(html)
+    return markdownify.MarkdownConverter()
+
+
+def _clean_html(
+    html: str,
+    *,
+    tags_to_remove: Tuple[str, ...] = tuple(),
+    parser: str = "html.parser",
+    converter: Any = None,
+    compact_tables: bool = False,
+) -> str:
+    """Clean up HTML and convert to markdown using markdownify.
+
+    The HTML is parsed once, and the cleaned parse tree is converted to markdown
+    directly rather than being serialized and parsed again by markdownify.
+    """
+    if converter is None:
+        converter = _get_markdown_converter()
+    soup = _parse_html(html, tags_to_remove=tags_to_remove, parser=parser)
+    tables = _compact_tables(soup) if compact_tables else {}
+    md = converter.convert_soup(soup)
+    for placeholder, table in tables.items():
+        md = md.replace(placeholder, table)
     return CONSECUTIVE_NEW_LINES.sub("\n\n", md).strip()
 
 
 ## PUBLIC API
 
 
+def format_table(rows: Sequence[Sequence[str]]) -> str:
+    """Serialize the rows of a table with the delimiter of the CSV encoder.
+
+    Args:
+        rows: the rows of the table, the first row being the header
+
+    Returns:
+        the table, one row per line; cells are quoted only when needed
+    """
+    width = max((len(row) for row in rows), default=0)
+    buffer = StringIO()
+    writer = csv.writer(buffer, delimiter=DELIMITER, lineterminator="\n")
+    writer.writerows(list(row) + [""] * (width - len(row)) for row in rows)
+    return buffer.getvalue().strip()
+
+
+def get_html_tables(html: str, *, parser: str = "html.parser") -> List[List[List[str]]]:
+    """Get the tables of an HTML page.
+
+    Nested tables are flattened into the text of the cells that contain them.
+
+    Args:
+        html: the HTML page
+        parser: the BeautifulSoup parser to use
+
+    Returns:
+        the tables, each a list of rows with the header as the first row
+    """
+    soup = _parse_html(html, parser=parser)
+    tables = (_get_table_rows(table) for table in _iter_top_level_tables(soup))
+    return [rows for rows in tables if rows]
+
+
 class MarkdownifyHTMLProcessor(AbstractDocumentProcessor):
     """A preprocessor to clean HTML and convert to markdown using markdownify."""
 
     def __init__(
         self,
         tags_to_remove: Tuple[str, ...] = ("svg", "img", "script", "style"),
+        parser: str = "html.parser",
+        compact_tables: bool = False,
     ) -> None:
         """Initialize the preprocessor.
 
         Args:
             tags_to_remove: A tuple of tags to remove from the HTML
+            parser: The BeautifulSoup parser to use, e.g., "lxml" which is
+                    faster when it is installed (`pip install lxml`)
+            compact_tables: If True, tables are serialized as rows delimited
+                            with `|` (the delimiter of the CSV encoder) instead
+                            of markdown tables, which uses fewer tokens
         """
         self.tags_to_remove = tags_to_remove
+        self.parser = parser
+        self.compact_tables = compact_tables
+        self._converter = _get_markdown_converter()
 
     def process(self, document: Document) -> Document:
         """Clean up HTML and convert to markdown using markdownify.
@@ -80,6 +204,10 @@ class MarkdownifyHTMLProcessor(AbstractDocumentProcessor):
         """
         new_document = document.copy()
         new_document.page_content = _clean_html(
-            document.page_content, tags_to_remove=self.tags_to_remove
+            document.page_content,
+            tags_to_remove=self.tags_to_remove,
+            parser=self.parser,
+            converter=self._converter,
+            compact_tables=self.compact_tables,
         )
         return new_document
@@ -1,12 +1,120 @@
 import abc
+import asyncio
+import itertools
+import os
+from collections import deque
+from concurrent.futures import Executor, Future, ProcessPoolExecutor
+from typing import Deque, Iterable, Iterator, List, Optional
 
 from langchain_core.documents import Document
 
 
 class AbstractDocumentProcessor(abc.ABC):
-    """An interface for document transformers."""
+    """An interface for document transformers.
+
+    Sub-classes only need to implement `process`. The batch and streaming
+    methods fan out over a process pool by default, so processors must be
+    picklable to use them without an explicit executor.
+    """
 
     @abc.abstractmethod
     def process(self, document: Document) -> Document:
         """Process document."""
         raise NotImplementedError()
+
+    def _process_many(self, documents: List[Document]) -> List[Document]:
+        """Process a chunk of documents, used as the unit of work of executors."""
+        return [self.process(document) for document in documents]
+
+    async def aprocess(
+        self, document: Document, *, executor: Optional[Executor] = None
+    ) -> Document:
+        """Process document without blocking the event loop.
+
+        Args:
+            document: the document to process
+            executor: executor to run the processing in, defaults to the
+                      default executor of the event loop (a thread pool)
+
+        Returns:
+            The processed document
+        """
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(executor, self.process, document)
+
+    def process_iter(
+        self,
+        documents: Iterable[Document],
+        *,
+        executor: Optional[Executor] = None,
+        max_workers: Optional[int] = None,
+        chunksize: int = 16,
+    ) -> Iterator[Document]:
+        """Process a stream of documents in parallel, yielding them in order.
+
+        Documents are submitted in chunks to amortize the cost of sending them
+        to the workers, and at most two chunks per worker are in flight so that
+        memory use is bounded for large or lazy collections of documents.
+
+        Args:
+            documents: the documents to process, may be a lazy iterable
+            executor: executor to use, defaults to a process pool created for
+                      the duration of the iteration
+            max_workers: number of workers of the process pool (if no executor
+                         is provided), defaults to the number of CPUs
+            chunksize: number of documents submitted to a worker at once
+
+        Returns:
+            An iterator over the processed documents
+        """
+        if chunksize < 1:
+            raise ValueError("chunksize must be at least 1")
+        if executor is None:
+            with ProcessPoolExecutor(max_workers) as pool:
+                yield from self.process_iter(
+                    documents,
+                    executor=pool,
+                    max_workers=max_workers,
+                    chunksize=chunksize,
+                )
+            return
+
+        max_pending = 2 * (max_workers or os.cpu_count() or 1)
+        iterator = iter(documents)
+        pending: Deque["Future[List[Document]]"] = deque()
+        try:
+            while True:
+                chunk = list(itertools.islice(iterator, chunksize))
+                if chunk:
+                    pending.append(executor.submit(self._process_many, chunk))
+                if pending and (not chunk or len(pending) >= max_pending):
+                    yield from pending.popleft().result()
+                elif not chunk:
+                    break
+        finally:
+            for future in pending:
+                future.cancel()
+
+    def process_batch(
+        self,
+        documents: Iterable[Document],
+        *,
+        executor: Optional[Executor] = None,
+        max_workers: Optional[int] = None,
+        chunksize: int = 16,
+    ) -> List[Document]:
+        """Process documents in parallel.
+
+        See `process_iter` for a description of the arguments.
+
+        Returns:
+            The processed documents in the same order as the input documents
+        """
+        return list(
+            self.process_iter(
+                documents,
+                executor=executor,
+                max_workers=max_workers,
+                chunksize=chunksize,
+            )
+        )
@@ -5,7 +5,12 @@ An encoder follows the `Encoder` interface.
 It can encode, decode and contains instructions about the encoding format for an LLM.
 """
 from .csv_data import CSVEncoder
-from .encode import InputFormatter, encode_examples, initialize_encoder
+from .encode import (
+    InputFormatter,
+    encode_examples,
+    estimate_max_output_tokens,
+    initialize_encoder,
+)
 from .json_data import JSONEncoder
 from .typedefs import Encoder, SchemaBasedEncoder
 from .xml import XMLEncoder
@@ -14,6 +19,7 @@ __all__ = [
     "CSVEncoder",
     "encode_examples",
     "Encoder",
+    "estimate_max_output_tokens",
     "initialize_encoder",
     "InputFormatter",
     "JSONEncoder",
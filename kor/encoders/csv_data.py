@@ -6,12 +6,17 @@ into additional columns (likely both methods).
 """
 
 from io import StringIO
-from typing import Any, Dict, List
+from typing import Any, Dict, List, Optional
 
 import pandas as pd
 
 from kor.encoders.typedefs import SchemaBasedEncoder
-from kor.encoders.utils import unwrap_tag, wrap_in_tag
+from kor.encoders.utils import (
+    find_closing_tag,
+    strip_opening_tag,
+    unwrap_tag,
+    wrap_in_tag,
+)
 from kor.exceptions import ParseError
 from kor.nodes import AbstractSchemaNode, Object
 
@@ -53,6 +58,7 @@ class CSVEncoder(SchemaBasedEncoder):
                         "CSV Encoder does not yet support embedded lists or "
                         f"objects (attribute `{attribute.id}`)."
                     )
+        self._field_names = _extract_top_level_fieldnames(node)
 
     def encode(self, data: Any) -> str:
         """Encode the data."""
@@ -64,10 +70,7 @@ class CSVEncoder(SchemaBasedEncoder):
         if expected_key not in data:
             raise AssertionError(f"Expected a key: `{expected_key} to appear in data.")
 
-        if isinstance(self.node, Object):
-            field_names = _extract_top_level_fieldnames(self.node)
-        else:
-            field_names = [self.node.id]
+        field_names = self._field_names
 
         data_to_output = data[expected_key]
 
@@ -90,7 +93,12 @@ class CSVEncoder(SchemaBasedEncoder):
             table_str = unwrap_tag("csv", text)
         else:
             table_str = text
+        return self._decode_table(table_str)
 
+    def _decode_table(
+        self, table_str: Optional[str]
+    ) -> Dict[str, List[Dict[str, Any]]]:
+        """Decode the content of the table."""
         if table_str:
             with StringIO(table_str) as buffer:
                 try:
@@ -111,6 +119,36 @@ class CSVEncoder(SchemaBasedEncoder):
         namespace = self.node.id
         return {namespace: records}
 
+    def get_stop_sequences(self) -> List[str]:
+        """Stop at the closing CSV tag, if using tags."""
+        return ["</csv>"] if self.use_tags else []
+
+    def get_payload_end(self, text: str) -> Optional[int]:
+        """Find the end of the closing tag.
+
+        Without tags, the end of the table cannot be told from the beginning of
+        a new row.
+        """
+        if self.use_tags:
+            return find_closing_tag("csv", text)
+        return None
+
+    def decode_partial(self, text: str) -> Optional[Any]:
+        """Decode the rows that were complete before the output was cut off.
+
+        The last row is dropped unless it ends with a new line, since it may
+        have been cut off.
+        """
+        table_str = strip_opening_tag("csv", text) if self.use_tags else text
+        if table_str is None:
+            return None
+        if not table_str.endswith("\n"):
+            table_str = table_str[: table_str.rfind("\n") + 1]
+        try:
+            return self._decode_table(table_str)
+        except ParseError:
+            return None
+
     def get_instruction_segment(self) -> str:
         """Format instructions."""
         instructions = [
@@ -1,6 +1,20 @@
-from typing import Any, Callable, List, Literal, Mapping, Sequence, Tuple, Type, Union
-
-from kor.nodes import AbstractSchemaNode
+import math
+from typing import (
+    Any,
+    Callable,
+    List,
+    Literal,
+    Mapping,
+    Optional,
+    Sequence,
+    Tuple,
+    Type,
+    Union,
+)
+
+from kor.examples import generate_examples
+from kor.nodes import AbstractSchemaNode, Bool, Number, Object, Selection
+from kor.tokens import TokenCounter, estimate_num_tokens
 
 from .csv_data import CSVEncoder
 from .json_data import JSONEncoder
@@ -19,6 +33,33 @@ InputFormatter = Union[
 ]
 
 
+def _make_placeholder(node: AbstractSchemaNode) -> Any:
+    """Make a placeholder value for a node, used to estimate output sizes."""
+    if isinstance(node, Object):
+        value: Any = {
+            attribute.id: _make_placeholder(attribute) for attribute in node.attributes
+        }
+    elif isinstance(node, Selection):
+        value = max((option.id for option in node.options), key=len, default="")
+    elif isinstance(node, Number):
+        value = 1234.5
+    elif isinstance(node, Bool):
+        value = True
+    else:
+        value = "lorem ipsum dolor"
+    return [value, value] if node.many else value
+
+
+def _count_records(node: AbstractSchemaNode, output: Any) -> int:
+    """Count the records in the output of an example."""
+    if not isinstance(output, Mapping) or node.id not in output:
+        return 0
+    data = output[node.id]
+    if isinstance(data, list):
+        return len(data)
+    return 1 if data else 0
+
+
 # PUBLIC API
 
 
@@ -65,6 +106,55 @@ def encode_examples(
     ]
 
 
+def estimate_max_output_tokens(
+    node: Object,
+    encoder: Encoder,
+    *,
+    expected_records: int = 1,
+    examples: Optional[Sequence[Tuple[str, Any]]] = None,
+    token_counter: TokenCounter = estimate_num_tokens,
+    margin: float = 1.5,
+) -> int:
+    """Estimate the number of output tokens needed to extract records.
+
+    The size of a record is the size of the largest record of the encoded
+    examples, or of a placeholder record if the examples have no records.
+    The fixed overhead of the encoding (tags, header) is counted once.
+
+    Args:
+        node: the schema, as described to the model
+        encoder: the encoder of the output
+        expected_records: the number of records expected in the output,
+                          ignored for schemas with many=False
+        examples: the examples, generated from the schema if not provided
+        token_counter: the function used to count tokens
+        margin: multiplier applied to the size of the records
+
+    Returns:
+        the estimated maximal number of output tokens
+    """
+    if not node.many:
+        expected_records = 1
+    overhead = token_counter(encoder.encode({node.id: []}))
+
+    if examples is None:
+        examples = generate_examples(node)
+    record_tokens = 0.0
+    for _, output in examples:
+        num_records = _count_records(node, output)
+        if num_records:
+            tokens = token_counter(encoder.encode(output)) - overhead
+            record_tokens = max(record_tokens, tokens / num_records)
+    if not record_tokens:
+        placeholder = _make_placeholder(node)
+        if node.many:
+            placeholder = placeholder[:1]
+        tokens = token_counter(encoder.encode({node.id: placeholder}))
+        record_tokens = max(tokens - overhead, 1)
+
+    return overhead + math.ceil(record_tokens * expected_records * margin)
+
+
 def initialize_encoder(
     encoder_or_encoder_class: Union[Type[Encoder], Encoder, str],
     schema: AbstractSchemaNode,
@@ -1,11 +1,23 @@
 """JSON encoder and decoder."""
 import json
-from typing import Any
+import re
+from typing import Any, List, Optional
 
 from kor.exceptions import ParseError
 
 from .typedefs import Encoder
-from .utils import unwrap_tag, wrap_in_tag
+from .utils import find_closing_tag, strip_opening_tag, unwrap_tag, wrap_in_tag
+
+_DECODER = json.JSONDecoder()
+# Beginning of an object with a list of records under a single key.
+_RECORDS_START = re.compile(r'\s*\{\s*("(?:[^"\\]|\\.)*")\s*:\s*\[')
+
+
+def _skip_whitespace(text: str, index: int) -> int:
+    """Get the index of the first character that is not whitespace."""
+    while index < len(text) and text[index].isspace():
+        index += 1
+    return index
 
 
 class JSONEncoder(Encoder):
@@ -91,6 +103,48 @@ class JSONEncoder(Encoder):
         except json.JSONDecodeError as e:
             raise ParseError(e)
 
+    def get_stop_sequences(self) -> List[str]:
+        """Stop at the closing JSON tag, if using tags."""
+        return ["</json>"] if self.use_tags else []
+
+    def get_payload_end(self, text: str) -> Optional[int]:
+        """Find the end of the closing tag, or of the top level JSON value."""
+        if self.use_tags:
+            return find_closing_tag("json", text)
+        # Only try to decode once the output may end with an object or array.
+        stripped = text.rstrip()
+        if not stripped.endswith(("}", "]")):
+            return None
+        start = len(text) - len(text.lstrip())
+        try:
+            _, end = _DECODER.raw_decode(text, start)
+        except json.JSONDecodeError:
+            return None
+        return end
+
+    def decode_partial(self, text: str) -> Optional[Any]:
+        """Decode the records that were closed before the output was cut off."""
+        content = strip_opening_tag("json", text) if self.use_tags else text
+        if content is None:
+            return None
+        match = _RECORDS_START.match(content)
+        if match is None:
+            return None
+        records = []
+        index = match.end()
+        while True:
+            index = _skip_whitespace(content, index)
+            try:
+                record, index = _DECODER.raw_decode(content, index)
+            except json.JSONDecodeError:
+                break
+            records.append(record)
+            index = _skip_whitespace(content, index)
+            if not content.startswith(",", index):
+                break
+            index += 1
+        return {json.loads(match.group(1)): records}
+
     def get_instruction_segment(self) -> str:
         """Get the format instructions for the given decoder.
 
@@ -7,7 +7,7 @@ This file only contains the interface for encoders.
   there are many ways of phrasing the format instructions.
 """
 import abc
-from typing import Any
+from typing import Any, List, Optional
 
 from kor.nodes import AbstractSchemaNode
 
@@ -38,6 +38,48 @@ class Encoder(abc.ABC):
         """
         raise NotImplementedError()
 
+    def get_stop_sequences(self) -> List[str]:
+        """Get the sequences that mark the end of the useful output.
+
+        The model can be stopped as soon as it generates one of them. Models do
+        not return the stop sequence, so the decoder must accept outputs that
+        end right before it.
+
+        Returns:
+            the stop sequences, empty if the end of the output is not marked
+        """
+        return []
+
+    def get_payload_end(self, text: str) -> Optional[int]:
+        """Find the end of a complete payload in a partial output.
+
+        Used to stop streaming the output of the model as soon as the payload
+        can be decoded.
+
+        Args:
+            text: the output generated so far
+
+        Returns:
+            the offset after the end of the payload, or None if the payload is
+            not complete yet or if the encoder cannot tell
+        """
+        return None
+
+    def decode_partial(self, text: str) -> Optional[Any]:
+        """Decode the complete records of an output that was cut off.
+
+        Used to resume extractions whose output did not fit in the token budget
+        of the model.
+
+        Args:
+            text: the output, cut off anywhere after the beginning of the payload
+
+        Returns:
+            the decoded data with the list of complete records under the key of
+            the schema, or None if the encoder cannot recover records
+        """
+        return None
+
 
 class SchemaBasedEncoder(Encoder, abc.ABC):
     """Abstract interface for an encoder that has the data schema.
@@ -9,6 +9,29 @@ def wrap_in_tag(tag_name: str, content: str) -> str:
     return f"<{tag_name}>{content}</{tag_name}>"
 
 
+def find_closing_tag(tag_name: str, text: str) -> Optional[int]:
+    """Find the end of the closing tag that follows an opening tag."""
+    start = text.find(f"<{tag_name}>")
+    if start == -1:
+        return None
+    closing_tag = f"</{tag_name}>"
+    end = text.find(closing_tag, start)
+    if end == -1:
+        return None
+    return end + len(closing_tag)
+
+
+def strip_opening_tag(tag_name: str, text: str) -> Optional[str]:
+    """Get the content after an opening tag, up to the closing tag if any."""
+    opening_tag = f"<{tag_name}>"
+    start = text.find(opening_tag)
+    if start == -1:
+        return None
+    content = text[start + len(opening_tag) :]
+    end = content.find(f"</{tag_name}>")
+    return content if end == -1 else content[:end]
+
+
 def unwrap_tag(tag_name: str, text: str) -> Optional[str]:
     """Extract content located inside a tag."""
     pattern = f"<{tag_name}>(.*?)</{tag_name}>"
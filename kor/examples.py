@@ -6,7 +6,7 @@ into account the finite size of the context window and limit the number of examp
 
 The code uses a default encoding of XML. This encoding should match the parser.
 """
-from typing import Any, List, Tuple
+from typing import TYPE_CHECKING, Any, List, Tuple, Union
 
 from kor.nodes import (
     AbstractSchemaNode,
@@ -18,6 +18,9 @@ from kor.nodes import (
     TypeVar,
 )
 
+if TYPE_CHECKING:
+    from kor.compiled import CompiledSchema
+
 T = TypeVar("T")
 
 
@@ -103,7 +106,9 @@ class SimpleExampleAggregator(AbstractVisitor[List[Tuple[str, str]]]):
 # PUBLIC API
 
 
-def generate_examples(node: AbstractSchemaNode) -> List[Tuple[str, str]]:
+def generate_examples(
+    node: Union[AbstractSchemaNode, "CompiledSchema"]
+) -> List[Tuple[str, str]]:
     """Generate examples for a given element.
 
     A rudimentary implementation that simply concatenates all available examples
@@ -113,9 +118,12 @@ def generate_examples(node: AbstractSchemaNode) -> List[Tuple[str, str]]:
     to meet a constraint on the overall number of tokens.)
 
     Args:
-        node: AbstractInput
+        node: AbstractInput, or a compiled schema whose examples were aggregated
+              at compilation
 
     Returns:
         list of 2-tuples containing input, output pairs
     """
+    if not isinstance(node, AbstractSchemaNode):
+        return list(node.examples)
     return SimpleExampleAggregator().visit(node)
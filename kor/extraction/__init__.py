@@ -1,4 +1,9 @@
-from kor.extraction.api import create_extraction_chain, extract_from_documents
+from kor.extraction.api import (
+    create_extraction_chain,
+    extract_from_documents,
+    extract_from_documents_iter,
+    extract_from_documents_sync,
+)
 from kor.extraction.parser import KorParser
 from kor.extraction.typedefs import DocumentExtraction, Extraction
 
@@ -6,6 +11,8 @@ __all__ = [
     "Extraction",
     "KorParser",
     "extract_from_documents",
+    "extract_from_documents_iter",
+    "extract_from_documents_sync",
     "create_extraction_chain",
     "DocumentExtraction",
 ]
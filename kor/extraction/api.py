@@ -1,50 +1,679 @@
 """Kor API for extraction related functionality."""
 
 import asyncio
-from typing import Any, Callable, List, Optional, Sequence, Type, Union, cast
+import time
+from collections import deque
+from concurrent.futures import Executor, ThreadPoolExecutor
+from typing import (
+    Any,
+    AsyncIterable,
+    AsyncIterator,
+    Callable,
+    Deque,
+    Dict,
+    Iterable,
+    List,
+    Optional,
+    Sequence,
+    Tuple,
+    Type,
+    TypeVar,
+    Union,
+)
 
 from langchain_core.documents import Document
-from langchain_core.language_models import BaseLanguageModel
+from langchain_core.language_models import BaseChatModel, BaseLanguageModel
+from langchain_core.messages import BaseMessage
 from langchain_core.output_parsers import StrOutputParser
 from langchain_core.prompts import PromptTemplate
-from langchain_core.runnables import Runnable
+from langchain_core.runnables import Runnable, RunnableConfig, RunnableSequence
+from langchain_core.runnables.config import get_executor_for_config
 
-from kor.encoders import Encoder, InputFormatter, initialize_encoder
-from kor.extraction.parser import KorParser
-from kor.extraction.typedefs import DocumentExtraction, Extraction
+from kor.compiled import CompiledSchema, compile_schema
+from kor.documents.typedefs import AbstractDocumentProcessor
+from kor.encoders import (
+    Encoder,
+    InputFormatter,
+    JSONEncoder,
+    estimate_max_output_tokens,
+    initialize_encoder,
+)
+from kor.encoders.typedefs import SchemaBasedEncoder
+from kor.extraction.cascade import EscalationPolicy, ExtractionCascade
+from kor.extraction.chunking import TokenChunker, merge_chunk_extractions
+from kor.extraction.continuation import (
+    aextract_with_continuation,
+    extract_with_continuation,
+)
+from kor.extraction.metrics import (
+    CHUNKS_SKIPPED,
+    DOCUMENT_FAILURES,
+    DOCUMENT_PROCESSING_SECONDS,
+    STREAMS_CANCELLED,
+    MetricsCallbackHandler,
+    MetricsSink,
+    record_document_extraction,
+    timed,
+)
+from kor.extraction.parser import KorParser, _get_executor_parser
+from kor.extraction.partition import PartitionedExtractionChain, partition_schema
+from kor.extraction.prefilter import SchemaPrefilter
+from kor.extraction.retrieval import ChunkRetriever
+from kor.extraction.streaming import astream_payload
+from kor.extraction.tools import ToolCallParser, ToolCallPromptTemplate
+from kor.extraction.typedefs import (
+    ChunkExtraction,
+    DocumentExtraction,
+    Extraction,
+    TextChunk,
+)
+from kor.extraction.usage import (
+    TIER_METADATA_KEY,
+    ModelPricing,
+    UsageCallbackHandler,
+)
+from kor.grammars import GrammarBinding, get_grammar_binding, to_grammar
+from kor.json_schema import to_tool
 from kor.nodes import Object
-from kor.prompts import create_langchain_prompt
+from kor.prompts import (
+    DEFAULT_INSTRUCTION_TEMPLATE,
+    ExtractionPromptTemplate,
+    create_langchain_prompt,
+)
 from kor.type_descriptors import TypeDescriptor, initialize_type_descriptors
 from kor.validators import Validator
 
+T = TypeVar("T")
 
-async def _extract_from_document_with_semaphore(
-    semaphore: asyncio.Semaphore,
-    chain: Runnable,
+# The part of an extraction chain that calls the LLM, its parser, and the
+# parser to run in the executor.
+_Tier = Tuple[Runnable, KorParser, KorParser]
+
+
+def _get_document_uids(
+    idx: int,
     document: Document,
-    uid: str,
-    source_uid: str,
-) -> DocumentExtraction:
-    """Extract from document with a semaphore to limit concurrency."""
-    async with semaphore:
-        extraction_result: Extraction = cast(
-            Extraction, await chain.ainvoke(document.page_content)
+    use_uid: bool,
+    extraction_uid_function: Optional[Callable[[Document], str]],
+) -> Tuple[str, str]:
+    """Get the extraction uid and the source uid of a document."""
+    if use_uid:
+        source_uid = document.metadata.get("uid")
+        if source_uid is None:
+            raise ValueError(f"uid not found in document metadata for document {idx}")
+        source_uid = str(source_uid)
+    else:
+        source_uid = str(idx)
+
+    extraction_uid = (
+        extraction_uid_function(document) if extraction_uid_function else source_uid
+    )
+    return extraction_uid, source_uid
+
+
+def _split_output_parser(chain: Runnable) -> Tuple[Runnable, KorParser]:
+    """Split an extraction chain into the part that calls the LLM and the parser."""
+    if not isinstance(chain, RunnableSequence) or not isinstance(chain.last, KorParser):
+        raise ValueError(
+            "Expected a chain created with `create_extraction_chain` that ends with"
+            f" a KorParser, got {type(chain)}"
+        )
+    return RunnableSequence(*chain.steps[:-1]), chain.last
+
+
+def _parse_output(parser: KorParser, output: Union[str, BaseMessage]) -> Extraction:
+    """Parse the output of the model, a message when using tool calling."""
+    if isinstance(output, BaseMessage):
+        if not isinstance(parser, ToolCallParser):
+            raise TypeError(f"Expected text to parse, got {type(output)}")
+        return parser.parse_message(output)
+    return parser.parse(output)
+
+
+def _get_schema_and_prompt_prefix(chain: Runnable) -> Tuple[Object, str]:
+    """Get the schema of an extraction chain and its longest prompt prefix."""
+    if isinstance(chain, PartitionedExtractionChain):
+        prefixes = [_get_schema_and_prompt_prefix(c)[1] for c in chain.chains]
+        return chain.node, max(prefixes, key=len)
+    # All the tiers of a cascade share the same prompt and parser.
+    first_chain = _get_tiers(chain)[0]
+    return _split_output_parser(first_chain)[1].schema_, _get_prompt_prefix(first_chain)
+
+
+def _get_partitions(chain: Runnable) -> List[Runnable]:
+    """Get the extraction chains of a partitioned chain, or the chain itself."""
+    if isinstance(chain, PartitionedExtractionChain):
+        return chain.chains
+    return [chain]
+
+
+def _get_tiers(chain: Runnable) -> List[Runnable]:
+    """Get the extraction chains of a cascade, or the chain itself."""
+    if isinstance(chain, ExtractionCascade):
+        return chain.tiers
+    return [chain]
+
+
+def _get_prompt_prefix(chain: Runnable) -> str:
+    """Get the part of the prompt that is independent of the input text."""
+    if not isinstance(chain, RunnableSequence) or not isinstance(
+        chain.first, ExtractionPromptTemplate
+    ):
+        raise ValueError(
+            "Expected a chain created with `create_extraction_chain` that starts"
+            f" with an ExtractionPromptTemplate, got {type(chain)}"
+        )
+    return chain.first.to_string("")
+
+
+class _DocumentExtractor:
+    """Extract data from a single document.
+
+    Holds the configuration that is shared by all the documents in a run, and
+    is used by all the runners (async, threaded).
+    """
+
+    def __init__(
+        self,
+        chain: Runnable,
+        *,
+        metrics_sink: Optional[MetricsSink] = None,
+        pricing: Union[ModelPricing, Sequence[ModelPricing], None] = None,
+        document_processor: Optional[AbstractDocumentProcessor] = None,
+        executor: Optional[Executor] = None,
+        chunker: Optional[TokenChunker] = None,
+        chunk_concurrency: int = 1,
+        early_stopping: bool = False,
+        chunk_priority: Optional[Callable[[TextChunk], float]] = None,
+        prefilter: Optional[SchemaPrefilter] = None,
+        retriever: Optional[ChunkRetriever] = None,
+        stream: bool = False,
+        max_continuations: int = 0,
+    ) -> None:
+        """Initialize the extractor."""
+        self.chain = chain
+        self.metrics_sink = metrics_sink
+        self.pricing = pricing
+        self.document_processor = document_processor
+        self.executor = executor
+        self.chunker = chunker
+        self.chunk_concurrency = chunk_concurrency
+        self.early_stopping = early_stopping
+        self.chunk_priority = chunk_priority
+        self.prefilter = prefilter
+        self.retriever = retriever
+        self.stream = stream
+        self.max_continuations = max_continuations
+        # The extraction chains, i.e., the chain or the chains of its partitions,
+        # with the tiers of every chain
+        self.partitions: List[Tuple[Runnable, List[_Tier]]] = []
+
+        if executor is not None or stream or max_continuations:
+            # Parse outside of the chain, so that parsing can be offloaded
+            # to the executor while the LLM calls stay on the event loop, and
+            # so that the output of the LLM can be streamed or continued.
+            for partition_chain in _get_partitions(chain):
+                tiers = []
+                for tier_chain in _get_tiers(partition_chain):
+                    llm_chain, parser = _split_output_parser(tier_chain)
+                    tiers.append(
+                        (llm_chain, parser, _get_executor_parser(parser, executor))
+                    )
+                self.partitions.append((partition_chain, tiers))
+
+        if chunker is not None:
+            self.schema, prefix = _get_schema_and_prompt_prefix(chain)
+            self.chunk_size = chunker.get_chunk_size(prefix)
+
+        if pricing is not None and not isinstance(pricing, ModelPricing):
+            num_tiers = max(
+                len(_get_tiers(partition_chain))
+                for partition_chain in _get_partitions(chain)
+            )
+            if len(pricing) != num_tiers:
+                raise ValueError(
+                    f"Expected the pricing of {num_tiers} tiers, got"
+                    f" {len(pricing)}."
+                )
+
+        if retriever is not None and chunker is None:
+            raise ValueError("Chunk retrieval requires a chunker.")
+
+        if early_stopping:
+            if chunker is None:
+                raise ValueError("Early stopping requires a chunker.")
+            if self.schema.many:
+                raise ValueError(
+                    "Early stopping is only supported for schemas with many=False."
+                )
+
+    async def _arun_cpu_bound(self, func: Callable[..., T], *args: Any) -> T:
+        """Run CPU bound work in the executor if one was provided."""
+        if self.executor is None:
+            return func(*args)
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.executor, func, *args)
+
+    async def _ainvoke(self, text: str, config: RunnableConfig) -> Extraction:
+        """Run the chain on the given text."""
+        if not self.partitions:
+            return await self.chain.ainvoke(text, config=config)
+        extractions = await asyncio.gather(
+            *(
+                self._ainvoke_tiers(chain, tiers, text, config)
+                for chain, tiers in self.partitions
+            )
         )
-        return {
+        return self._merge_partitions(extractions)
+
+    async def _ainvoke_tiers(
+        self,
+        chain: Runnable,
+        tiers: List[_Tier],
+        text: str,
+        config: RunnableConfig,
+    ) -> Extraction:
+        """Run the tiers of an extraction chain on the given text."""
+        latency_saved = None
+        for tier, (llm_chain, parser, executor_parser) in enumerate(tiers):
+            raw: Union[str, BaseMessage, None] = None
+            # Tool calls are only complete at the end of the message.
+            if self.stream and not isinstance(parser, ToolCallParser):
+                streamed = await astream_payload(
+                    llm_chain, parser.encoder, text, config
+                )
+                raw = streamed["output"]
+                if streamed["cancelled"] and self.metrics_sink is not None:
+                    self.metrics_sink.increment(STREAMS_CANCELLED)
+                if streamed["latency_saved"] is not None:
+                    latency_saved = (latency_saved or 0.0) + streamed["latency_saved"]
+            if self._can_continue(parser):
+                extraction = await aextract_with_continuation(
+                    llm_chain,
+                    parser,
+                    text,
+                    config,
+                    max_continuations=self.max_continuations,
+                    output=raw if isinstance(raw, str) else None,
+                    executor=self.executor,
+                )
+            else:
+                if raw is None:
+                    raw = await llm_chain.ainvoke(text, config=config)
+                extraction = await self._arun_cpu_bound(
+                    _parse_output, executor_parser, raw
+                )
+            if latency_saved is not None:
+                extraction["latency_saved"] = latency_saved
+            if not isinstance(chain, ExtractionCascade):
+                break
+            extraction["tier"] = tier
+            if chain.is_final(tier, text, extraction):
+                break
+        return extraction
+
+    def _merge_partitions(self, extractions: Sequence[Extraction]) -> Extraction:
+        """Merge the extractions of the partitions of a partitioned chain."""
+        if not isinstance(self.chain, PartitionedExtractionChain):
+            return extractions[0]
+        extraction = self.chain._merge(extractions)
+        latencies_saved = [
+            partition_extraction["latency_saved"]
+            for partition_extraction in extractions
+            if "latency_saved" in partition_extraction
+        ]
+        if latencies_saved:
+            extraction["latency_saved"] = sum(latencies_saved)
+        return extraction
+
+    def _can_continue(self, parser: KorParser) -> bool:
+        """Determine if truncated outputs of the parser can be continued."""
+        return bool(
+            self.max_continuations
+            and parser.schema_.many
+            and not isinstance(parser, ToolCallParser)
+        )
+
+    def _invoke(self, text: str, config: RunnableConfig) -> Extraction:
+        """Run the chain on the given text. Sync version of _ainvoke."""
+        if not self.partitions:
+            return self.chain.invoke(text, config)
+        if len(self.partitions) == 1:
+            chain, tiers = self.partitions[0]
+            return self._invoke_tiers(chain, tiers, text, config)
+        with get_executor_for_config(config) as executor:
+            extractions = list(
+                executor.map(
+                    lambda partition: self._invoke_tiers(
+                        partition[0], partition[1], text, config
+                    ),
+                    self.partitions,
+                )
+            )
+        return self._merge_partitions(extractions)
+
+    def _invoke_tiers(
+        self,
+        chain: Runnable,
+        tiers: List[_Tier],
+        text: str,
+        config: RunnableConfig,
+    ) -> Extraction:
+        """Run the tiers of an extraction chain. Sync version of _ainvoke_tiers."""
+        for tier, (llm_chain, parser, _) in enumerate(tiers):
+            if self._can_continue(parser):
+                extraction = extract_with_continuation(
+                    llm_chain,
+                    parser,
+                    text,
+                    config,
+                    max_continuations=self.max_continuations,
+                )
+            else:
+                extraction = _parse_output(parser, llm_chain.invoke(text, config))
+            if not isinstance(chain, ExtractionCascade):
+                break
+            extraction["tier"] = tier
+            if chain.is_final(tier, text, extraction):
+                break
+        return extraction
+
+    def _split(self, text: str) -> Tuple[List[TextChunk], int]:
+        """Split the text into chunks in the order in which to process them.
+
+        Returns:
+            the chunks to process and the total number of chunks
+        """
+        assert self.chunker is not None
+        chunks = self.chunker.split(text, self.chunk_size)
+        num_chunks = len(chunks)
+        if self.retriever is not None:
+            chunks = self.retriever.select(chunks)
+        if self.chunk_priority is not None:
+            chunks.sort(key=self.chunk_priority, reverse=True)
+        return chunks, num_chunks
+
+    def _is_result(self, extraction: Extraction) -> bool:
+        """Determine if the extraction produced a validated result."""
+        return bool(
+            not extraction["errors"]
+            and extraction["data"]
+            and extraction["data"].get(self.schema.id)
+        )
+
+    def _merge(
+        self,
+        chunk_extractions: List[Tuple[TextChunk, Extraction]],
+        num_chunks: int,
+    ) -> Tuple[Extraction, List[ChunkExtraction], Optional[int]]:
+        """Merge the extractions of the chunks in document order."""
+        chunk_extractions.sort(key=lambda item: item[0]["start"])
+        extraction, provenance = merge_chunk_extractions(
+            self.schema.id, self.schema.many, chunk_extractions
+        )
+        latencies_saved = [
+            chunk_extraction["latency_saved"]
+            for _, chunk_extraction in chunk_extractions
+            if "latency_saved" in chunk_extraction
+        ]
+        if latencies_saved:
+            extraction["latency_saved"] = sum(latencies_saved)
+        chunks_skipped = None
+        if self.early_stopping or self.retriever is not None:
+            chunks_skipped = num_chunks - len(chunk_extractions)
+            if self.metrics_sink is not None and chunks_skipped:
+                self.metrics_sink.increment(CHUNKS_SKIPPED, chunks_skipped)
+        return extraction, provenance, chunks_skipped
+
+    async def _aextract_chunks(
+        self, text: str, config: RunnableConfig
+    ) -> Tuple[Extraction, List[ChunkExtraction], Optional[int]]:
+        """Extract from the chunks of the text and merge the results.
+
+        With early stopping, no new chunks are started, and chunks in flight are
+        cancelled as soon as one chunk yields a validated result.
+        """
+        chunks, num_chunks = self._split(text)
+        queue = deque(chunks)
+        running: Dict["asyncio.Future[Extraction]", TextChunk] = {}
+        completed: List[Tuple[TextChunk, Extraction]] = []
+        found = False
+
+        try:
+            while (queue or running) and not found:
+                while queue and len(running) < self.chunk_concurrency:
+                    chunk = queue.popleft()
+                    running[
+                        asyncio.ensure_future(self._ainvoke(chunk["text"], config))
+                    ] = chunk
+                done, _ = await asyncio.wait(
+                    running, return_when=asyncio.FIRST_COMPLETED
+                )
+                for done_future in done:
+                    extraction = done_future.result()
+                    completed.append((running.pop(done_future), extraction))
+                    if self.early_stopping and self._is_result(extraction):
+                        found = True
+        finally:
+            for pending_future in running:
+                pending_future.cancel()
+            # Wait for the cancelled calls, so that the tokens they already used
+            # are accounted for before the usage of the document is collected.
+            await asyncio.gather(*running, return_exceptions=True)
+
+        return self._merge(completed, num_chunks)
+
+    def _extract_chunks(
+        self, text: str, config: RunnableConfig
+    ) -> Tuple[Extraction, List[ChunkExtraction], Optional[int]]:
+        """Extract from the chunks of the text and merge the results."""
+        chunks, num_chunks = self._split(text)
+        completed: List[Tuple[TextChunk, Extraction]] = []
+        for chunk in chunks:
+            extraction = self._invoke(chunk["text"], config)
+            completed.append((chunk, extraction))
+            if self.early_stopping and self._is_result(extraction):
+                break
+        return self._merge(completed, num_chunks)
+
+    async def aprocess(self, document: Document) -> Document:
+        """Apply the document processor (if any) to the document."""
+        if self.document_processor is None:
+            return document
+        with timed(self.metrics_sink, DOCUMENT_PROCESSING_SECONDS):
+            if self.executor is None:
+                return self.document_processor.process(document)
+            return await self.document_processor.aprocess(
+                document, executor=self.executor
+            )
+
+    async def aextract(
+        self,
+        document: Document,
+        uid: str,
+        source_uid: str,
+        *,
+        processed: bool = False,
+    ) -> DocumentExtraction:
+        """Extract from a single document.
+
+        Args:
+            document: the document
+            uid: the uid of the extraction
+            source_uid: the uid of the document
+            processed: whether the document processor was already applied
+        """
+        started = time.perf_counter()
+        usage_handler = UsageCallbackHandler()
+        config: RunnableConfig = {"callbacks": [usage_handler]}
+        chunks = None
+        chunks_skipped = None
+        try:
+            if not processed:
+                document = await self.aprocess(document)
+            if self.prefilter is not None and not await self._arun_cpu_bound(
+                self.prefilter.matches, document.page_content
+            ):
+                return self._to_document_extraction(
+                    {"data": {}, "raw": "", "errors": [], "validated_data": {}},
+                    uid,
+                    source_uid,
+                    usage_handler,
+                    started,
+                    skipped=True,
+                )
+            if self.chunker is None:
+                extraction_result = await self._ainvoke(document.page_content, config)
+            else:
+                (
+                    extraction_result,
+                    chunks,
+                    chunks_skipped,
+                ) = await self._aextract_chunks(document.page_content, config)
+        except Exception:
+            if self.metrics_sink is not None:
+                self.metrics_sink.increment(DOCUMENT_FAILURES)
+            raise
+        return self._to_document_extraction(
+            extraction_result,
+            uid,
+            source_uid,
+            usage_handler,
+            started,
+            chunks,
+            chunks_skipped,
+        )
+
+    def extract(
+        self, document: Document, uid: str, source_uid: str
+    ) -> DocumentExtraction:
+        """Extract from a single document. Sync version of aextract."""
+        started = time.perf_counter()
+        usage_handler = UsageCallbackHandler()
+        config: RunnableConfig = {"callbacks": [usage_handler]}
+        chunks = None
+        chunks_skipped = None
+        try:
+            if self.document_processor is not None:
+                document = self.document_processor.process(document)
+            if self.prefilter is not None and not self.prefilter.matches(
+                document.page_content
+            ):
+                return self._to_document_extraction(
+                    {"data": {}, "raw": "", "errors": [], "validated_data": {}},
+                    uid,
+                    source_uid,
+                    usage_handler,
+                    started,
+                    skipped=True,
+                )
+            if self.chunker is None:
+                extraction_result = self._invoke(document.page_content, config)
+            else:
+                extraction_result, chunks, chunks_skipped = self._extract_chunks(
+                    document.page_content, config
+                )
+        except Exception:
+            if self.metrics_sink is not None:
+                self.metrics_sink.increment(DOCUMENT_FAILURES)
+            raise
+        return self._to_document_extraction(
+            extraction_result,
+            uid,
+            source_uid,
+            usage_handler,
+            started,
+            chunks,
+            chunks_skipped,
+        )
+
+    def _to_document_extraction(
+        self,
+        extraction_result: Extraction,
+        uid: str,
+        source_uid: str,
+        usage_handler: UsageCallbackHandler,
+        started: float,
+        chunks: Optional[List[ChunkExtraction]] = None,
+        chunks_skipped: Optional[int] = None,
+        skipped: bool = False,
+    ) -> DocumentExtraction:
+        """Assemble the document extraction and report it to the metrics sink."""
+        # All the calls of the document are done or were cancelled.
+        usage_handler.end_pending_runs()
+        document_extraction: DocumentExtraction = {
             "uid": uid,
             "source_uid": source_uid,
             "data": extraction_result["data"],
             "raw": extraction_result["raw"],
             "validated_data": extraction_result["validated_data"],
             "errors": extraction_result["errors"],
+            "usage": usage_handler.get_usage(self.pricing),
         }
+        if chunks is not None:
+            document_extraction["chunks"] = chunks
+        if chunks_skipped is not None:
+            document_extraction["chunks_skipped"] = chunks_skipped
+        if "latency_saved" in extraction_result:
+            document_extraction["latency_saved"] = extraction_result["latency_saved"]
+        if self.prefilter is not None:
+            document_extraction["skipped"] = skipped
+        labels = None
+        if "tier" in extraction_result:
+            document_extraction["tier"] = extraction_result["tier"]
+            labels = {"tier": str(extraction_result["tier"])}
+        if self.metrics_sink is not None:
+            record_document_extraction(
+                self.metrics_sink,
+                document_extraction,
+                time.perf_counter() - started,
+                labels,
+            )
+        return document_extraction
+
+
+async def _aenumerate(
+    documents: Union[Iterable[Document], AsyncIterable[Document]]
+) -> AsyncIterator[Tuple[int, Document]]:
+    """Enumerate either a sync or an async iterable of documents."""
+    if isinstance(documents, AsyncIterable):
+        idx = 0
+        async for document in documents:
+            yield idx, document
+            idx += 1
+    else:
+        for idx, document in enumerate(documents):
+            yield idx, document
+
+
+async def _extract_from_document_with_semaphore(
+    semaphore: asyncio.Semaphore,
+    extractor: _DocumentExtractor,
+    document: Document,
+    uid: str,
+    source_uid: str,
+) -> DocumentExtraction:
+    """Extract from document with a semaphore to limit concurrency."""
+    processed = False
+    if extractor.executor is not None and extractor.document_processor is not None:
+        # Process the document in the executor before acquiring the semaphore,
+        # so that processing overlaps with the LLM calls for other documents.
+        try:
+            document = await extractor.aprocess(document)
+        except Exception:
+            if extractor.metrics_sink is not None:
+                extractor.metrics_sink.increment(DOCUMENT_FAILURES)
+            raise
+        processed = True
+    async with semaphore:
+        return await extractor.aextract(document, uid, source_uid, processed=processed)
 
 
 # PUBLIC API
 
 
 def create_extraction_chain(
-    llm: BaseLanguageModel,
+    llm: Union[BaseLanguageModel, Sequence[BaseLanguageModel]],
     node: Object,
     *,
     encoder_or_encoder_class: Union[Type[Encoder], Encoder, str] = "csv",
@@ -53,17 +682,31 @@ def create_extraction_chain(
     input_formatter: InputFormatter = None,
     instruction_template: Optional[PromptTemplate] = None,
     verbose: Optional[bool] = None,
+    metrics_sink: Optional[MetricsSink] = None,
+    escalation_policy: Optional[EscalationPolicy] = None,
+    max_attributes_per_chain: Optional[int] = None,
+    key_attributes: Sequence[str] = (),
+    use_aliases: bool = False,
+    use_tool_calling: bool = False,
+    grammar: Union[str, GrammarBinding, None] = None,
+    use_stop_sequences: bool = True,
+    max_output_records: Optional[int] = None,
     **encoder_kwargs: Any,
 ) -> Runnable:
     """Create an extraction chain.
     
     Args:
-        llm: the language model used for extraction
+        llm: the language model used for extraction, or a list of language models
+             ordered from the cheapest to the strongest to create a cascade.
+             A cascade runs the first model and escalates to the next one
+             when the escalation policy rejects the extraction, and records
+             the tier of the model that produced the extraction under "tier".
+             See `kor.extraction.cascade`.
         node: the schematic description of what to extract from text
         encoder_or_encoder_class: Either an encoder instance, an encoder class
                                   or a string representing the encoder class
         type_descriptor: either a TypeDescriptor or a string representing the type \
-                         descriptor name
+                         descriptor name ("typescript", "bullet_point" or "compact")
         validator: optional validator to use for validation
         input_formatter: the formatter to use for encoding the input. Used for \
                          both input examples and the text to be analyzed.
@@ -81,6 +724,42 @@ def create_extraction_chain(
             langchain_core.globals.set_debug instead.
             Please reference this guide for more information:
             https://python.langchain.com/v0.2/docs/how_to/debugging
+        metrics_sink: optional sink to report the duration and size of every
+             stage of the chain (prompt formatting, LLM call, decoding and
+             validation). See `kor.extraction.metrics`.
+        escalation_policy: the escalation policy of a cascade of models, defaults
+             to escalating on parse and validation errors
+        max_attributes_per_chain: if provided, schemas with more top level
+             attributes are partitioned into groups of attributes, with one chain
+             per group. The chains run concurrently on the same text, and the
+             records are merged into the shape of the schema before validation.
+             See `kor.extraction.partition`.
+        key_attributes: ids of the attributes that identify a record, used to
+             align the records of a partitioned schema. Required for
+             partitioned schemas with many=True.
+        use_aliases: if True, attributes are given short aliases
+             (`a1`, `a2`, ...) in the type description, the examples and the
+             output of the model, which saves tokens for long ids. The ids are
+             restored before validation. See `kor.compiled.compile_schema`.
+        use_tool_calling: if True, the schema is bound to the model as a tool
+             that the model must call, and the arguments of the tool call are
+             validated without any parsing. Examples are rendered as tool
+             calls. Requires a chat model that supports `bind_tools`; the
+             encoder is then only used to render the prompt as a string.
+             See `kor.extraction.tools`.
+        grammar: constrain the output of the model with a grammar compiled from
+             the schema and the encoder (JSON or CSV). Either the name of a
+             binding ("llama.cpp" or "vllm" servers) or a function that maps
+             the grammar to keyword arguments of the model. See `kor.grammars`.
+        use_stop_sequences: if True, the stop sequences of the encoder (e.g.,
+             the closing </json> tag) are bound to the model, so that the model
+             stops right after the payload. Disable for models that do not
+             support stop sequences.
+        max_output_records: if provided, `max_tokens` is bound to the model,
+             estimated from the size of the records of the encoded examples
+             times the number of records. Bounds the generation time of
+             schemas with many=True.
+             See `kor.encoders.estimate_max_output_tokens`.
         encoder_kwargs: Keyword arguments to pass to the encoder class
 
     Returns:
@@ -107,25 +786,162 @@ def create_extraction_chain(
 
     if not isinstance(node, Object):
         raise ValueError(f"node must be an Object got {type(node)}")
-    encoder = initialize_encoder(encoder_or_encoder_class, node, **encoder_kwargs)
-    type_descriptor_to_use = initialize_type_descriptors(type_descriptor)
 
-    prompt = create_langchain_prompt(
-        node,
-        encoder,
-        type_descriptor_to_use,
-        validator=validator,
-        instruction_template=instruction_template,
-        input_formatter=input_formatter,
+    if max_attributes_per_chain is not None and len(node.attributes) > (
+        max_attributes_per_chain + len(key_attributes)
+    ):
+        if node.many and not key_attributes:
+            raise ValueError(
+                "key_attributes are required to partition a schema with many=True."
+            )
+        if isinstance(encoder_or_encoder_class, Encoder):
+            raise ValueError(
+                "Partitioned schemas require an encoder class or name, since every"
+                " partition needs its own encoder."
+            )
+        chains = [
+            create_extraction_chain(
+                llm,
+                sub_node,
+                encoder_or_encoder_class=encoder_or_encoder_class,
+                type_descriptor=type_descriptor,
+                input_formatter=input_formatter,
+                instruction_template=instruction_template,
+                metrics_sink=metrics_sink,
+                escalation_policy=escalation_policy,
+                use_aliases=use_aliases,
+                use_tool_calling=use_tool_calling,
+                grammar=grammar,
+                use_stop_sequences=use_stop_sequences,
+                max_output_records=max_output_records,
+                **encoder_kwargs,
+            )
+            for sub_node in partition_schema(
+                node, max_attributes_per_chain, key_attributes=key_attributes
+            )
+        ]
+        return PartitionedExtractionChain(
+            chains=chains,
+            node=node,
+            key_attributes=key_attributes,
+            validator=validator,
+            metrics_sink=metrics_sink,
+        )
+
+    compiled: Optional[CompiledSchema] = None
+    encoder_node = node
+    if use_tool_calling and grammar is not None:
+        raise ValueError("Grammars cannot be used with tool calling.")
+    if use_tool_calling:
+        encoder_or_encoder_class = JSONEncoder(use_tags=False)
+        encoder_kwargs = {}
+    if use_aliases:
+        if isinstance(encoder_or_encoder_class, SchemaBasedEncoder):
+            raise ValueError(
+                "Aliases require an encoder class or name, since the encoder must"
+                " be created for the aliased schema."
+            )
+        compiled = compile_schema(node, use_aliases=True)
+        encoder_node = compiled.prompt_node
+
+    encoder = initialize_encoder(
+        encoder_or_encoder_class, encoder_node, **encoder_kwargs
     )
+    type_descriptor_to_use = initialize_type_descriptors(type_descriptor)
+
+    model_kwargs: Dict[str, Any] = {}
+    if grammar is not None:
+        binding = get_grammar_binding(grammar)
+        model_kwargs.update(binding(to_grammar(encoder_node, encoder)))
+    stop_sequences: List[str] = []
+    if use_stop_sequences and not use_tool_calling:
+        stop_sequences = encoder.get_stop_sequences()
+        if stop_sequences:
+            model_kwargs["stop"] = stop_sequences
+    if max_output_records is not None:
+        model_kwargs["max_tokens"] = estimate_max_output_tokens(
+            encoder_node,
+            encoder,
+            expected_records=max_output_records,
+            examples=compiled.examples if compiled is not None else None,
+        )
+
+    prompt: ExtractionPromptTemplate
+    parser: KorParser
+    if use_tool_calling:
+        prompt = ToolCallPromptTemplate(
+            input_variables=["text"],
+            encoder=encoder,
+            node=node,
+            input_formatter=input_formatter,
+            type_descriptor=type_descriptor_to_use,
+            instruction_template=instruction_template or DEFAULT_INSTRUCTION_TEMPLATE,
+            metrics_sink=metrics_sink,
+            compiled=compiled,
+        )
+        parser = ToolCallParser(
+            encoder=encoder,
+            validator=validator,
+            schema_=node,
+            metrics_sink=metrics_sink,
+            compiled=compiled,
+        )
+    else:
+        prompt = create_langchain_prompt(
+            node,
+            encoder,
+            type_descriptor_to_use,
+            validator=validator,
+            instruction_template=instruction_template,
+            input_formatter=input_formatter,
+            metrics_sink=metrics_sink,
+            compiled=compiled,
+        )
+        parser = KorParser(
+            encoder=encoder,
+            validator=validator,
+            schema_=node,
+            metrics_sink=metrics_sink,
+            compiled=compiled,
+            stop_sequences=stop_sequences,
+        )
+
+    def _make_chain(model: BaseLanguageModel, config: RunnableConfig) -> Runnable:
+        """Chain the prompt, the model and the parser."""
+        model_runnable: Runnable = model.bind(**model_kwargs) if model_kwargs else model
+        if use_tool_calling:
+            if not isinstance(model, BaseChatModel):
+                raise ValueError("Tool calling requires chat models.")
+            tool = to_tool(encoder_node)
+            model_runnable = model.bind_tools(
+                [tool], tool_choice=tool["function"]["name"], **model_kwargs
+            )
+        if config:
+            model_runnable = model_runnable.with_config(config)
+        if use_tool_calling:
+            return prompt | model_runnable | parser
+        return prompt | model_runnable | StrOutputParser() | parser
+
+    if isinstance(llm, BaseLanguageModel):
+        llm_config: RunnableConfig = {}
+        if metrics_sink is not None:
+            llm_config["callbacks"] = [MetricsCallbackHandler(metrics_sink)]
+        return _make_chain(llm, llm_config)
+
+    if not llm:
+        raise ValueError("Expected at least one language model.")
 
-    chain = (
-        prompt
-        | llm
-        | StrOutputParser()
-        | KorParser(encoder=encoder, validator=validator, schema_=node)
+    tiers: List[Runnable] = []
+    for tier, tier_llm in enumerate(llm):
+        tier_config: RunnableConfig = {"metadata": {TIER_METADATA_KEY: tier}}
+        if metrics_sink is not None:
+            tier_config["callbacks"] = [
+                MetricsCallbackHandler(metrics_sink, {"tier": str(tier)})
+            ]
+        tiers.append(_make_chain(tier_llm, tier_config))
+    return ExtractionCascade(
+        tiers=tiers, policy=escalation_policy or EscalationPolicy()
     )
-    return chain
 
 
 async def extract_from_documents(
@@ -136,14 +952,27 @@ async def extract_from_documents(
     use_uid: bool = False,
     extraction_uid_function: Optional[Callable[[Document], str]] = None,
     return_exceptions: bool = False,
+    metrics_sink: Optional[MetricsSink] = None,
+    pricing: Union[ModelPricing, Sequence[ModelPricing], None] = None,
+    document_processor: Optional[AbstractDocumentProcessor] = None,
+    executor: Optional[Executor] = None,
+    chunker: Optional[TokenChunker] = None,
+    chunk_concurrency: int = 1,
+    early_stopping: bool = False,
+    chunk_priority: Optional[Callable[[TextChunk], float]] = None,
+    prefilter: Optional[SchemaPrefilter] = None,
+    retriever: Optional[ChunkRetriever] = None,
+    stream: bool = False,
+    max_continuations: int = 0,
 ) -> List[Union[DocumentExtraction, Exception]]:
     """Run extraction through all the given documents.
 
     Attention: When using this function with a large number of documents, mind the bill
                since this can use a lot of tokens!
 
-    Concurrency is currently limited using a semaphore. This is a temporary
-    and can be changed to a queue implementation to support a non-materialized stream
+    Concurrency is limited using a semaphore. All documents are scheduled up front
+    and all results are held in memory until extraction is done for all of them.
+    Use `extract_from_documents_iter` for large or non-materialized collections
     of documents.
 
     Args:
@@ -158,37 +987,301 @@ async def extract_from_documents(
              a given DocumentExtraction. If not provided, will use the uid
              of the document.
         return_exceptions: named argument passed to asyncio.gather
+        metrics_sink: optional sink to report per document metrics to
+             (duration, parse errors and failures)
+        pricing: optional pricing of the model used to compute the cost of every
+             document extraction, for a cascade of models, a sequence with the
+             pricing of every model (raises a ValueError if its length does not
+             match). Use `kor.extraction.usage.aggregate_usage` to get the total
+             token usage and cost of the run.
+        document_processor: optional processor to apply to every document before
+             extraction (e.g., to convert HTML to markdown)
+        executor: optional executor (e.g., a ProcessPoolExecutor) to run CPU
+             bound work in: processing the documents and parsing the LLM output.
+             The LLM calls remain on the event loop. Documents are processed
+             before waiting for a free slot (see `max_concurrency`), so that
+             processing overlaps with the LLM calls for other documents.
+             If not provided, all work is done on the event loop.
+             Using an executor requires a chain
+             created with `create_extraction_chain`, and when using a process
+             pool, the document processor and the validator must be picklable.
+        chunker: optional chunker used to split long documents into chunks that
+             fit the context window of the model. Extraction runs on every
+             chunk and the results are merged into a single DocumentExtraction
+             with the provenance of the records under "chunks".
+             Requires a chain created with `create_extraction_chain`.
+        chunk_concurrency: the maximum number of concurrent requests to make
+             for the chunks of a single document
+        early_stopping: If True, stop processing the chunks of a document as soon
+             as one chunk yields a result without errors, and cancel the chunk
+             requests in flight. Only supported for schemas with many=False.
+             The number of chunks that were not processed is reported
+             under "chunks_skipped".
+        chunk_priority: optional function that scores chunks; chunks with higher
+             scores are processed first. Defaults to the document order, or to
+             the order of the retrieval scores when a retriever is used.
+        prefilter: optional prefilter (see `kor.extraction.prefilter`) used to skip
+             documents that contain nothing relevant to the schema without
+             calling the LLM. Skipped documents yield an empty extraction
+             with "skipped" set to True.
+        retriever: optional retriever (see `kor.extraction.retrieval`) used to
+             only send the chunks that are most relevant to the schema, within
+             a token budget. Requires a chunker. The number of chunks that were
+             not sent is reported under "chunks_skipped".
+        stream: if True, stream the output of the LLM and close the stream as
+             soon as the payload is complete (see `kor.extraction.streaming`).
+             The estimated latency saved is reported under "latency_saved"
+             only when a token budget is bound to the model, e.g., `max_tokens`
+             or `max_output_records` of `create_extraction_chain`: without a
+             budget, the length of the rest of the output is unknown and
+             "latency_saved" is not reported. Not used with tool calling.
+        max_continuations: maximum number of continuation requests made when the
+             output of the LLM is cut off by its token budget (see
+             `kor.extraction.continuation`), for schemas with many=True. The
+             records of all the outputs are stitched together. Defaults to 0,
+             i.e., truncated outputs fail to parse.
 
     Returns:
         A list of extraction results
         if return_exceptions = True, the exceptions may be returned as well.
     """
     semaphore = asyncio.Semaphore(value=max_concurrency)
+    extractor = _DocumentExtractor(
+        chain,
+        metrics_sink=metrics_sink,
+        pricing=pricing,
+        document_processor=document_processor,
+        executor=executor,
+        chunker=chunker,
+        chunk_concurrency=chunk_concurrency,
+        early_stopping=early_stopping,
+        chunk_priority=chunk_priority,
+        prefilter=prefilter,
+        retriever=retriever,
+        stream=stream,
+        max_continuations=max_continuations,
+    )
 
     tasks = []
     for idx, doc in enumerate(documents):
-        if use_uid:
-            source_uid = doc.metadata.get("uid")
-            if source_uid is None:
-                raise ValueError(
-                    f"uid not found in document metadata for document {idx}"
-                )
-            # C
-            source_uid = str(source_uid)
-        else:
-            source_uid = str(idx)
-
-        extraction_uid = (
-            extraction_uid_function(doc) if extraction_uid_function else source_uid
+        extraction_uid, source_uid = _get_document_uids(
+            idx, doc, use_uid, extraction_uid_function
         )
 
         tasks.append(
             asyncio.ensure_future(
                 _extract_from_document_with_semaphore(
-                    semaphore, chain, doc, extraction_uid, source_uid
+                    semaphore, extractor, doc, extraction_uid, source_uid
                 )
             )
         )
 
     results = await asyncio.gather(*tasks, return_exceptions=return_exceptions)
     return results
+
+
+async def extract_from_documents_iter(
+    chain: Runnable,
+    documents: Union[Iterable[Document], AsyncIterable[Document]],
+    *,
+    max_concurrency: int = 1,
+    max_pending_factor: int = 2,
+    preserve_order: bool = True,
+    use_uid: bool = False,
+    extraction_uid_function: Optional[Callable[[Document], str]] = None,
+    return_exceptions: bool = False,
+    metrics_sink: Optional[MetricsSink] = None,
+    pricing: Union[ModelPricing, Sequence[ModelPricing], None] = None,
+    document_processor: Optional[AbstractDocumentProcessor] = None,
+    executor: Optional[Executor] = None,
+    chunker: Optional[TokenChunker] = None,
+    chunk_concurrency: int = 1,
+    early_stopping: bool = False,
+    chunk_priority: Optional[Callable[[TextChunk], float]] = None,
+    prefilter: Optional[SchemaPrefilter] = None,
+    retriever: Optional[ChunkRetriever] = None,
+    stream: bool = False,
+    max_continuations: int = 0,
+) -> AsyncIterator[Union[DocumentExtraction, Exception]]:
+    """Run extraction through the given documents, yielding results as they arrive.
+
+    Unlike `extract_from_documents`, documents are pulled lazily from the
+    (possibly async) iterable, and at most `max_pending_factor * max_concurrency`
+    documents are in flight at any time. Results are not retained once they
+    have been yielded, so memory usage is proportional to the concurrency
+    rather than to the number of documents. The other arguments are the same
+    as for `extract_from_documents`.
+
+    Examples:
+
+    .. code-block:: python
+
+        async for result in extract_from_documents_iter(
+            chain, documents, max_concurrency=10
+        ):
+            sink.write(result)
+
+    Args:
+        chain: the extraction chain to use for extraction
+        documents: the documents to run extraction on, either an iterable
+            or an async iterable
+        max_pending_factor: the number of documents scheduled ahead of time
+            for every concurrent request. Scheduling ahead keeps all the
+            request slots busy while results wait to be consumed.
+        preserve_order: If True, results are yielded in the order of the
+            documents. If False, results are yielded as soon as they complete,
+            so a slow document does not hold back the results behind it.
+        return_exceptions: If True, exceptions are yielded in place of the
+             corresponding results, otherwise the first exception is raised
+             and all pending work is cancelled.
+
+    Yields:
+        Extraction results (and exceptions if return_exceptions = True)
+    """
+    if max_concurrency < 1 or max_pending_factor < 1:
+        raise ValueError("max_concurrency and max_pending_factor must be positive")
+
+    max_pending = max_pending_factor * max_concurrency
+    semaphore = asyncio.Semaphore(value=max_concurrency)
+    extractor = _DocumentExtractor(
+        chain,
+        metrics_sink=metrics_sink,
+        pricing=pricing,
+        document_processor=document_processor,
+        executor=executor,
+        chunker=chunker,
+        chunk_concurrency=chunk_concurrency,
+        early_stopping=early_stopping,
+        chunk_priority=chunk_priority,
+        prefilter=prefilter,
+        retriever=retriever,
+        stream=stream,
+        max_continuations=max_continuations,
+    )
+    indexed_documents = _aenumerate(documents)
+    pending: Deque["asyncio.Future[DocumentExtraction]"] = deque()
+    exhausted = False
+
+    try:
+        while True:
+            while not exhausted and len(pending) < max_pending:
+                try:
+                    idx, document = await indexed_documents.__anext__()
+                except StopAsyncIteration:
+                    exhausted = True
+                    break
+                extraction_uid, source_uid = _get_document_uids(
+                    idx, document, use_uid, extraction_uid_function
+                )
+                pending.append(
+                    asyncio.ensure_future(
+                        _extract_from_document_with_semaphore(
+                            semaphore, extractor, document, extraction_uid, source_uid
+                        )
+                    )
+                )
+
+            if not pending:
+                break
+
+            if preserve_order:
+                future = pending.popleft()
+                await asyncio.wait([future])
+            else:
+                done, _ = await asyncio.wait(
+                    pending, return_when=asyncio.FIRST_COMPLETED
+                )
+                future = done.pop()
+                pending.remove(future)
+
+            exception = future.exception()
+            if exception is None:
+                yield future.result()
+            elif return_exceptions and isinstance(exception, Exception):
+                yield exception
+            else:
+                raise exception
+    finally:
+        for future in pending:
+            future.cancel()
+
+
+def extract_from_documents_sync(
+    chain: Runnable,
+    documents: Sequence[Document],
+    *,
+    max_concurrency: int = 1,
+    use_uid: bool = False,
+    extraction_uid_function: Optional[Callable[[Document], str]] = None,
+    return_exceptions: bool = False,
+    metrics_sink: Optional[MetricsSink] = None,
+    pricing: Union[ModelPricing, Sequence[ModelPricing], None] = None,
+    document_processor: Optional[AbstractDocumentProcessor] = None,
+    chunker: Optional[TokenChunker] = None,
+    early_stopping: bool = False,
+    chunk_priority: Optional[Callable[[TextChunk], float]] = None,
+    prefilter: Optional[SchemaPrefilter] = None,
+    retriever: Optional[ChunkRetriever] = None,
+    max_continuations: int = 0,
+) -> List[Union[DocumentExtraction, Exception]]:
+    """Run extraction through all the given documents using a thread pool.
+
+    Sync counterpart of `extract_from_documents` for code that cannot run an
+    event loop. The chain is invoked from a bounded pool of threads, which is
+    appropriate since the LLM calls are I/O bound. Documents are processed in
+    the worker threads, and the chunks of a document are processed sequentially.
+    The other arguments are the same as for `extract_from_documents`, except
+    for the ones that require an event loop (`executor`, `chunk_concurrency`
+    and `stream`).
+
+    Attention: When using this function with a large number of documents, mind the bill
+               since this can use a lot of tokens!
+
+    Args:
+        chain: the extraction chain to use for extraction
+        documents: the documents to run extraction on
+        max_concurrency: the maximum number of concurrent requests to make,
+                         corresponds to the number of worker threads
+        return_exceptions: If True, exceptions are returned in place of the
+             corresponding results, otherwise the first exception is raised.
+
+    Returns:
+        A list of extraction results in the same order as the documents
+        if return_exceptions = True, the exceptions may be returned as well.
+    """
+    uids = [
+        _get_document_uids(idx, doc, use_uid, extraction_uid_function)
+        for idx, doc in enumerate(documents)
+    ]
+
+    extractor = _DocumentExtractor(
+        chain,
+        metrics_sink=metrics_sink,
+        pricing=pricing,
+        document_processor=document_processor,
+        chunker=chunker,
+        early_stopping=early_stopping,
+        chunk_priority=chunk_priority,
+        prefilter=prefilter,
+        retriever=retriever,
+        max_continuations=max_continuations,
+    )
+    results: List[Union[DocumentExtraction, Exception]] = []
+
+    with ThreadPoolExecutor(max_workers=max_concurrency) as executor:
+        futures = [
+            executor.submit(extractor.extract, doc, extraction_uid, source_uid)
+            for doc, (extraction_uid, source_uid) in zip(documents, uids)
+        ]
+
+        for future in futures:
+            try:
+                results.append(future.result())
+            except Exception as e:
+                if not return_exceptions:
+                    for pending_future in futures:
+                        pending_future.cancel()
+                    raise
+                results.append(e)
+
+    return results
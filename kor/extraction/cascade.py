@@ -0,0 +1,135 @@
+"""Run a cascade of models, escalating to a stronger model when extraction fails.
+
+Most documents can be handled by a small, cheap model. A cascade runs the
+first model and only escalates to the next model in the cascade when the
+escalation policy rejects the extraction (e.g., the output could not be parsed
+or did not pass validation).
+
+Every extraction produced by a cascade records the tier (index of the model in
+the cascade) that produced it. When a metrics sink is used, LLM latencies and
+token counts are labeled with the tier, and so are the duration and cost of
+every document, which shows whether the cascade pays off.
+
+Examples:
+
+.. code-block:: python
+
+    chain = create_extraction_chain(
+        [small_llm, large_llm],
+        schema,
+        escalation_policy=EscalationPolicy(on_empty_result=True),
+    )
+    results = await extract_from_documents(
+        chain, documents, pricing=[small_pricing, large_pricing]
+    )
+"""
+from __future__ import annotations
+
+from typing import Any, List, Optional
+
+from langchain_core.runnables import Runnable, RunnableConfig, RunnableSerializable
+from pydantic import ConfigDict
+
+from kor.exceptions import ParseError
+from kor.extraction.prefilter import SchemaPrefilter
+from kor.extraction.typedefs import Extraction
+
+
+def _get_text(input: Any) -> str:
+    """Get the text to analyze from the input of an extraction chain."""
+    if isinstance(input, dict):
+        return str(input.get("text", ""))
+    return str(input)
+
+
+# PUBLIC API
+
+
+class EscalationPolicy:
+    """Decide whether to escalate an extraction to the next model of a cascade.
+
+    Subclass and override `should_escalate` to implement other policies.
+    """
+
+    def __init__(
+        self,
+        *,
+        on_parse_error: bool = True,
+        on_validation_error: bool = True,
+        on_empty_result: bool = False,
+        prefilter: Optional[SchemaPrefilter] = None,
+    ) -> None:
+        """Initialize the policy.
+
+        Args:
+            on_parse_error: escalate if the output could not be parsed
+            on_validation_error: escalate if the validator reported errors
+            on_empty_result: escalate if nothing was extracted
+            prefilter: if provided, only escalate empty results for texts
+                that pass the prefilter (i.e., texts where data is expected)
+        """
+        self.on_parse_error = on_parse_error
+        self.on_validation_error = on_validation_error
+        self.on_empty_result = on_empty_result
+        self.prefilter = prefilter
+
+    def should_escalate(self, text: str, extraction: Extraction) -> bool:
+        """Determine whether to escalate the extraction to the next model.
+
+        Args:
+            text: the text that was analyzed
+            extraction: the extraction produced by the current model
+
+        Returns:
+            True to run the next model of the cascade
+        """
+        errors = extraction["errors"]
+        if self.on_parse_error and any(isinstance(e, ParseError) for e in errors):
+            return True
+        if self.on_validation_error and any(
+            not isinstance(e, ParseError) for e in errors
+        ):
+            return True
+        if self.on_empty_result and not errors and not extraction["data"]:
+            return self.prefilter is None or self.prefilter.matches(text)
+        return False
+
+
+class ExtractionCascade(RunnableSerializable[Any, Extraction]):
+    """An extraction chain that escalates through a cascade of models.
+
+    Use `create_extraction_chain` with a list of models to create a cascade.
+    """
+
+    tiers: List[Runnable]
+    """Extraction chains, one per model, from the cheapest to the strongest."""
+    policy: EscalationPolicy
+    model_config = ConfigDict(arbitrary_types_allowed=True)
+
+    def is_final(self, tier: int, input: Any, extraction: Extraction) -> bool:
+        """Determine whether the extraction of the given tier is the final one."""
+        return tier == len(self.tiers) - 1 or not self.policy.should_escalate(
+            _get_text(input), extraction
+        )
+
+    def invoke(
+        self, input: Any, config: Optional[RunnableConfig] = None, **kwargs: Any
+    ) -> Extraction:
+        """Run the cascade."""
+        for tier, chain in enumerate(self.tiers):
+            extraction = chain.invoke(input, config, **kwargs)
+            extraction["tier"] = tier
+            if self.is_final(tier, input, extraction):
+                break
+        return extraction
+
+    async def ainvoke(
+        self, input: Any, config: Optional[RunnableConfig] = None, **kwargs: Any
+    ) -> Extraction:
+        """Run the cascade."""
+        for tier, chain in enumerate(self.tiers):
+            extraction = await chain.ainvoke(input, config, **kwargs)
+            extraction["tier"] = tier
+            if self.is_final(tier, input, extraction):
+                break
+        return extraction
@@ -0,0 +1,296 @@
+"""Split long documents into chunks that fit the context window of the model.
+
+The prompt used for extraction is made of a fixed prefix (instructions, type
+description and examples) followed by the text to analyze. The chunker sizes
+chunks so that the prefix, a chunk and the expected output fit within the
+context window of the model.
+
+Chunks overlap to avoid losing records that straddle a chunk boundary. As a
+result, the same record may be extracted from two consecutive chunks; records
+are de-duplicated when the extractions from all the chunks are merged back
+into a single extraction.
+"""
+import json
+import re
+from typing import Any, List, Optional, Sequence, Tuple
+
+from pydantic import BaseModel
+
+from kor.extraction.typedefs import ChunkExtraction, Extraction, TextChunk
+from kor.tokens import TokenCounter, estimate_num_tokens
+
+# Splits text into lines, keeping the line breaks.
+_LINES = re.compile(r"[^\n]*\n|[^\n]+")
+# Splits text into words, keeping the whitespace that follows each word.
+_WORDS = re.compile(r"\s*\S+\s*|\s+")
+
+
+def _to_record_key(record: Any) -> str:
+    """Get a canonical representation of a record used for de-duplication."""
+    if isinstance(record, BaseModel):
+        record = record.model_dump()
+    return json.dumps(record, sort_keys=True, default=str)
+
+
+def _get_seam_overlap(keys: Sequence[str], new_keys: Sequence[str]) -> int:
+    """Get the length of the longest run of keys that ends `keys` and starts
+    `new_keys`, i.e., the records repeated at the seam of two outputs."""
+    overlap = min(len(keys), len(new_keys))
+    while overlap and keys[len(keys) - overlap :] != new_keys[:overlap]:
+        overlap -= 1
+    return overlap
+
+
+# PUBLIC API
+
+
+class TokenChunker:
+    """Split text into overlapping chunks that are sized in tokens.
+
+    Text is split on line boundaries when possible, then on word boundaries
+    and finally on character boundaries for exceptionally long words.
+
+    Examples:
+
+    .. code-block:: python
+
+        chunker = TokenChunker(
+            context_window=8_000,
+            max_output_tokens=1_000,
+            overlap=100,
+            token_counter=llm.get_num_tokens,
+        )
+        results = await extract_from_documents(chain, documents, chunker=chunker)
+    """
+
+    def __init__(
+        self,
+        context_window: int,
+        *,
+        max_output_tokens: int = 1_000,
+        overlap: int = 0,
+        token_counter: TokenCounter = estimate_num_tokens,
+    ) -> None:
+        """Initialize the chunker.
+
+        Args:
+            context_window: the size of the context window of the model in tokens
+            max_output_tokens: number of tokens to reserve for the output
+            overlap: number of tokens shared by consecutive chunks
+            token_counter: function used to count tokens, e.g., llm.get_num_tokens
+        """
+        if overlap < 0:
+            raise ValueError("overlap must be non-negative")
+        self.context_window = context_window
+        self.max_output_tokens = max_output_tokens
+        self.overlap = overlap
+        self.token_counter = token_counter
+
+    def get_chunk_size(self, prefix: str) -> int:
+        """Get the number of tokens available for the text of each chunk.
+
+        Args:
+            prefix: the part of the prompt that is sent with every chunk
+                    (instructions, type description and examples)
+
+        Returns:
+            the chunk size in tokens
+        """
+        chunk_size = (
+            self.context_window - self.token_counter(prefix) - self.max_output_tokens
+        )
+        if chunk_size <= self.overlap:
+            raise ValueError(
+                f"The prompt prefix leaves {chunk_size} tokens for the text in a"
+                f" context window of {self.context_window} tokens. Increase the"
+                " context window, shrink the prompt or reduce the overlap."
+            )
+        return chunk_size
+
+    def _split_into_pieces(
+        self, text: str, start: int, pattern: Optional["re.Pattern[str]"], size: int
+    ) -> List[Tuple[int, int, int]]:
+        """Split text into pieces of at most `size` tokens.
+
+        Returns:
+            list of (start, end, num_tokens) tuples with offsets in the document
+        """
+        pieces: List[Tuple[int, int, int]] = []
+        if pattern is None:
+            # Fall back to fixed size windows of characters.
+            step = max(1, int(len(text) * size / max(self.token_counter(text), 1)))
+            segments = [
+                (i, min(i + step, len(text))) for i in range(0, len(text), step)
+            ]
+        else:
+            segments = [match.span() for match in pattern.finditer(text)]
+
+        next_pattern = _WORDS if pattern is _LINES else None
+
+        for segment_start, segment_end in segments:
+            segment = text[segment_start:segment_end]
+            num_tokens = self.token_counter(segment)
+            if num_tokens > size and pattern is not None:
+                pieces.extend(
+                    self._split_into_pieces(
+                        segment, start + segment_start, next_pattern, size
+                    )
+                )
+            else:
+                pieces.append(
+                    (start + segment_start, start + segment_end, min(num_tokens, size))
+                )
+        return pieces
+
+    def split(self, text: str, chunk_size: int) -> List[TextChunk]:
+        """Split the text into overlapping chunks.
+
+        Args:
+            text: the text to split
+            chunk_size: maximal number of tokens per chunk (see `get_chunk_size`)
+
+        Returns:
+            chunks with offsets into the original text
+        """
+        pieces = self._split_into_pieces(text, 0, _LINES, chunk_size)
+        chunks: List[TextChunk] = []
+        idx = 0
+
+        while idx < len(pieces):
+            num_tokens = 0
+            end_idx = idx
+            while (
+                end_idx < len(pieces) and num_tokens + pieces[end_idx][2] <= chunk_size
+            ):
+                num_tokens += pieces[end_idx][2]
+                end_idx += 1
+            end_idx = max(end_idx, idx + 1)
+
+            start, end = pieces[idx][0], pieces[end_idx - 1][1]
+            chunks.append({"text": text[start:end], "start": start, "end": end})
+
+            if end_idx >= len(pieces):
+                break
+
+            # Step back to create the overlap, but always make progress.
+            next_idx = end_idx
+            overlap_tokens = 0
+            while (
+                next_idx - 1 > idx
+                and overlap_tokens + pieces[next_idx - 1][2] <= self.overlap
+            ):
+                next_idx -= 1
+                overlap_tokens += pieces[next_idx][2]
+            idx = next_idx
+
+        return chunks
+
+
+def merge_chunk_extractions(
+    node_id: str,
+    many: bool,
+    chunk_extractions: Sequence[Tuple[TextChunk, Extraction]],
+) -> Tuple[Extraction, List[ChunkExtraction]]:
+    """Merge the extractions from the chunks of a document into a single extraction.
+
+    For `many=True` schemas, records from all chunks are concatenated. When a
+    chunk overlaps the previous one, the records it starts with that the previous
+    chunk ended with were extracted twice from the overlap and are dropped.
+    Other identical records are kept, since they may be distinct records.
+    For `many=False` schemas, the first chunk that yielded data without errors wins,
+    or if there is no such chunk, the first chunk that yielded data.
+
+    Args:
+        node_id: the id of the extraction schema (the top level Object)
+        many: whether the schema extracts many records
+        chunk_extractions: the chunks (in document order) with their extractions
+
+    Returns:
+        the merged extraction and the provenance of the records in each chunk
+    """
+    records: List[Any] = []
+    validated_records: List[Any] = []
+    # Records of the previous chunk (keys and merged indices) and its end
+    previous_keys: List[str] = []
+    previous_indices: List[int] = []
+    previous_validated_keys: List[str] = []
+    previous_end: Optional[int] = None
+    data: Any = {}
+    validated_data: Any = {}
+    errors: List[Exception] = []
+    provenance: List[ChunkExtraction] = []
+    has_node_data = False
+    has_validated_records = False
+    # Index of the chunk that provided the data for many=False schemas
+    winner: Optional[int] = None
+    winner_has_errors = False
+
+    for chunk, extraction in chunk_extractions:
+        errors.extend(extraction["errors"])
+        chunk_data = extraction["data"].get(node_id) if extraction["data"] else None
+        indices: List[int] = []
+
+        if many:
+            has_node_data = has_node_data or chunk_data is not None
+            overlaps = previous_end is not None and chunk["start"] < previous_end
+            chunk_records = chunk_data or []
+            keys = [_to_record_key(record) for record in chunk_records]
+            overlap = _get_seam_overlap(previous_keys, keys) if overlaps else 0
+            indices.extend(previous_indices[len(previous_indices) - overlap :])
+            for record in chunk_records[overlap:]:
+                indices.append(len(records))
+                records.append(record)
+            previous_keys, previous_indices = keys, indices
+
+            chunk_validated = extraction["validated_data"]
+            validated_keys: List[str] = []
+            if isinstance(chunk_validated, list):
+                has_validated_records = True
+                validated_keys = [_to_record_key(record) for record in chunk_validated]
+                validated_overlap = (
+                    _get_seam_overlap(previous_validated_keys, validated_keys)
+                    if overlaps
+                    else 0
+                )
+                validated_records.extend(chunk_validated[validated_overlap:])
+            previous_validated_keys = validated_keys
+            previous_end = chunk["end"]
+        elif chunk_data and (
+            winner is None or (winner_has_errors and not extraction["errors"])
+        ):
+            if winner is not None:
+                provenance[winner]["records"] = []
+            winner = len(provenance)
+            winner_has_errors = bool(extraction["errors"])
+            data = {node_id: chunk_data}
+            validated_data = extraction["validated_data"]
+            indices.append(0)
+
+        provenance.append(
+            {
+                "start": chunk["start"],
+                "end": chunk["end"],
+                "raw": extraction["raw"],
+                "records": indices,
+            }
+        )
+
+    if many:
+        data = {node_id: records} if has_node_data else {}
+        validated_data = validated_records if has_validated_records else {}
+
+    merged: Extraction = {
+        "data": data,
+        "raw": "\n".join(extraction["raw"] for _, extraction in chunk_extractions),
+        "validated_data": validated_data,
+        "errors": errors,
+    }
+    tiers = [
+        extraction["tier"]
+        for _, extraction in chunk_extractions
+        if "tier" in extraction
+    ]
+    if tiers:
+        # The strongest model of a cascade that was needed for any chunk
+        merged["tier"] = max(tiers)
+    return merged, provenance
@@ -0,0 +1,310 @@
+"""Continue extractions whose output was cut off.
+
+When a document has more records than fit in the token budget of the model
+(`max_tokens`), the output is cut off in the middle of a record. Truncation is
+detected from the finish reason reported by the provider, from the output
+tokens reaching the budget, or from a payload that cannot be decoded.
+
+The model is then asked to resume after the last complete record, with the
+output so far in the conversation. Every output is decoded with the encoder
+(see `Encoder.decode_partial`), and the records that the model repeats at the
+seam between two outputs are dropped.
+
+Only the records of schemas with many=True can be resumed.
+"""
+import asyncio
+from concurrent.futures import Executor
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple, TypeVar, Union
+
+from langchain_core.messages import AIMessage, BaseMessage, HumanMessage
+from langchain_core.output_parsers import StrOutputParser
+from langchain_core.runnables import Runnable, RunnableSequence
+from langchain_core.runnables.config import RunnableConfig
+
+from kor.exceptions import ParseError
+from kor.extraction.chunking import _get_seam_overlap, _to_record_key
+from kor.extraction.metrics import CONTINUATIONS, PARSE_ERRORS
+from kor.extraction.parser import KorParser, _get_executor_parser
+from kor.extraction.streaming import get_max_tokens
+from kor.extraction.typedefs import Extraction
+from kor.prompts import ExtractionPromptTemplate
+
+CONTINUATION_INSTRUCTION = (
+    "Your output was cut off. Continue the extraction after the last complete"
+    " record: output the remaining records in the same format, as a new output"
+    " that does not repeat the records above."
+)
+
+# Finish reasons of the providers for outputs that reached the token budget.
+TRUNCATION_REASONS = frozenset({"length", "max_tokens", "MAX_TOKENS"})
+
+_to_text = StrOutputParser()
+
+T = TypeVar("T")
+
+
+def _split_llm_chain(llm_chain: Runnable) -> Tuple[ExtractionPromptTemplate, Runnable]:
+    """Split the part of an extraction chain that calls the LLM.
+
+    Returns:
+        the prompt and the model, without the output parser
+    """
+    if not isinstance(llm_chain, RunnableSequence) or not isinstance(
+        llm_chain.first, ExtractionPromptTemplate
+    ):
+        raise ValueError(
+            "Expected a chain created with `create_extraction_chain`, got"
+            f" {type(llm_chain)}"
+        )
+    steps = llm_chain.steps[1:]
+    if isinstance(steps[-1], StrOutputParser):
+        steps = steps[:-1]
+    model = steps[0] if len(steps) == 1 else RunnableSequence(*steps)
+    return llm_chain.first, model
+
+
+def _decode(
+    parser: KorParser, text: str, truncated: bool
+) -> Tuple[Optional[Dict[str, Any]], bool]:
+    """Decode an output of the model.
+
+    Returns:
+        the decoded data if any, and whether the output was cut off
+    """
+    encoder = parser.encoder
+    data = None
+    if not truncated:
+        try:
+            data = encoder.decode(parser.restore_stop_sequence(text))
+        except ParseError:
+            pass
+    if data is None:
+        data = encoder.decode_partial(text)
+        # A payload that cannot be decoded was cut off, unless no record
+        # can be recovered from it either.
+        truncated = data is not None
+    return data, truncated
+
+
+def _parse(parser: KorParser, raw: str, records: Optional[List[Any]]) -> Extraction:
+    """Parse a single complete output, or validate the stitched records."""
+    if records is None:
+        return parser.parse(raw)
+    return parser.parse_data({parser.schema_.id: records}, raw)
+
+
+class _Continuation:
+    """Stitch the outputs of an extraction and of its continuations."""
+
+    def __init__(
+        self,
+        parser: KorParser,
+        messages: List[BaseMessage],
+        max_continuations: int,
+        max_tokens: Optional[int],
+    ) -> None:
+        """Initialize with the messages of the first request."""
+        self.parser = parser
+        self.messages = messages
+        self.max_continuations = max_continuations
+        self.max_tokens = max_tokens
+        self.outputs: List[str] = []
+        self.records: List[Any] = []
+        self.error: Optional[ParseError] = None
+        self.complete = False
+
+    def get_text(self, output: Union[str, BaseMessage]) -> Tuple[str, bool]:
+        """Get the text of an output and whether it reached the token budget."""
+        if isinstance(output, BaseMessage):
+            return _to_text.invoke(output), is_truncated(output, self.max_tokens)
+        return output, False
+
+    def add(
+        self, text: str, data: Optional[Dict[str, Any]], truncated: bool
+    ) -> Optional[List[BaseMessage]]:
+        """Add a decoded output of the model (see `_decode`).
+
+        Returns:
+            the messages of the next request, or None if the extraction is done
+        """
+        self.outputs.append(text)
+        records = (data or {}).get(self.parser.schema_.id)
+
+        if len(self.outputs) == 1 and not truncated:
+            self.complete = True
+            return None
+        if not isinstance(records, list):
+            # Keep the records so far, the model may have nothing to add.
+            if data is None:
+                self.error = ParseError("A continuation could not be decoded.")
+            return None
+
+        self.records = stitch_records(self.records, records)
+        if not truncated:
+            return None
+        if len(self.outputs) > self.max_continuations:
+            self.error = ParseError(
+                f"The output was still cut off after {self.max_continuations}"
+                " continuations, the records that followed were lost."
+            )
+            return None
+        if self.parser.metrics_sink is not None:
+            self.parser.metrics_sink.increment(CONTINUATIONS)
+        self.messages = [
+            *self.messages,
+            AIMessage(content=text),
+            HumanMessage(content=CONTINUATION_INSTRUCTION),
+        ]
+        return self.messages
+
+    @property
+    def raw(self) -> str:
+        """The raw outputs of all the requests."""
+        return "\n".join(self.outputs)
+
+    def get_records(self) -> Optional[List[Any]]:
+        """Get the stitched records, None if the first output was complete."""
+        return None if self.complete else self.records
+
+    def finish(self, extraction: Extraction) -> Extraction:
+        """Add the error of the continuations to the parsed extraction."""
+        if self.error is not None:
+            if self.parser.metrics_sink is not None:
+                self.parser.metrics_sink.increment(PARSE_ERRORS)
+            extraction["errors"].append(self.error)
+        return extraction
+
+
+# PUBLIC API
+
+
+def is_truncated(message: BaseMessage, max_tokens: Optional[int] = None) -> bool:
+    """Determine if the output of the model was cut off by the token budget.
+
+    Args:
+        message: the output of the model
+        max_tokens: the token budget of the model, if known
+
+    Returns:
+        True if the finish reason or the token usage show that the output
+        reached the budget
+    """
+    metadata = message.response_metadata
+    for key in ["finish_reason", "stop_reason"]:
+        if metadata.get(key) in TRUNCATION_REASONS:
+            return True
+    if max_tokens is not None and isinstance(message, AIMessage):
+        usage = message.usage_metadata
+        return usage is not None and usage["output_tokens"] >= max_tokens
+    return False
+
+
+def stitch_records(records: Sequence[Any], new_records: Sequence[Any]) -> List[Any]:
+    """Append the records of a continuation, dropping the ones repeated at the seam.
+
+    Args:
+        records: the records extracted so far
+        new_records: the records of the continuation
+
+    Returns:
+        the records, where the longest run of records at the end of the records so
+        far that the continuation starts with appears once
+    """
+    overlap = _get_seam_overlap(
+        [_to_record_key(record) for record in records],
+        [_to_record_key(record) for record in new_records],
+    )
+    return [*records, *new_records[overlap:]]
+
+
+def extract_with_continuation(
+    llm_chain: Runnable,
+    parser: KorParser,
+    text: str,
+    config: Optional[RunnableConfig] = None,
+    *,
+    max_continuations: int = 3,
+) -> Extraction:
+    """Extract records, resuming the output of the model if it is cut off.
+
+    Args:
+        llm_chain: the part of an extraction chain that calls the LLM, i.e.,
+            without the KorParser
+        parser: the parser of the extraction chain
+        text: the text to extract from
+        config: the config of the run
+        max_continuations: maximum number of continuation requests
+
+    Returns:
+        the extraction, with the raw outputs of all the requests
+    """
+    prompt, model = _split_llm_chain(llm_chain)
+    messages = prompt.invoke({"text": text}, config=config).to_messages()
+    continuation = _Continuation(
+        parser, messages, max_continuations, get_max_tokens(llm_chain)
+    )
+    request: Optional[List[BaseMessage]] = messages
+    while request is not None:
+        output, truncated = continuation.get_text(model.invoke(request, config=config))
+        request = continuation.add(output, *_decode(parser, output, truncated))
+    return continuation.finish(
+        _parse(parser, continuation.raw, continuation.get_records())
+    )
+
+
+async def aextract_with_continuation(
+    llm_chain: Runnable,
+    parser: KorParser,
+    text: str,
+    config: Optional[RunnableConfig] = None,
+    *,
+    max_continuations: int = 3,
+    output: Optional[str] = None,
+    executor: Optional[Executor] = None,
+) -> Extraction:
+    """Extract records, resuming the output of the model if it is cut off.
+
+    Async version of `extract_with_continuation`.
+
+    Args:
+        llm_chain: the part of an extraction chain that calls the LLM, i.e.,
+            without the KorParser
+        parser: the parser of the extraction chain
+        text: the text to extract from
+        config: the config of the run
+        max_continuations: maximum number of continuation requests
+        output: the output of the first request if it was already made
+            (e.g., streamed), in which case truncation can only be detected
+            from the payload
+        executor: optional executor to decode and parse the outputs in, while
+            the requests stay on the event loop
+
+    Returns:
+        the extraction, with the raw outputs of all the requests
+    """
+    prompt, model = _split_llm_chain(llm_chain)
+    messages = (await prompt.ainvoke({"text": text}, config=config)).to_messages()
+    continuation = _Continuation(
+        parser, messages, max_continuations, get_max_tokens(llm_chain)
+    )
+    executor_parser = _get_executor_parser(parser, executor)
+
+    async def _run(func: Callable[..., T], *args: Any) -> T:
+        """Run CPU bound work in the executor if one was provided."""
+        if executor is None:
+            return func(*args)
+        return await asyncio.get_running_loop().run_in_executor(executor, func, *args)
+
+    response: Union[str, BaseMessage, None] = output
+    request: Optional[List[BaseMessage]] = messages
+    while request is not None:
+        if response is None:
+            response = await model.ainvoke(request, config=config)
+        output, truncated = continuation.get_text(response)
+        data, truncated = await _run(_decode, executor_parser, output, truncated)
+        request = continuation.add(output, data, truncated)
+        response = None
+    extraction = await _run(
+        _parse, executor_parser, continuation.raw, continuation.get_records()
+    )
+    return continuation.finish(extraction)
@@ -0,0 +1,436 @@
+"""Instrumentation for the extraction pipeline.
+
+The extraction pipeline is composed of the following stages:
+
+* formatting the prompt (`ExtractionPromptTemplate.format_prompt`)
+* calling the LLM
+* decoding the LLM output (`Encoder.decode`)
+* validating the decoded data (`Validator.clean_data`)
+
+Each stage can report durations and sizes to a metrics sink. A sink is
+only consulted when one is provided, so the instrumentation costs close to nothing
+when it is disabled.
+
+Examples:
+
+.. code-block:: python
+
+    from kor.extraction.metrics import InMemoryMetricsSink, to_prometheus_text
+
+    sink = InMemoryMetricsSink()
+    chain = create_extraction_chain(llm, node, metrics_sink=sink)
+    await extract_from_documents(chain, documents, metrics_sink=sink)
+    print(to_prometheus_text(sink))
+"""
+from __future__ import annotations
+
+import abc
+import asyncio
+import itertools
+import threading
+import time
+from typing import Any, Dict, List, Mapping, Optional, Tuple
+from uuid import UUID
+
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.messages import AIMessage, BaseMessage, get_buffer_string
+from langchain_core.outputs import ChatGeneration, LLMResult
+
+from kor.exceptions import ParseError
+from kor.tokens import estimate_num_tokens
+
+# Names of the metrics reported by Kor.
+FORMAT_PROMPT_SECONDS = "kor_format_prompt_seconds"
+PROMPT_CHARACTERS = "kor_prompt_characters"
+LLM_SECONDS = "kor_llm_seconds"
+LLM_ERRORS = "kor_llm_errors_total"
+PROMPT_TOKENS = "kor_prompt_tokens"
+OUTPUT_TOKENS = "kor_output_tokens"
+DECODE_SECONDS = "kor_decode_seconds"
+OUTPUT_CHARACTERS = "kor_output_characters"
+PARSE_ERRORS = "kor_parse_errors_total"
+VALIDATION_SECONDS = "kor_validation_seconds"
+VALIDATION_ERRORS = "kor_validation_errors_total"
+DOCUMENT_SECONDS = "kor_document_seconds"
+DOCUMENTS = "kor_documents_total"
+DOCUMENT_PARSE_ERRORS = "kor_document_parse_errors_total"
+DOCUMENT_FAILURES = "kor_document_failures_total"
+DOCUMENT_COST = "kor_document_cost"
+DOCUMENT_PROCESSING_SECONDS = "kor_document_processing_seconds"
+CHUNKS_SKIPPED = "kor_chunks_skipped_total"
+DOCUMENTS_SKIPPED = "kor_documents_skipped_total"
+STREAMS_CANCELLED = "kor_streams_cancelled_total"
+LATENCY_SAVED_SECONDS = "kor_latency_saved_seconds"
+CONTINUATIONS = "kor_continuations_total"
+
+Labels = Optional[Mapping[str, str]]
+_LabelKey = Tuple[Tuple[str, str], ...]
+
+
+def _to_label_key(labels: Labels) -> _LabelKey:
+    """Convert labels into a hashable key."""
+    if not labels:
+        return ()
+    return tuple(sorted(labels.items()))
+
+
+class MetricSummary:
+    """Running summary of observations made for a single metric."""
+
+    __slots__ = ("count", "total", "min", "max")
+
+    def __init__(self) -> None:
+        """Initialize an empty summary."""
+        self.count = 0
+        self.total = 0.0
+        self.min = float("inf")
+        self.max = float("-inf")
+
+    def add(self, value: float) -> None:
+        """Add an observation to the summary."""
+        self.count += 1
+        self.total += value
+        if value < self.min:
+            self.min = value
+        if value > self.max:
+            self.max = value
+
+    def copy(self) -> "MetricSummary":
+        """Get a copy of the summary."""
+        summary = MetricSummary()
+        summary.count = self.count
+        summary.total = self.total
+        summary.min = self.min
+        summary.max = self.max
+        return summary
+
+    @property
+    def mean(self) -> float:
+        """Get the mean of the observations."""
+        return self.total / self.count if self.count else 0.0
+
+    def __repr__(self) -> str:
+        """Get a representation of the summary."""
+        return (
+            f"MetricSummary(count={self.count}, total={self.total}, "
+            f"min={self.min}, max={self.max})"
+        )
+
+
+class _Timer:
+    """Context manager that reports the elapsed time to a sink."""
+
+    __slots__ = ("sink", "name", "labels", "started")
+
+    def __init__(self, sink: MetricsSink, name: str, labels: Labels) -> None:
+        self.sink = sink
+        self.name = name
+        self.labels = labels
+        self.started = 0.0
+
+    def __enter__(self) -> _Timer:
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *args: Any) -> None:
+        self.sink.observe(self.name, time.perf_counter() - self.started, self.labels)
+
+
+class _NullTimer:
+    """Context manager that does nothing. Used when metrics are disabled."""
+
+    __slots__ = ()
+
+    def __enter__(self) -> _NullTimer:
+        return self
+
+    def __exit__(self, *args: Any) -> None:
+        pass
+
+
+_NULL_TIMER = _NullTimer()
+
+
+def _format_labels(labels: _LabelKey) -> str:
+    """Format labels using the Prometheus syntax."""
+    if not labels:
+        return ""
+    formatted = ",".join(
+        '{}="{}"'.format(
+            key,
+            value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"'),
+        )
+        for key, value in labels
+    )
+    return "{" + formatted + "}"
+
+
+def _format_value(value: float) -> str:
+    """Format a sample value."""
+    return repr(int(value)) if float(value).is_integer() else repr(float(value))
+
+
+# PUBLIC API
+
+
+class MetricsSink(abc.ABC):
+    """Abstract interface for a metrics sink.
+
+    Implementations must be thread-safe, since the extraction pipeline may
+    report metrics from multiple threads.
+    """
+
+    @abc.abstractmethod
+    def observe(self, name: str, value: float, labels: Labels = None) -> None:
+        """Record a single observation, e.g., a duration or a size.
+
+        Args:
+            name: the name of the metric
+            value: the observed value
+            labels: optional labels to attach to the observation
+        """
+        raise NotImplementedError()
+
+    @abc.abstractmethod
+    def increment(self, name: str, value: float = 1.0, labels: Labels = None) -> None:
+        """Increment a counter.
+
+        Args:
+            name: the name of the counter
+            value: the amount by which to increment the counter
+            labels: optional labels to attach to the counter
+        """
+        raise NotImplementedError()
+
+
+class InMemoryMetricsSink(MetricsSink):
+    """A metrics sink that aggregates all metrics in memory.
+
+    Observations are summarized (count, total, min, max) rather than stored,
+    so memory usage does not grow with the number of documents.
+    """
+
+    def __init__(self) -> None:
+        """Initialize the sink."""
+        self._lock = threading.Lock()
+        self._summaries: Dict[Tuple[str, _LabelKey], MetricSummary] = {}
+        self._counters: Dict[Tuple[str, _LabelKey], float] = {}
+
+    def observe(self, name: str, value: float, labels: Labels = None) -> None:
+        """Record a single observation."""
+        key = (name, _to_label_key(labels))
+        with self._lock:
+            summary = self._summaries.get(key)
+            if summary is None:
+                summary = self._summaries[key] = MetricSummary()
+            summary.add(value)
+
+    def increment(self, name: str, value: float = 1.0, labels: Labels = None) -> None:
+        """Increment a counter."""
+        key = (name, _to_label_key(labels))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0.0) + value
+
+    def get_summary(self, name: str, labels: Labels = None) -> Optional[MetricSummary]:
+        """Get a copy of the summary of the observations for the given metric."""
+        with self._lock:
+            summary = self._summaries.get((name, _to_label_key(labels)))
+            return summary.copy() if summary is not None else None
+
+    def get_counter(self, name: str, labels: Labels = None) -> float:
+        """Get the value of the given counter."""
+        with self._lock:
+            return self._counters.get((name, _to_label_key(labels)), 0.0)
+
+    def collect(
+        self,
+    ) -> Tuple[
+        List[Tuple[str, _LabelKey, int, float]], List[Tuple[str, _LabelKey, float]]
+    ]:
+        """Get a consistent snapshot of all metrics, sorted by name and labels.
+
+        Returns:
+            2-tuple of summaries as (name, labels, count, total) and
+            counters as (name, labels, value)
+        """
+        with self._lock:
+            summaries = sorted(
+                (name, labels, summary.count, summary.total)
+                for (name, labels), summary in self._summaries.items()
+            )
+            counters = sorted(
+                (name, labels, value)
+                for (name, labels), value in self._counters.items()
+            )
+        return summaries, counters
+
+    def reset(self) -> None:
+        """Remove all recorded metrics."""
+        with self._lock:
+            self._summaries.clear()
+            self._counters.clear()
+
+
+class MetricsCallbackHandler(BaseCallbackHandler):
+    """A langchain callback handler that reports LLM calls to a metrics sink.
+
+    Reports the duration of each LLM call together with the number of prompt
+    and output tokens. Token counts are taken from the usage metadata reported
+    by the provider and are estimated when usage metadata is missing.
+    """
+
+    def __init__(self, sink: MetricsSink, labels: Labels = None) -> None:
+        """Initialize the handler.
+
+        Args:
+            sink: the sink to report metrics to
+            labels: optional labels to attach to all reported metrics
+        """
+        super().__init__()
+        self.sink = sink
+        self.labels = labels
+        self._lock = threading.Lock()
+        self._runs: Dict[UUID, Tuple[float, int]] = {}
+
+    def _start(self, run_id: UUID, prompt: str) -> None:
+        """Remember when the LLM run started."""
+        with self._lock:
+            self._runs[run_id] = (time.perf_counter(), estimate_num_tokens(prompt))
+
+    def on_llm_start(
+        self,
+        serialized: Dict[str, Any],
+        prompts: List[str],
+        *,
+        run_id: UUID,
+        **kwargs: Any,
+    ) -> None:
+        """Record the start of an LLM run."""
+        self._start(run_id, "".join(prompts))
+
+    def on_chat_model_start(
+        self,
+        serialized: Dict[str, Any],
+        messages: List[List[BaseMessage]],
+        *,
+        run_id: UUID,
+        **kwargs: Any,
+    ) -> None:
+        """Record the start of a chat model run."""
+        self._start(run_id, "".join(get_buffer_string(m) for m in messages))
+
+    def on_llm_end(self, response: LLMResult, *, run_id: UUID, **kwargs: Any) -> None:
+        """Report the duration and the token counts of the LLM run."""
+        with self._lock:
+            started, estimated_prompt_tokens = self._runs.pop(
+                run_id, (time.perf_counter(), 0)
+            )
+        self.sink.observe(LLM_SECONDS, time.perf_counter() - started, self.labels)
+
+        prompt_tokens = estimated_prompt_tokens
+        output_tokens = 0
+        for generation in itertools.chain.from_iterable(response.generations):
+            usage = None
+            if isinstance(generation, ChatGeneration) and isinstance(
+                generation.message, AIMessage
+            ):
+                usage = generation.message.usage_metadata
+            if usage:
+                prompt_tokens = usage["input_tokens"]
+                output_tokens += usage["output_tokens"]
+            else:
+                output_tokens += estimate_num_tokens(generation.text)
+
+        self.sink.observe(PROMPT_TOKENS, prompt_tokens, self.labels)
+        self.sink.observe(OUTPUT_TOKENS, output_tokens, self.labels)
+
+    def on_llm_error(
+        self, error: BaseException, *, run_id: UUID, **kwargs: Any
+    ) -> None:
+        """Report a failed LLM run."""
+        with self._lock:
+            started, _ = self._runs.pop(run_id, (time.perf_counter(), 0))
+        if isinstance(error, (GeneratorExit, asyncio.CancelledError)):
+            # The stream was stopped once the payload was complete.
+            self.sink.observe(LLM_SECONDS, time.perf_counter() - started, self.labels)
+            return
+        self.sink.increment(LLM_ERRORS, labels=self.labels)
+
+
+def timed(sink: Optional[MetricsSink], name: str, labels: Labels = None) -> Any:
+    """Get a context manager that reports the time spent inside it.
+
+    Args:
+        sink: the sink to report the duration to, if None nothing is reported
+        name: the name of the metric
+        labels: optional labels to attach to the observation
+
+    Returns:
+        a context manager
+    """
+    if sink is None:
+        return _NULL_TIMER
+    return _Timer(sink, name, labels)
+
+
+def record_document_extraction(
+    sink: MetricsSink,
+    extraction: Mapping[str, Any],
+    duration: float,
+    labels: Labels = None,
+) -> None:
+    """Report metrics for a single document extraction.
+
+    Args:
+        sink: the sink to report metrics to
+        extraction: the document extraction result
+        duration: time in seconds it took to extract data from the document
+        labels: optional labels to attach to the reported metrics
+    """
+    sink.increment(DOCUMENTS, labels=labels)
+    sink.observe(DOCUMENT_SECONDS, duration, labels)
+    if extraction.get("skipped"):
+        sink.increment(DOCUMENTS_SKIPPED, labels=labels)
+    if "latency_saved" in extraction:
+        sink.observe(LATENCY_SAVED_SECONDS, extraction["latency_saved"], labels)
+    usage = extraction.get("usage")
+    if usage is not None and usage["cost"] is not None:
+        sink.observe(DOCUMENT_COST, usage["cost"], labels)
+    num_parse_errors = sum(
+        1 for error in extraction["errors"] if isinstance(error, ParseError)
+    )
+    if num_parse_errors:
+        sink.increment(DOCUMENT_PARSE_ERRORS, num_parse_errors, labels)
+
+
+def to_prometheus_text(sink: InMemoryMetricsSink) -> str:
+    """Export the metrics in the sink using the Prometheus text format.
+
+    Observations are exported as summaries (`_count` and `_sum` samples),
+    and counters are exported as counters.
+
+    Args:
+        sink: the sink that holds the metrics
+
+    Returns:
+        the metrics in the Prometheus text exposition format
+    """
+    summaries, counters = sink.collect()
+
+    lines: List[str] = []
+    last_name = None
+    for name, labels, count, total in summaries:
+        if name != last_name:
+            lines.append(f"# TYPE {name} summary")
+            last_name = name
+        formatted_labels = _format_labels(labels)
+        lines.append(f"{name}_count{formatted_labels} {count}")
+        lines.append(f"{name}_sum{formatted_labels} {_format_value(total)}")
+
+    for name, labels, value in counters:
+        if name != last_name:
+            lines.append(f"# TYPE {name} counter")
+            last_name = name
+        lines.append(f"{name}{_format_labels(labels)} {_format_value(value)}")
+
+    return "\n".join(lines) + "\n" if lines else ""
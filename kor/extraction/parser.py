@@ -1,12 +1,23 @@
 from __future__ import annotations
 
-from typing import List, Optional
+from concurrent.futures import Executor, ProcessPoolExecutor
+from typing import Any, List, Optional, Sequence
 
 from langchain_core.output_parsers import BaseOutputParser
 from pydantic import ConfigDict
 
+from kor.compiled import CompiledSchema
 from kor.encoders import Encoder
 from kor.exceptions import ParseError
+from kor.extraction.metrics import (
+    DECODE_SECONDS,
+    OUTPUT_CHARACTERS,
+    PARSE_ERRORS,
+    VALIDATION_ERRORS,
+    VALIDATION_SECONDS,
+    MetricsSink,
+    timed,
+)
 from kor.extraction.typedefs import Extraction
 from kor.nodes import Object
 from kor.validators import Validator
@@ -22,6 +33,15 @@ class KorParser(BaseOutputParser[Extraction]):
     encoder: Encoder
     schema_: Object
     validator: Optional[Validator] = None
+    metrics_sink: Optional[MetricsSink] = None
+    compiled: Optional[CompiledSchema] = None
+    """The compiled schema, used to restore ids if the prompt uses aliases."""
+    stop_sequences: Sequence[str] = ()
+    """The stop sequences bound to the model.
+
+    Models do not return the stop sequence they stopped at, so the first one
+    is restored at the end of outputs that do not contain any.
+    """
     model_config = ConfigDict(arbitrary_types_allowed=True)
 
     @property
@@ -31,11 +51,41 @@ class KorParser(BaseOutputParser[Extraction]):
 
     def parse(self, text: str) -> Extraction:
         """Parse the text."""
+        sink = self.metrics_sink
+        if sink is not None:
+            sink.observe(OUTPUT_CHARACTERS, len(text))
+
+        text = self.restore_stop_sequence(text)
+
         try:
-            data = self.encoder.decode(text)
+            with timed(sink, DECODE_SECONDS):
+                data = self.encoder.decode(text)
         except ParseError as e:
+            if sink is not None:
+                sink.increment(PARSE_ERRORS)
             return {"data": {}, "raw": text, "errors": [e], "validated_data": {}}
 
+        return self.parse_data(data, text)
+
+    def restore_stop_sequence(self, text: str) -> str:
+        """Restore the stop sequence at the end of an output without any."""
+        if self.stop_sequences and not any(
+            stop in text for stop in self.stop_sequences
+        ):
+            return text + self.stop_sequences[0]
+        return text
+
+    def parse_data(self, data: Any, raw: str) -> Extraction:
+        """Validate decoded data and shape it as an extraction.
+
+        Args:
+            data: the decoded output, with the data of the schema under its id
+            raw: the raw output of the model
+
+        Returns:
+            the extraction
+        """
+        sink = self.metrics_sink
         key_id = self.schema_.id
 
         errors: List[Exception]
@@ -49,20 +99,28 @@ class KorParser(BaseOutputParser[Extraction]):
                         " improve the parse."
                     )
                 ]
+                if sink is not None:
+                    sink.increment(PARSE_ERRORS)
             else:
                 errors = []
-            return {"data": {}, "raw": text, "errors": errors, "validated_data": {}}
+            return {"data": {}, "raw": raw, "errors": errors, "validated_data": {}}
 
         obj_data = data[key_id]
+        if self.compiled is not None and self.compiled.use_aliases:
+            obj_data = self.compiled.from_aliases(obj_data)
+            data = {**data, key_id: obj_data}
 
         if self.validator:
-            validated_data, errors = self.validator.clean_data(obj_data)
+            with timed(sink, VALIDATION_SECONDS):
+                validated_data, errors = self.validator.clean_data(obj_data)
+            if errors and sink is not None:
+                sink.increment(VALIDATION_ERRORS, len(errors))
         else:
             validated_data, errors = {}, []
 
         return {
             "data": data,
-            "raw": text,
+            "raw": raw,
             "errors": errors,
             "validated_data": validated_data,
         }
@@ -71,3 +129,14 @@ class KorParser(BaseOutputParser[Extraction]):
         extra="forbid",
         arbitrary_types_allowed=True,
     )
+
+
+def _get_executor_parser(parser: KorParser, executor: Optional[Executor]) -> KorParser:
+    """Get the parser to run in an executor.
+
+    Metrics sinks live in the memory of the current process, so they are
+    removed from parsers that are sent to a process pool.
+    """
+    if isinstance(executor, ProcessPoolExecutor):
+        return parser.model_copy(update={"metrics_sink": None})
+    return parser
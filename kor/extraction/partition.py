@@ -0,0 +1,224 @@
+"""Split large schemas into groups of attributes that are extracted in parallel.
+
+The prompt for an Object with many attributes (type description and examples)
+gets very large, which hurts both the quality of the output and the latency.
+A large schema can be partitioned into groups of top level attributes, with
+one extraction chain per group. The chains run concurrently on the same text
+and the decoded records are merged back into the shape of the original schema
+before validation.
+
+For schemas that extract many records, the records extracted by the different
+chains are aligned using key attributes declared by the user. The key
+attributes are extracted by every chain.
+"""
+from __future__ import annotations
+
+import asyncio
+from typing import Any, Dict, List, Mapping, Optional, Sequence, Tuple
+
+from langchain_core.runnables import Runnable, RunnableConfig, RunnableSerializable
+from langchain_core.runnables.config import get_executor_for_config
+from pydantic import ConfigDict
+
+from kor.extraction.metrics import (
+    VALIDATION_ERRORS,
+    VALIDATION_SECONDS,
+    MetricsSink,
+    timed,
+)
+from kor.extraction.typedefs import Extraction
+from kor.nodes import Object
+from kor.validators import Validator
+
+
+def _project(output: Any, attribute_ids: Sequence[str]) -> Any:
+    """Project the output of an example onto the given attributes."""
+    if isinstance(output, Mapping):
+        return {key: value for key, value in output.items() if key in attribute_ids}
+    return [_project(record, attribute_ids) for record in output]
+
+
+def _get_key(record: Mapping[str, Any], key_attributes: Sequence[str]) -> Tuple:
+    """Get the key used to align the records of the partial extractions."""
+    return tuple(str(record.get(key, "")).strip().lower() for key in key_attributes)
+
+
+# PUBLIC API
+
+
+def partition_schema(
+    node: Object,
+    max_attributes: int,
+    *,
+    key_attributes: Sequence[str] = (),
+) -> List[Object]:
+    """Partition the top level attributes of a schema into smaller schemas.
+
+    The smaller schemas keep the id, description and cardinality of the original
+    schema, and the examples of the original schema restricted to their
+    attributes.
+
+    Args:
+        node: the schema to partition
+        max_attributes: maximal number of attributes per schema, in addition
+            to the key attributes
+        key_attributes: ids of the attributes that identify a record, included
+            in every schema
+
+    Returns:
+        the partial schemas
+    """
+    if max_attributes < 1:
+        raise ValueError("max_attributes must be at least 1")
+    attribute_ids = [attribute.id for attribute in node.attributes]
+    missing = set(key_attributes) - set(attribute_ids)
+    if missing:
+        raise ValueError(f"Unknown key attributes: {sorted(missing)}")
+
+    keys = [
+        attribute for attribute in node.attributes if attribute.id in key_attributes
+    ]
+    others = [
+        attribute for attribute in node.attributes if attribute.id not in key_attributes
+    ]
+    groups = [
+        others[idx : idx + max_attributes]
+        for idx in range(0, len(others), max_attributes)
+    ] or [[]]
+
+    nodes = []
+    for group in groups:
+        attributes = keys + group
+        group_ids = [attribute.id for attribute in attributes]
+        nodes.append(
+            Object(
+                id=node.id,
+                description=node.description,
+                many=node.many,
+                attributes=attributes,
+                examples=[
+                    (text, _project(output, group_ids))
+                    for text, output in node.examples
+                ],
+            )
+        )
+    return nodes
+
+
+def merge_partial_records(
+    many: bool,
+    partial_data: Sequence[Any],
+    *,
+    key_attributes: Sequence[str] = (),
+) -> Any:
+    """Merge the records extracted by the chains of a partitioned schema.
+
+    Args:
+        many: whether the schema extracts many records
+        partial_data: the data extracted by every chain for the schema id
+        key_attributes: ids of the attributes used to align records, required
+            for schemas that extract many records
+
+    Returns:
+        the merged data; for many records, records are ordered by first appearance
+        and records without any key value are kept as is
+    """
+    if not many:
+        merged: Dict[str, Any] = {}
+        for data in partial_data:
+            if isinstance(data, Mapping):
+                merged.update(data)
+        return merged
+
+    records: List[Dict[str, Any]] = []
+    indices: Dict[Tuple, int] = {}
+    for data in partial_data:
+        for record in data or []:
+            if not isinstance(record, Mapping):
+                continue
+            key = _get_key(record, key_attributes)
+            if not any(key):
+                records.append(dict(record))
+            elif key in indices:
+                records[indices[key]].update(record)
+            else:
+                indices[key] = len(records)
+                records.append(dict(record))
+    return records
+
+
+class PartitionedExtractionChain(RunnableSerializable[Any, Extraction]):
+    """Run the chains of a partitioned schema concurrently and merge the results.
+
+    Use `create_extraction_chain` with `max_attributes_per_chain` to create one.
+    """
+
+    chains: List[Runnable]
+    """One extraction chain per group of attributes, without validation."""
+    node: Object
+    """The original schema."""
+    key_attributes: Sequence[str] = ()
+    validator: Optional[Validator] = None
+    metrics_sink: Optional[MetricsSink] = None
+    model_config = ConfigDict(arbitrary_types_allowed=True)
+
+    def _merge(self, extractions: Sequence[Extraction]) -> Extraction:
+        """Merge the extractions of the chains and validate the merged data."""
+        errors: List[Exception] = []
+        partial_data = []
+        for extraction in extractions:
+            errors.extend(extraction["errors"])
+            if extraction["data"]:
+                partial_data.append(extraction["data"].get(self.node.id))
+
+        data: Dict[str, Any] = {}
+        validated_data: Any = {}
+        if partial_data:
+            merged = merge_partial_records(
+                self.node.many, partial_data, key_attributes=self.key_attributes
+            )
+            data = {self.node.id: merged}
+            if self.validator is not None:
+                with timed(self.metrics_sink, VALIDATION_SECONDS):
+                    validated_data, validation_errors = self.validator.clean_data(
+                        merged
+                    )
+                if validation_errors and self.metrics_sink is not None:
+                    self.metrics_sink.increment(
+                        VALIDATION_ERRORS, len(validation_errors)
+                    )
+                errors.extend(validation_errors)
+
+        result: Extraction = {
+            "data": data,
+            "raw": "\n".join(extraction["raw"] for extraction in extractions),
+            "validated_data": validated_data,
+            "errors": errors,
+        }
+        tiers = [
+            extraction["tier"] for extraction in extractions if "tier" in extraction
+        ]
+        if tiers:
+            result["tier"] = max(tiers)
+        return result
+
+    def invoke(
+        self, input: Any, config: Optional[RunnableConfig] = None, **kwargs: Any
+    ) -> Extraction:
+        """Run the chains concurrently in threads and merge the results."""
+        with get_executor_for_config(config) as executor:
+            extractions = list(
+                executor.map(
+                    lambda chain: chain.invoke(input, config, **kwargs), self.chains
+                )
+            )
+        return self._merge(extractions)
+
+    async def ainvoke(
+        self, input: Any, config: Optional[RunnableConfig] = None, **kwargs: Any
+    ) -> Extraction:
+        """Run the chains concurrently and merge the results."""
+        extractions = await asyncio.gather(
+            *(chain.ainvoke(input, config, **kwargs) for chain in self.chains)
+        )
+        return self._merge(extractions)
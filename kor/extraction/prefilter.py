@@ -0,0 +1,218 @@
+"""Skip documents that contain nothing relevant to the extraction schema.
+
+Many documents in a corpus may not contain any content that the schema
+could extract, yet every document costs a full LLM call. The prefilter derives
+cheap lexical signals from the schema (keywords from attribute ids and
+descriptions, option ids and the vocabulary of the examples) and checks
+whether a document contains any of them before sending it to the LLM.
+
+All the keywords are compiled into a single regular expression shaped as a
+trie (keywords that share a prefix share a branch), together with any user
+provided patterns. Matching a document is a single scan of the text whose
+cost grows with the length of the document rather than with the number of
+keywords.
+"""
+import re
+from typing import Any, Dict, Iterable, List, Mapping, Optional, Sequence, Set, Union
+
+from kor.nodes import AbstractSchemaNode, Object, Option, Selection
+
+# Words that carry no signal about the content of a document.
+STOP_WORDS = frozenset(
+    """
+    a about above after all also an and any are as at be been before being
+    between both but by can could did do does each else for from had has have
+    how if in into is it its may more most must no not of on only or other
+    our out over same should so some such than that the their them then there
+    these they this those through to under up use used very was we were what
+    when where which while who whom why will with would you your
+    """.split()
+)
+
+# Splits identifiers and text into words, including camelCase identifiers.
+_WORDS = re.compile(r"[A-Z]+(?![a-z])|[A-Z]?[a-z]+|\d+")
+
+_END = ""
+
+
+def _tokenize(text: str, min_length: int) -> List[str]:
+    """Split text into lower cased keywords, dropping stop words."""
+    return [
+        word
+        for word in (match.group().lower() for match in _WORDS.finditer(text))
+        if len(word) >= min_length and word not in STOP_WORDS
+    ]
+
+
+def _iter_values(value: Any) -> Iterable[str]:
+    """Iterate over the leaf values of an example output."""
+    if isinstance(value, Mapping):
+        for item in value.values():
+            yield from _iter_values(item)
+    elif isinstance(value, (list, tuple)):
+        for item in value:
+            yield from _iter_values(item)
+    elif isinstance(value, str):
+        yield value
+
+
+def _iter_schema_text(
+    node: AbstractSchemaNode, include_examples: bool
+) -> Iterable[str]:
+    """Iterate over the text of the schema that carries lexical signal."""
+    yield node.id
+    yield node.description
+    if isinstance(node, Object):
+        for attribute in node.attributes:
+            yield from _iter_schema_text(attribute, include_examples)
+    elif isinstance(node, Selection):
+        for option in node.options:
+            yield from _iter_schema_text(option, include_examples)
+    if include_examples:
+        if isinstance(node, Option):
+            yield from node.examples
+        else:
+            # Only the extracted values are used, the text of the examples
+            # is mostly context that is not specific to the schema.
+            for _, output in getattr(node, "examples", ()):
+                yield from _iter_values(output)
+
+
+def _trie_to_regex(trie: Dict[str, Any]) -> str:
+    """Convert a trie of keywords into an equivalent regular expression."""
+    has_end = _END in trie
+    branches = [
+        re.escape(char) + _trie_to_regex(child)
+        for char, child in sorted(trie.items())
+        if char != _END
+    ]
+    if not branches:
+        return ""
+    if len(branches) == 1 and not has_end:
+        return branches[0]
+    if all(len(branch) == 1 for branch in branches):
+        pattern = branches[0] if len(branches) == 1 else f"[{''.join(branches)}]"
+    else:
+        pattern = f"(?:{'|'.join(branches)})"
+    return f"{pattern}?" if has_end else pattern
+
+
+def compile_keywords(keywords: Iterable[str]) -> "re.Pattern[str]":
+    """Compile keywords into a trie shaped, case insensitive regular expression.
+
+    Keywords match at the beginning of a word, so that the keyword `price`
+    also matches `prices`.
+
+    Args:
+        keywords: the keywords to match
+
+    Returns:
+        the compiled pattern
+    """
+    trie: Dict[str, Any] = {}
+    for keyword in keywords:
+        node = trie
+        for char in keyword.lower():
+            node = node.setdefault(char, {})
+        node[_END] = {}
+    return re.compile(rf"\b{_trie_to_regex(trie)}", re.IGNORECASE)
+
+
+# PUBLIC API
+
+
+def get_schema_keywords(
+    node: AbstractSchemaNode,
+    *,
+    include_examples: bool = True,
+    min_keyword_length: int = 3,
+) -> List[str]:
+    """Get the keywords that signal content relevant to the schema.
+
+    Args:
+        node: the extraction schema
+        include_examples: whether to use the vocabulary of the examples
+        min_keyword_length: keywords shorter than this are ignored
+
+    Returns:
+        sorted lower cased keywords
+    """
+    keywords: Set[str] = set()
+    for text in _iter_schema_text(node, include_examples):
+        keywords.update(_tokenize(text, min_keyword_length))
+    return sorted(keywords)
+
+
+class SchemaPrefilter:
+    """Check whether a document contains any signal for the extraction schema.
+
+    Examples:
+
+    .. code-block:: python
+
+        prefilter = SchemaPrefilter(schema, patterns=[r"\\$\\d+"])
+        results = await extract_from_documents(chain, documents, prefilter=prefilter)
+        skipped = [result for result in results if result.get("skipped")]
+    """
+
+    def __init__(
+        self,
+        node: Object,
+        *,
+        patterns: Sequence[Union[str, "re.Pattern[str]"]] = (),
+        keywords: Iterable[str] = (),
+        include_examples: bool = True,
+        min_keyword_length: int = 3,
+    ) -> None:
+        """Initialize the prefilter.
+
+        Args:
+            node: the extraction schema
+            patterns: additional regular expressions; a document that matches
+                any of them is never skipped
+            keywords: additional keywords
+            include_examples: whether to use the vocabulary of the examples
+            min_keyword_length: keywords shorter than this are ignored
+        """
+        self.keywords = sorted(
+            set(keyword.lower() for keyword in keywords).union(
+                get_schema_keywords(
+                    node,
+                    include_examples=include_examples,
+                    min_keyword_length=min_keyword_length,
+                )
+            )
+        )
+
+        sources = [
+            pattern.pattern if isinstance(pattern, re.Pattern) else pattern
+            for pattern in patterns
+        ]
+        if self.keywords:
+            sources.insert(0, compile_keywords(self.keywords).pattern)
+        self.pattern: Optional["re.Pattern[str]"] = (
+            re.compile("|".join(f"(?:{source})" for source in sources), re.IGNORECASE)
+            if sources
+            else None
+        )
+
+    def search(self, text: str) -> Optional[str]:
+        """Find the first signal in the text.
+
+        Args:
+            text: the text of the document
+
+        Returns:
+            the matched text or None if the text contains no signal
+        """
+        if self.pattern is None:
+            return None
+        match = self.pattern.search(text)
+        return match.group() if match else None
+
+    def matches(self, text: str) -> bool:
+        """Determine whether the text contains any signal for the schema.
+
+        A prefilter without any keywords or patterns matches every text.
+        """
+        return self.pattern is None or self.pattern.search(text) is not None
@@ -0,0 +1,196 @@
+"""Select the chunks of a long document that are most relevant to the schema.
+
+For long documents where only a small region is relevant, sending every chunk
+to the LLM is wasteful. The retriever scores the chunks of a document with
+BM25 using the keywords of the schema (see `kor.extraction.prefilter`) as the
+query, and keeps the top scoring chunks within a token budget.
+
+Retrieval trades recall for cost. Use `measure_recall` to compare the results
+of a run with retrieval against a full run on a sample of documents when
+tuning the budget.
+"""
+import math
+import re
+from collections import Counter
+from typing import Any, Iterable, List, Mapping, Optional, Sequence, Set, Union
+
+from kor.extraction.chunking import _to_record_key
+from kor.extraction.prefilter import compile_keywords, get_schema_keywords
+from kor.extraction.typedefs import DocumentExtraction, TextChunk
+from kor.nodes import Object
+from kor.tokens import TokenCounter, estimate_num_tokens
+
+_WORDS = re.compile(r"\w+")
+
+
+def _iter_records(data: Mapping[str, Any]) -> Iterable[Any]:
+    """Iterate over the records of the extracted data."""
+    for value in data.values():
+        if isinstance(value, list):
+            yield from value
+        elif value:
+            yield value
+
+
+# PUBLIC API
+
+
+class ChunkRetriever:
+    """Keep the chunks of a document that score best against the schema.
+
+    Chunks are scored with BM25, where the query is made of the keywords
+    derived from the ids, descriptions and examples of the schema. Keywords
+    match at the beginning of words (e.g., `price` matches `prices`).
+
+    Examples:
+
+    .. code-block:: python
+
+        retriever = ChunkRetriever(schema, token_budget=4_000)
+        results = await extract_from_documents(
+            chain, documents, chunker=chunker, retriever=retriever
+        )
+    """
+
+    def __init__(
+        self,
+        node: Object,
+        *,
+        token_budget: Optional[int] = None,
+        top_k: Optional[int] = None,
+        keywords: Iterable[str] = (),
+        include_examples: bool = True,
+        k1: float = 1.5,
+        b: float = 0.75,
+        token_counter: TokenCounter = estimate_num_tokens,
+    ) -> None:
+        """Initialize the retriever.
+
+        Args:
+            node: the extraction schema
+            token_budget: maximal number of tokens of text to send per document
+            top_k: maximal number of chunks to send per document
+            keywords: additional query keywords
+            include_examples: whether to use the vocabulary of the examples
+            k1: BM25 term frequency saturation
+            b: BM25 document length normalization
+            token_counter: function used to count the tokens of the chunks
+        """
+        if token_budget is None and top_k is None:
+            raise ValueError("Provide a token_budget, top_k or both.")
+        self.keywords = sorted(
+            set(keyword.lower() for keyword in keywords).union(
+                get_schema_keywords(node, include_examples=include_examples)
+            )
+        )
+        self.pattern = compile_keywords(self.keywords) if self.keywords else None
+        self.token_budget = token_budget
+        self.top_k = top_k
+        self.k1 = k1
+        self.b = b
+        self.token_counter = token_counter
+
+    def score(self, chunks: Sequence[TextChunk]) -> List[float]:
+        """Score the chunks of a document with BM25.
+
+        Inverse document frequencies are computed over the chunks of the
+        document, so that keywords that appear everywhere in the document
+        carry little weight.
+
+        Args:
+            chunks: the chunks of a single document
+
+        Returns:
+            the score of every chunk
+        """
+        if self.pattern is None or not chunks:
+            return [0.0] * len(chunks)
+
+        term_frequencies = [
+            Counter(match.lower() for match in self.pattern.findall(chunk["text"]))
+            for chunk in chunks
+        ]
+        lengths = [len(_WORDS.findall(chunk["text"])) for chunk in chunks]
+        average_length = max(sum(lengths) / len(chunks), 1.0)
+        document_frequencies: Counter = Counter()
+        for frequencies in term_frequencies:
+            document_frequencies.update(frequencies.keys())
+
+        num_chunks = len(chunks)
+        idf = {
+            term: math.log((num_chunks - df + 0.5) / (df + 0.5) + 1)
+            for term, df in document_frequencies.items()
+        }
+
+        scores = []
+        for frequencies, length in zip(term_frequencies, lengths):
+            norm = self.k1 * (1 - self.b + self.b * length / average_length)
+            scores.append(
+                sum(
+                    idf[term] * tf * (self.k1 + 1) / (tf + norm)
+                    for term, tf in frequencies.items()
+                )
+            )
+        return scores
+
+    def select(self, chunks: Sequence[TextChunk]) -> List[TextChunk]:
+        """Select the top scoring chunks within the budget.
+
+        Chunks that do not contain any keyword are never selected.
+
+        Args:
+            chunks: the chunks of a single document
+
+        Returns:
+            the selected chunks, highest score first
+        """
+        ranked = sorted(
+            zip(self.score(chunks), range(len(chunks))), key=lambda item: -item[0]
+        )
+        selected: List[TextChunk] = []
+        num_tokens = 0
+        for score, idx in ranked:
+            if score <= 0 or (self.top_k is not None and len(selected) >= self.top_k):
+                break
+            chunk = chunks[idx]
+            if self.token_budget is not None:
+                num_tokens += self.token_counter(chunk["text"])
+                if num_tokens > self.token_budget and selected:
+                    break
+            selected.append(chunk)
+        return selected
+
+
+def measure_recall(
+    reference: Sequence[Union[DocumentExtraction, Exception]],
+    candidate: Sequence[Union[DocumentExtraction, Exception]],
+) -> float:
+    """Measure the fraction of the records of a reference run found by another run.
+
+    Use it to compare a run with retrieval against a full run on a sample
+    of documents. Documents are matched by uid, and documents that failed in
+    either run are ignored.
+
+    Args:
+        reference: results of the full run
+        candidate: results of the run to evaluate (e.g., with retrieval)
+
+    Returns:
+        the recall, 1.0 if the reference run did not extract any records
+    """
+    candidates = {
+        result["uid"]: result for result in candidate if isinstance(result, dict)
+    }
+    num_records = 0
+    num_found = 0
+    for result in reference:
+        if isinstance(result, Exception) or result["uid"] not in candidates:
+            continue
+        found: Set[str] = set(
+            _to_record_key(record)
+            for record in _iter_records(candidates[result["uid"]]["data"])
+        )
+        for record in _iter_records(result["data"]):
+            num_records += 1
+            num_found += _to_record_key(record) in found
+    return num_found / num_records if num_records else 1.0
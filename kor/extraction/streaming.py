@@ -0,0 +1,134 @@
+"""Stream the output of the LLM and stop as soon as the payload is complete.
+
+Models often keep generating after the payload (e.g., explaining the result or
+repeating the data). When streaming, the output is checked as it arrives, and
+the stream is cancelled as soon as the encoder reports that the payload is
+complete (see `Encoder.get_payload_end`), which aborts the request to the
+provider. The LLM run of a cancelled stream ends with a `CancelledError`.
+
+The latency saved is estimated from the generation speed observed so far and
+the number of tokens the model was still allowed to generate, so it is an upper
+bound that is only known when the model has a token budget (`max_tokens`).
+"""
+import asyncio
+import time
+from typing import Any, Optional
+
+from langchain_core.runnables import Runnable, RunnableBinding, RunnableSequence
+from langchain_core.runnables.config import RunnableConfig
+from typing_extensions import TypedDict
+
+from kor.encoders import Encoder
+from kor.tokens import TokenCounter, estimate_num_tokens
+
+
+class StreamedOutput(TypedDict):
+    """Type-definition for the output of a streamed LLM call."""
+
+    output: str
+    """The output of the LLM, up to the end of the payload."""
+    cancelled: bool
+    """True if the stream was cancelled before the LLM finished."""
+    latency_saved: Optional[float]
+    """Estimated seconds saved by cancelling the stream, None if unknown."""
+
+
+def get_max_tokens(runnable: Runnable) -> Optional[int]:
+    """Get the token budget of the model called by a runnable if any.
+
+    Args:
+        runnable: the model, or a chain that calls the model
+
+    Returns:
+        the maximum number of tokens the model may generate, None if unknown
+    """
+    if isinstance(runnable, RunnableSequence):
+        for step in runnable.steps:
+            max_tokens = get_max_tokens(step)
+            if max_tokens is not None:
+                return max_tokens
+        return None
+    if isinstance(runnable, RunnableBinding):
+        max_tokens = runnable.kwargs.get("max_tokens")
+        if isinstance(max_tokens, int):
+            return max_tokens
+        return get_max_tokens(runnable.bound)
+    max_tokens = getattr(runnable, "max_tokens", None)
+    return max_tokens if isinstance(max_tokens, int) else None
+
+
+async def astream_payload(
+    llm_chain: Runnable,
+    encoder: Encoder,
+    text: str,
+    config: Optional[RunnableConfig] = None,
+    *,
+    max_tokens: Optional[int] = None,
+    token_counter: TokenCounter = estimate_num_tokens,
+) -> StreamedOutput:
+    """Stream the output of the LLM until the payload is complete.
+
+    Args:
+        llm_chain: a runnable that takes the text and streams the output of the
+            LLM as strings
+        encoder: the encoder of the payload
+        text: the text to extract from
+        config: the config of the run
+        max_tokens: the token budget of the model, used to estimate the latency
+            saved; looked up on the chain if not provided
+        token_counter: used to count the tokens generated so far
+
+    Returns:
+        the output up to the end of the payload, the latency saved is None if
+        the model has no token budget
+    """
+    if max_tokens is None:
+        max_tokens = get_max_tokens(llm_chain)
+    output = ""
+    payload_end: Optional[int] = None
+    first_chunk_at: Optional[float] = None
+    complete = asyncio.Event()
+
+    async def consume() -> None:
+        nonlocal output, payload_end, first_chunk_at
+        chunk: Any
+        async for chunk in llm_chain.astream(text, config=config):
+            if payload_end is not None:
+                # Waiting to be cancelled.
+                continue
+            if first_chunk_at is None:
+                first_chunk_at = time.perf_counter()
+            output += chunk
+            payload_end = encoder.get_payload_end(output)
+            if payload_end is not None:
+                complete.set()
+
+    # The stream is cancelled rather than closed: the cancellation is raised
+    # where the model is waiting for the provider, so the request is aborted
+    # and the callbacks of the LLM run are done when this function returns.
+    task = asyncio.ensure_future(consume())
+    waiter = asyncio.ensure_future(complete.wait())
+    try:
+        await asyncio.wait([task, waiter], return_when=asyncio.FIRST_COMPLETED)
+    finally:
+        waiter.cancel()
+        if not task.done():
+            task.cancel()
+    cancelled = False
+    try:
+        await task
+    except asyncio.CancelledError:
+        if not complete.is_set():
+            raise
+        cancelled = True
+    if payload_end is not None:
+        output = output[:payload_end]
+
+    latency_saved = None
+    if cancelled and max_tokens is not None and first_chunk_at is not None:
+        generated_tokens = token_counter(output)
+        seconds_per_token = (time.perf_counter() - first_chunk_at) / max(
+            generated_tokens, 1
+        )
+        latency_saved = seconds_per_token * max(max_tokens - generated_tokens, 0)
+    return {"output": output, "cancelled": cancelled, "latency_saved": latency_saved}
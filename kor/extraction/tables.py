@@ -0,0 +1,154 @@
+"""Extract records from HTML tables without a model.
+
+When the columns of a table map directly onto the attribute ids of a schema,
+the records can be read from the table deterministically: no tokens are spent
+and the output is exact. Use `extract_from_html_tables` before falling back
+to an extraction chain:
+
+.. code-block:: python
+
+    extraction = extract_from_html_tables(schema, html, validator=validator)
+    if extraction is None:
+        processor = MarkdownifyHTMLProcessor(compact_tables=True)
+        document = processor.process(Document(page_content=html))
+        extraction = chain.invoke(document.page_content)
+"""
+import re
+from typing import Any, Dict, List, Optional, Sequence
+
+from kor.documents.html import format_table, get_html_tables
+from kor.extraction.typedefs import Extraction
+from kor.nodes import Object
+from kor.validators import Validator
+
+_NON_ALPHANUMERIC = re.compile(r"[^a-z0-9]+")
+
+
+def _normalize(name: str) -> str:
+    """Normalize a column name or an attribute id for comparison."""
+    return _NON_ALPHANUMERIC.sub("_", name.lower()).strip("_")
+
+
+def _to_extraction(
+    node: Object,
+    records: List[Dict[str, Any]],
+    raw: str,
+    validator: Optional[Validator],
+) -> Optional[Extraction]:
+    """Shape records as the extraction of a chain."""
+    obj_data: Any = records
+    if not node.many:
+        if len(records) != 1:
+            return None
+        obj_data = records[0]
+
+    errors: List[Exception] = []
+    validated_data: Any = {}
+    if validator is not None:
+        validated_data, errors = validator.clean_data(obj_data)
+    return {
+        "data": {node.id: obj_data},
+        "raw": raw,
+        "validated_data": validated_data,
+        "errors": errors,
+    }
+
+
+# PUBLIC API
+
+
+def map_columns(node: Object, header: Sequence[str]) -> Optional[Dict[str, int]]:
+    """Map the attributes of a schema onto the columns of a table.
+
+    Column names are matched to attribute ids ignoring case, whitespace and
+    punctuation (e.g., "First Name" matches `first_name`).
+
+    Args:
+        node: the schema
+        header: the names of the columns
+
+    Returns:
+        the index of the column of every attribute, or None if an attribute
+        does not have a column or is not a scalar (nested objects and lists
+        cannot be read from a single cell)
+    """
+    columns: Dict[str, int] = {}
+    for idx, name in enumerate(header):
+        columns.setdefault(_normalize(name), idx)
+
+    mapping = {}
+    for attribute in node.attributes:
+        if attribute.many or isinstance(attribute, Object):
+            return None
+        column = columns.get(_normalize(attribute.id))
+        if column is None:
+            return None
+        mapping[attribute.id] = column
+    return mapping
+
+
+def extract_from_table(
+    node: Object,
+    rows: Sequence[Sequence[str]],
+    *,
+    validator: Optional[Validator] = None,
+) -> Optional[Extraction]:
+    """Extract records from a table whose columns map onto the schema.
+
+    Args:
+        node: the schema
+        rows: the rows of the table, the first row being the header
+        validator: optional validator to run on the extracted records
+
+    Returns:
+        the extraction, or None if the table does not map onto the schema
+    """
+    if not rows:
+        return None
+    mapping = map_columns(node, rows[0])
+    if mapping is None:
+        return None
+    records = [
+        {
+            attribute_id: row[idx] if idx < len(row) else ""
+            for attribute_id, idx in mapping.items()
+        }
+        for row in rows[1:]
+    ]
+    return _to_extraction(node, records, format_table(rows), validator)
+
+
+def extract_from_html_tables(
+    node: Object,
+    html: str,
+    *,
+    validator: Optional[Validator] = None,
+    parser: str = "html.parser",
+) -> Optional[Extraction]:
+    """Extract records from the tables of an HTML page without a model.
+
+    Records are read from every table whose columns map onto the schema, in
+    the order of the tables in the page.
+
+    Args:
+        node: the schema
+        html: the HTML page
+        validator: optional validator to run on the extracted records
+        parser: the BeautifulSoup parser to use
+
+    Returns:
+        the extraction, or None if no table maps onto the schema, in which
+        case an extraction chain should be used instead
+    """
+    records: List[Dict[str, Any]] = []
+    raw = []
+    for rows in get_html_tables(html, parser=parser):
+        extraction = extract_from_table(node, rows)
+        if extraction is None:
+            continue
+        data = extraction["data"][node.id]
+        records.extend(data if isinstance(data, list) else [data])
+        raw.append(extraction["raw"])
+    if not raw:
+        return None
+    return _to_extraction(node, records, "\n\n".join(raw), validator)
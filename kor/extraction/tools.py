@@ -0,0 +1,161 @@
+"""Extraction through tool calling.
+
+Models that support tool calling (or structured output) can be constrained to
+return arguments that follow a JSON Schema. In that case, there is no text to
+parse: the arguments of the tool call are validated directly.
+
+The schema is bound as a tool (see `kor.json_schema.to_tool`) that the model
+is forced to call, and the examples are rendered as few-shot tool calls:
+
+.. code-block:: python
+
+    chain = create_extraction_chain(llm, schema, use_tool_calling=True)
+
+The chain has the same input and output as other extraction chains.
+"""
+import json
+from typing import Any, List, Optional
+
+from langchain_core.messages import (
+    AIMessage,
+    BaseMessage,
+    HumanMessage,
+    SystemMessage,
+    ToolMessage,
+)
+from langchain_core.outputs import ChatGeneration, Generation
+from pydantic import PrivateAttr
+
+from kor.encoders import Encoder, JSONEncoder
+from kor.exceptions import ParseError
+from kor.extraction.metrics import OUTPUT_CHARACTERS, PARSE_ERRORS
+from kor.extraction.parser import KorParser
+from kor.extraction.typedefs import Extraction
+from kor.prompts import ExtractionPromptTemplate
+
+# Content of the tool messages that answer the example tool calls, since most
+# providers require every tool call to be answered.
+EXAMPLE_TOOL_RESULT = "Extraction recorded."
+
+
+def _get_tool_args(message: BaseMessage, tool_name: str) -> Optional[Any]:
+    """Get the arguments of the extraction tool call of a message if any."""
+    if not isinstance(message, AIMessage):
+        return None
+    for tool_call in message.tool_calls:
+        if tool_call["name"] == tool_name:
+            return tool_call["args"]
+    return None
+
+
+# PUBLIC API
+
+
+class ToolCallPromptTemplate(ExtractionPromptTemplate):
+    """Extraction prompt whose examples are tool calls.
+
+    Renders the same prompt as `ExtractionPromptTemplate` as a string, with the
+    examples encoded as JSON, since tools can only be used with chat messages.
+    """
+
+    encoder: Encoder = JSONEncoder(use_tags=False)
+
+    _example_messages: Optional[List[BaseMessage]] = PrivateAttr(default=None)
+
+    @property
+    def _prompt_type(self) -> str:
+        """Prompt type."""
+        return "ToolCallPromptTemplate"
+
+    def get_format_instructions(self) -> str:
+        """Ask the model to call the extraction tool."""
+        return (
+            f"Call the `{self.node.id}` tool with the extracted information. Only"
+            " include information that is present in the text."
+        )
+
+    def _get_example_messages(self) -> List[BaseMessage]:
+        """Render the examples as tool calls."""
+        if self._example_messages is None:
+            _, encoded_examples = self._get_prompt_parts()
+            assert self.compiled is not None
+            messages: List[BaseMessage] = []
+            for idx, ((example_input, _), (_, example_output)) in enumerate(
+                zip(encoded_examples, self.compiled.examples)
+            ):
+                call_id = f"example_{idx}"
+                messages.extend(
+                    [
+                        HumanMessage(content=example_input),
+                        AIMessage(
+                            content="",
+                            tool_calls=[
+                                {
+                                    "name": self.node.id,
+                                    "args": example_output,
+                                    "id": call_id,
+                                }
+                            ],
+                        ),
+                        ToolMessage(content=EXAMPLE_TOOL_RESULT, tool_call_id=call_id),
+                    ]
+                )
+            self._example_messages = messages
+        return self._example_messages
+
+    def to_messages(self, text: str) -> List[BaseMessage]:
+        """Format the template to chat messages with tool call examples."""
+        instruction_segment, _ = self._get_prompt_parts()
+        return [
+            SystemMessage(content=instruction_segment),
+            *self._get_example_messages(),
+            HumanMessage(content=text),
+        ]
+
+
+class ToolCallParser(KorParser):
+    """Parse the output of a model that was asked to call the extraction tool.
+
+    The arguments of the tool call are validated directly. If the model answered
+    with text instead, the text is decoded as JSON.
+    """
+
+    encoder: Encoder = JSONEncoder(use_tags=False)
+
+    @property
+    def _type(self) -> str:
+        """Declare the type property."""
+        return "KorToolCallParser"
+
+    def parse_result(
+        self, result: List[Generation], *, partial: bool = False
+    ) -> Extraction:
+        """Parse the tool call of the first generation."""
+        generation = result[0]
+        if not isinstance(generation, ChatGeneration):
+            return self.parse(generation.text)
+        return self.parse_message(generation.message)
+
+    def parse_message(self, message: BaseMessage) -> Extraction:
+        """Parse a message of the model.
+
+        Args:
+            message: the message, expected to contain a call to the extraction tool
+
+        Returns:
+            the extraction
+        """
+        args = _get_tool_args(message, self.schema_.id)
+        if args is None:
+            text = message.content if isinstance(message.content, str) else ""
+            if text.strip():
+                return self.parse(text)
+            if self.metrics_sink is not None:
+                self.metrics_sink.increment(PARSE_ERRORS)
+            error = ParseError("The LLM did not call the extraction tool.")
+            return {"data": {}, "raw": text, "errors": [error], "validated_data": {}}
+
+        raw = json.dumps(args, ensure_ascii=False)
+        if self.metrics_sink is not None:
+            self.metrics_sink.observe(OUTPUT_CHARACTERS, len(raw))
+        return self.parse_data(args, raw)
@@ -1,7 +1,7 @@
 """Type definitions for the extraction package."""
-from typing import Any, Dict, List
+from typing import Any, Dict, List, Optional
 
-from typing_extensions import TypedDict
+from typing_extensions import NotRequired, TypedDict
 
 
 class Extraction(TypedDict):
@@ -15,6 +15,50 @@ class Extraction(TypedDict):
     """The validated data if a validator was provided."""
     errors: List[Exception]
     """Any errors encountered during decoding or validation."""
+    tier: NotRequired[int]
+    """Index of the model that produced the extraction in a cascade of models."""
+    latency_saved: NotRequired[float]
+    """Estimated seconds saved by closing the stream of the LLM as soon as the
+    payload was complete (only when streaming with a known token budget)."""
+
+
+class TokenUsage(TypedDict):
+    """Type-definition for the tokens used (and paid for) by an extraction."""
+
+    input_tokens: int
+    """Number of prompt tokens, including cached tokens."""
+    output_tokens: int
+    """Number of generated tokens."""
+    cached_tokens: int
+    """Number of prompt tokens that were read from the provider's cache."""
+    estimated: bool
+    """True if any of the counts was estimated since usage was not reported."""
+    cost: Optional[float]
+    """The cost of the tokens if pricing information was provided."""
+
+
+class TextChunk(TypedDict):
+    """Type-definition for a chunk of a document."""
+
+    text: str
+    """The text of the chunk."""
+    start: int
+    """Offset of the first character of the chunk in the document."""
+    end: int
+    """Offset after the last character of the chunk in the document."""
+
+
+class ChunkExtraction(TypedDict):
+    """Type-definition for the provenance of data extracted from a chunk."""
+
+    start: int
+    """Offset of the first character of the chunk in the document."""
+    end: int
+    """Offset after the last character of the chunk in the document."""
+    raw: str
+    """The raw output from the LLM for the chunk."""
+    records: List[int]
+    """Indices of the records extracted from the chunk in the merged data."""
 
 
 class DocumentExtraction(Extraction):
@@ -31,3 +75,13 @@ class DocumentExtraction(Extraction):
     """The uid of the extraction result."""
     source_uid: str
     """The source uid of the document from which data was extracted."""
+    usage: TokenUsage
+    """The tokens used to extract data from the document."""
+    chunks: NotRequired[List[ChunkExtraction]]
+    """Provenance of the extracted data when the document was chunked."""
+    chunks_skipped: NotRequired[int]
+    """Number of chunks not sent to the LLM, either since a result was found
+    (early stopping) or since they were not retrieved (chunk retrieval)."""
+    skipped: NotRequired[bool]
+    """True if the document was not sent to the LLM since the prefilter found
+    nothing relevant in it."""
@@ -0,0 +1,289 @@
+"""Token and cost accounting for extractions.
+
+Token usage is captured from the usage metadata that providers attach to the
+messages generated by chat models. When usage metadata is missing (e.g., for
+providers that do not report it or for completion style LLMs), the number of
+tokens is estimated from the prompt and the generated text instead, and the
+usage is marked as estimated.
+
+For a cascade of models, usage is tracked per tier so that the cost can be
+computed with the pricing of every model.
+
+Streams that are stopped early (see `kor.extraction.streaming`) and requests
+that are cancelled (e.g., by early stopping) do not report usage, so their usage
+is estimated from the prompt and the streamed tokens.
+"""
+from __future__ import annotations
+
+import asyncio
+import itertools
+import threading
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Union
+from uuid import UUID
+
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.messages import AIMessage, BaseMessage, get_buffer_string
+from langchain_core.outputs import ChatGeneration, LLMResult
+from pydantic import BaseModel
+
+from kor.extraction.typedefs import DocumentExtraction, TokenUsage
+from kor.tokens import TokenCounter, estimate_num_tokens
+
+# Key of the run metadata that holds the tier of an LLM call in a cascade.
+TIER_METADATA_KEY = "kor_tier"
+
+
+def _empty_usage() -> TokenUsage:
+    """Create an empty token usage."""
+    return {
+        "input_tokens": 0,
+        "output_tokens": 0,
+        "cached_tokens": 0,
+        "estimated": False,
+        "cost": None,
+    }
+
+
+# PUBLIC API
+
+
+class ModelPricing(BaseModel):
+    """Pricing of a model in currency units per million tokens.
+
+    Examples:
+
+    .. code-block:: python
+
+        pricing = ModelPricing(input=0.15, output=0.6, cached_input=0.075)
+    """
+
+    input: float
+    output: float
+    cached_input: Optional[float] = None
+    """Price of cached prompt tokens. Defaults to the price of input tokens."""
+
+    def get_cost(self, usage: TokenUsage) -> float:
+        """Get the cost of the given token usage."""
+        cached_price = self.input if self.cached_input is None else self.cached_input
+        uncached_tokens = usage["input_tokens"] - usage["cached_tokens"]
+        return (
+            uncached_tokens * self.input
+            + usage["cached_tokens"] * cached_price
+            + usage["output_tokens"] * self.output
+        ) / 1_000_000
+
+
+class UsageCallbackHandler(BaseCallbackHandler):
+    """A langchain callback handler that accumulates the token usage of LLM calls.
+
+    Use a separate handler for every unit of work that should be accounted for
+    separately (e.g., a document).
+    """
+
+    def __init__(self, token_counter: TokenCounter = estimate_num_tokens) -> None:
+        """Initialize the handler.
+
+        Args:
+            token_counter: used to estimate the number of tokens when the
+                provider does not report usage metadata
+        """
+        super().__init__()
+        self.token_counter = token_counter
+        self._lock = threading.Lock()
+        self._prompts: Dict[UUID, str] = {}
+        self._tiers: Dict[UUID, int] = {}
+        self._streamed: Dict[UUID, List[str]] = {}
+        self.usage: TokenUsage = _empty_usage()
+        self.usage_by_tier: Dict[int, TokenUsage] = {}
+        """Usage of every tier of a cascade of models (tier 0 otherwise)."""
+
+    def _start(
+        self, run_id: UUID, prompt: str, metadata: Optional[Dict[str, Any]]
+    ) -> None:
+        """Remember the prompt and the tier of the LLM run."""
+        with self._lock:
+            self._prompts[run_id] = prompt
+            self._tiers[run_id] = (metadata or {}).get(TIER_METADATA_KEY, 0)
+
+    def on_llm_start(
+        self,
+        serialized: Dict[str, Any],
+        prompts: List[str],
+        *,
+        run_id: UUID,
+        metadata: Optional[Dict[str, Any]] = None,
+        **kwargs: Any,
+    ) -> None:
+        """Remember the prompt in case the provider does not report usage."""
+        self._start(run_id, "".join(prompts), metadata)
+
+    def on_chat_model_start(
+        self,
+        serialized: Dict[str, Any],
+        messages: List[List[BaseMessage]],
+        *,
+        run_id: UUID,
+        metadata: Optional[Dict[str, Any]] = None,
+        **kwargs: Any,
+    ) -> None:
+        """Remember the prompt in case the provider does not report usage."""
+        self._start(run_id, "".join(get_buffer_string(m) for m in messages), metadata)
+
+    def on_llm_new_token(self, token: str, *, run_id: UUID, **kwargs: Any) -> None:
+        """Remember the streamed tokens in case the stream is stopped early."""
+        with self._lock:
+            self._streamed.setdefault(run_id, []).append(token)
+
+    def _add(
+        self,
+        tier: int,
+        input_tokens: int,
+        output_tokens: int,
+        cached_tokens: int,
+        estimated: bool,
+    ) -> None:
+        """Accumulate token counts in the total and the usage of the tier."""
+        with self._lock:
+            for usage in [
+                self.usage,
+                self.usage_by_tier.setdefault(tier, _empty_usage()),
+            ]:
+                usage["input_tokens"] += input_tokens
+                usage["output_tokens"] += output_tokens
+                usage["cached_tokens"] += cached_tokens
+                usage["estimated"] = usage["estimated"] or estimated
+
+    def on_llm_end(self, response: LLMResult, *, run_id: UUID, **kwargs: Any) -> None:
+        """Accumulate the token usage of the LLM call."""
+        with self._lock:
+            prompt = self._prompts.pop(run_id, "")
+            tier = self._tiers.pop(run_id, 0)
+            self._streamed.pop(run_id, None)
+
+        input_tokens = 0
+        output_tokens = 0
+        cached_tokens = 0
+        estimated = False
+
+        for generation in itertools.chain.from_iterable(response.generations):
+            usage_metadata = None
+            if isinstance(generation, ChatGeneration) and isinstance(
+                generation.message, AIMessage
+            ):
+                usage_metadata = generation.message.usage_metadata
+
+            if usage_metadata:
+                input_tokens = usage_metadata["input_tokens"]
+                output_tokens += usage_metadata["output_tokens"]
+                input_token_details = usage_metadata.get("input_token_details", {})
+                cached_tokens = input_token_details.get("cache_read", 0)
+            else:
+                estimated = True
+                output_tokens += self.token_counter(generation.text)
+
+        if estimated and not input_tokens:
+            input_tokens = self.token_counter(prompt)
+
+        self._add(tier, input_tokens, output_tokens, cached_tokens, estimated)
+
+    def on_llm_error(
+        self, error: BaseException, *, run_id: UUID, **kwargs: Any
+    ) -> None:
+        """Forget the prompt of the failed call, or estimate the usage of a
+        stream that was stopped early."""
+        if isinstance(error, (GeneratorExit, asyncio.CancelledError)):
+            self._add_estimated(run_id)
+            return
+        with self._lock:
+            self._prompts.pop(run_id, None)
+            self._tiers.pop(run_id, None)
+            self._streamed.pop(run_id, None)
+
+    def _add_estimated(self, run_id: UUID) -> None:
+        """Estimate the usage of a run that was stopped before it ended."""
+        with self._lock:
+            prompt = self._prompts.pop(run_id, "")
+            tier = self._tiers.pop(run_id, 0)
+            streamed = self._streamed.pop(run_id, [])
+        self._add(
+            tier,
+            self.token_counter(prompt),
+            self.token_counter("".join(streamed)),
+            0,
+            True,
+        )
+
+    def end_pending_runs(self) -> None:
+        """Estimate the usage of the runs that started but never ended.
+
+        Cancelled requests may not be reported to the callbacks, yet their
+        prompt was sent to the provider. Call once all the runs are done or
+        cancelled.
+        """
+        with self._lock:
+            run_ids = list(self._prompts)
+        for run_id in run_ids:
+            self._add_estimated(run_id)
+
+    def get_usage(
+        self, pricing: Union[ModelPricing, Sequence[ModelPricing], None] = None
+    ) -> TokenUsage:
+        """Get the accumulated token usage.
+
+        Args:
+            pricing: optional pricing used to compute the cost, for a cascade
+                of models, a sequence with the pricing of every tier
+
+        Returns:
+            a copy of the accumulated usage
+        """
+        with self._lock:
+            usage = self.usage.copy()
+            usage_by_tier = {
+                tier: tier_usage.copy()
+                for tier, tier_usage in self.usage_by_tier.items()
+            }
+        if isinstance(pricing, ModelPricing):
+            usage["cost"] = pricing.get_cost(usage)
+        elif pricing is not None:
+            usage["cost"] = sum(
+                pricing[tier].get_cost(tier_usage)
+                for tier, tier_usage in usage_by_tier.items()
+            )
+        return usage
+
+
+def aggregate_usage(
+    results: Iterable[Union[DocumentExtraction, Exception]]
+) -> TokenUsage:
+    """Aggregate the token usage and cost of a collection of document extractions.
+
+    Exceptions (e.g., from `return_exceptions=True`) are ignored.
+
+    Args:
+        results: document extractions, e.g., the output of `extract_from_documents`
+
+    Returns:
+        the total token usage; the cost is only reported if it is known for
+        all the document extractions
+    """
+    total: TokenUsage = {
+        "input_tokens": 0,
+        "output_tokens": 0,
+        "cached_tokens": 0,
+        "estimated": False,
+        "cost": 0.0,
+    }
+    for result in results:
+        if isinstance(result, Exception):
+            continue
+        usage = result["usage"]
+        total["input_tokens"] += usage["input_tokens"]
+        total["output_tokens"] += usage["output_tokens"]
+        total["cached_tokens"] += usage["cached_tokens"]
+        total["estimated"] = total["estimated"] or usage["estimated"]
+        if usage["cost"] is None or total["cost"] is None:
+            total["cost"] = None
+        else:
+            total["cost"] += usage["cost"]
+    return total
@@ -0,0 +1,376 @@
+"""Grammars for constrained decoding.
+
+Local inference servers (e.g., llama.cpp or vLLM) can restrict generation to
+the outputs accepted by a grammar, which removes parse errors and stops the
+model from adding explanations around the payload.
+
+`to_grammar` compiles a schema and the encoder used to decode the output into
+a GBNF grammar (the grammar format of llama.cpp) and an equivalent regular
+expression:
+
+.. code-block:: python
+
+    encoder = JSONEncoder()
+    grammar = to_grammar(schema, encoder)
+    grammar.gbnf  # root ::= "<json>" ws ...
+    grammar.matches('<json>{"person": [{"name": "Alice"}]}</json>')
+
+To constrain the model of an extraction chain, pass the name of a binding or
+a function that maps the grammar to the keyword arguments of the model:
+
+.. code-block:: python
+
+    # llama.cpp server through its OpenAI compatible API
+    chain = create_extraction_chain(llm, schema, grammar="llama.cpp")
+
+    # vLLM through its OpenAI compatible API
+    chain = create_extraction_chain(llm, schema, grammar="vllm")
+
+    # Anything else
+    chain = create_extraction_chain(
+        llm, schema, grammar=lambda grammar: {"grammar": grammar.gbnf}
+    )
+
+Supported encoders are `JSONEncoder` and `CSVEncoder`, with or without tags.
+In JSON, the attributes of an object may appear in any order and all of them
+are optional; scalar values may be null. In CSV, the header must list the
+columns of the schema in order, and cells of numbers, booleans and selections
+must hold a value of that type or be empty.
+"""
+import json
+import re
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    List,
+    Mapping,
+    Optional,
+    Pattern,
+    Tuple,
+    Union,
+)
+
+from kor.encoders import CSVEncoder, Encoder, JSONEncoder
+from kor.encoders.csv_data import DELIMITER
+from kor.nodes import AbstractSchemaNode, Bool, Number, Object, Selection
+
+# Shared rules of the GBNF grammars, with the equivalent regular expressions.
+_NUMERAL_REGEX = r"-?(?:0|[1-9][0-9]*)(?:\.[0-9]+)?(?:[eE][-+]?[0-9]+)?"
+
+_JSON_RULES = {
+    "ws": ("[ \\t\\n]*", r"[ \t\n]*"),
+    "string": (
+        '"\\"" char* "\\""',
+        r'"(?:[^"\\\x00-\x1f]|\\(?:["\\/bfnrt]|u[0-9a-fA-F]{4}))*"',
+    ),
+    "char": (
+        '[^"\\\\\\x00-\\x1F] | "\\\\" (["\\\\/bfnrt] | "u" hex hex hex hex)',
+        "",
+    ),
+    "hex": ("[0-9a-fA-F]", ""),
+    # Numbers may be quoted since examples often encode them as strings.
+    "number": (
+        'numeral | "\\"" numeral "\\""',
+        f'(?:{_NUMERAL_REGEX}|"{_NUMERAL_REGEX}")',
+    ),
+    "numeral": (
+        '"-"? ("0" | [1-9] [0-9]*) ("." [0-9]+)? ([eE] [-+]? [0-9]+)?',
+        "",
+    ),
+    "boolean": ('"true" | "false"', r"(?:true|false)"),
+    "null": ('"null"', r"null"),
+}
+
+_CSV_RULES = {
+    "text-cell": (
+        '[^|"\\n]* | "\\"" ([^"] | "\\"\\"")* "\\""',
+        r'(?:[^|"\n]*|"(?:[^"]|"")*")',
+    ),
+    "number-cell": (
+        '("-"? [0-9]+ ("." [0-9]+)? ([eE] [-+]? [0-9]+)?)?',
+        r"(?:-?[0-9]+(?:\.[0-9]+)?(?:[eE][-+]?[0-9]+)?)?",
+    ),
+    "bool-cell": ('("True" | "False")?', r"(?:True|False)?"),
+}
+
+_RULE_NAME_PATTERN = re.compile(r"[^a-zA-Z0-9]+")
+
+
+def _gbnf_literal(text: str) -> str:
+    """Quote text as a GBNF string literal."""
+    escaped = (
+        text.replace("\\", "\\\\")
+        .replace('"', '\\"')
+        .replace("\n", "\\n")
+        .replace("\r", "\\r")
+        .replace("\t", "\\t")
+    )
+    return f'"{escaped}"'
+
+
+def _csv_field(value: str) -> str:
+    """Format a value as a CSV field, the way the encoder does."""
+    if any(char in value for char in f'{DELIMITER}"\n\r'):
+        return '"' + value.replace('"', '""') + '"'
+    return value
+
+
+class _GrammarBuilder:
+    """Collect the rules of a GBNF grammar and the equivalent regex."""
+
+    def __init__(self, shared_rules: Mapping[str, Tuple[str, str]]) -> None:
+        """Initialize the builder with the shared rules."""
+        self.shared_rules = shared_rules
+        self.rules: Dict[str, str] = {}
+        self._used_shared: List[str] = []
+
+    def use(self, name: str) -> Tuple[str, str]:
+        """Use a shared rule, returns its name and regex."""
+        if name not in self._used_shared:
+            self._used_shared.append(name)
+            # Shared rules may refer to each other.
+            for dependency in re.findall(
+                r"\b(char|hex|numeral)\b", self.shared_rules[name][0]
+            ):
+                self.use(dependency)
+        return name, self.shared_rules[name][1]
+
+    def add(self, path: Tuple[str, ...], body: str) -> str:
+        """Add a rule named after the path of a node, returns its name."""
+        base = "-".join(
+            _RULE_NAME_PATTERN.sub("-", part).strip("-").lower() or "node"
+            for part in path
+        )
+        name = base
+        idx = 1
+        while name in self.rules or name in self.shared_rules or name == "root":
+            idx += 1
+            name = f"{base}-{idx}"
+        self.rules[name] = body
+        return name
+
+    def to_gbnf(self, root: str) -> str:
+        """Format the grammar."""
+        lines = [f"root ::= {root}"]
+        lines.extend(f"{name} ::= {body}" for name, body in self.rules.items())
+        lines.extend(
+            f"{name} ::= {self.shared_rules[name][0]}" for name in self._used_shared
+        )
+        return "\n".join(lines) + "\n"
+
+
+def _json_list(builder: _GrammarBuilder, item: Tuple[str, str]) -> Tuple[str, str]:
+    """Make a JSON array of items."""
+    ws, ws_regex = builder.use("ws")
+    gbnf = f'"[" {ws} ({item[0]} ({ws} "," {ws} {item[0]})*)? {ws} "]"'
+    regex = (
+        rf"\[{ws_regex}(?:{item[1]}(?:{ws_regex},{ws_regex}{item[1]})*)?{ws_regex}\]"
+    )
+    return gbnf, regex
+
+
+def _json_value(
+    builder: _GrammarBuilder,
+    node: AbstractSchemaNode,
+    path: Tuple[str, ...],
+    ensure_ascii: bool,
+) -> Tuple[str, str]:
+    """Make the grammar of the JSON value of a node (GBNF expression, regex)."""
+    ws, ws_regex = builder.use("ws")
+    if isinstance(node, Object):
+        members_gbnf: List[str] = []
+        members_regex: List[str] = []
+        for attribute in node.attributes:
+            key = json.dumps(attribute.id, ensure_ascii=ensure_ascii)
+            value_gbnf, value_regex = _json_value(
+                builder, attribute, path + (attribute.id,), ensure_ascii
+            )
+            members_gbnf.append(f'{_gbnf_literal(key)} {ws} ":" {ws} {value_gbnf}')
+            members_regex.append(f"{re.escape(key)}{ws_regex}:{ws_regex}{value_regex}")
+        if members_gbnf:
+            member = builder.add(path + ("member",), " | ".join(members_gbnf))
+            item_gbnf = builder.add(
+                path,
+                f'"{{" {ws} ({member} ({ws} "," {ws} {member})*)? {ws} "}}"',
+            )
+            member_regex = "(?:" + "|".join(members_regex) + ")"
+            item_regex = (
+                rf"\{{{ws_regex}(?:{member_regex}"
+                rf"(?:{ws_regex},{ws_regex}{member_regex})*)?{ws_regex}\}}"
+            )
+        else:
+            item_gbnf = builder.add(path, f'"{{" {ws} "}}"')
+            item_regex = rf"\{{{ws_regex}\}}"
+        item = (item_gbnf, item_regex)
+    else:
+        null, null_regex = builder.use("null")
+        if isinstance(node, Selection):
+            options = [
+                json.dumps(option.id, ensure_ascii=ensure_ascii)
+                for option in node.options
+            ]
+            scalar = (
+                " | ".join(_gbnf_literal(option) for option in options) or null,
+                "|".join(re.escape(option) for option in options) or null_regex,
+            )
+        elif isinstance(node, Number):
+            scalar = builder.use("number")
+        elif isinstance(node, Bool):
+            scalar = builder.use("boolean")
+        else:
+            scalar = builder.use("string")
+        item = (
+            builder.add(path, f"{scalar[0]} | {null}"),
+            f"(?:{scalar[1]}|{null_regex})",
+        )
+
+    if node.many:
+        list_gbnf, list_regex = _json_list(builder, item)
+        return builder.add(path + ("list",), list_gbnf), f"(?:{list_regex})"
+    return item
+
+
+def _to_json_grammar(node: Object, encoder: JSONEncoder) -> Tuple[str, str]:
+    """Compile the grammar of the output of the JSON encoder."""
+    builder = _GrammarBuilder(_JSON_RULES)
+    ws, ws_regex = builder.use("ws")
+    value_gbnf, value_regex = _json_value(
+        builder, node, (node.id,), encoder.ensure_ascii
+    )
+    key = json.dumps(node.id, ensure_ascii=encoder.ensure_ascii)
+    root_gbnf = f'"{{" {ws} {_gbnf_literal(key)} {ws} ":" {ws} {value_gbnf} {ws} "}}"'
+    root_regex = (
+        rf"\{{{ws_regex}{re.escape(key)}{ws_regex}:{ws_regex}{value_regex}"
+        rf"{ws_regex}\}}"
+    )
+    if encoder.use_tags:
+        root_gbnf = f'"<json>" {ws} {root_gbnf} {ws} "</json>"'
+        root_regex = rf"<json>{ws_regex}{root_regex}{ws_regex}</json>"
+    return builder.to_gbnf(root_gbnf), root_regex
+
+
+def _to_csv_grammar(node: AbstractSchemaNode, encoder: CSVEncoder) -> Tuple[str, str]:
+    """Compile the grammar of the output of the CSV encoder."""
+    builder = _GrammarBuilder(_CSV_RULES)
+    columns = node.attributes if isinstance(node, Object) else [node]
+
+    cells: List[Tuple[str, str]] = []
+    for column in columns:
+        path = (node.id, column.id)
+        if isinstance(column, Selection):
+            options = [_csv_field(option.id) for option in column.options]
+            cell_gbnf = builder.add(
+                path, "(" + " | ".join(_gbnf_literal(o) for o in options) + ")?"
+            )
+            cells.append(
+                (cell_gbnf, "(?:" + "|".join(re.escape(o) for o in options) + ")?")
+            )
+        elif isinstance(column, Number):
+            cells.append(builder.use("number-cell"))
+        elif isinstance(column, Bool):
+            cells.append(builder.use("bool-cell"))
+        else:
+            cells.append(builder.use("text-cell"))
+
+    delimiter = _gbnf_literal(DELIMITER)
+    row = builder.add(
+        (node.id, "row"), f" {delimiter} ".join(cell[0] for cell in cells)
+    )
+    row_regex = re.escape(DELIMITER).join(cell[1] for cell in cells)
+    header = DELIMITER.join(_csv_field(column.id) for column in columns)
+
+    root_gbnf = f'{_gbnf_literal(header)} ("\\n" {row})* "\\n"?'
+    root_regex = rf"{re.escape(header)}(?:\n{row_regex})*\n?"
+    if encoder.use_tags:
+        root_gbnf = f'"<csv>" {root_gbnf} "</csv>"'
+        root_regex = rf"<csv>{root_regex}</csv>"
+    return builder.to_gbnf(root_gbnf), root_regex
+
+
+def _bind_llama_cpp(grammar: "Grammar") -> Dict[str, Any]:
+    """Bind the grammar for the OpenAI compatible API of a llama.cpp server."""
+    return {"extra_body": {"grammar": grammar.gbnf}}
+
+
+def _bind_vllm(grammar: "Grammar") -> Dict[str, Any]:
+    """Bind the grammar for the OpenAI compatible API of a vLLM server."""
+    return {"extra_body": {"guided_regex": grammar.regex}}
+
+
+# PUBLIC API
+
+
+class Grammar:
+    """A grammar of the output of a model, in GBNF and as a regex."""
+
+    def __init__(self, gbnf: str, regex: str) -> None:
+        """Initialize the grammar.
+
+        Args:
+            gbnf: the grammar in the GBNF format, starting with the `root` rule
+            regex: an equivalent regular expression (Python syntax)
+        """
+        self.gbnf = gbnf
+        self.regex = regex
+        self._pattern: Optional[Pattern[str]] = None
+
+    def __repr__(self) -> str:
+        """Represent the grammar."""
+        return f"Grammar(gbnf={self.gbnf!r}, regex={self.regex!r})"
+
+    def matches(self, text: str) -> bool:
+        """Check whether the grammar accepts the text."""
+        if self._pattern is None:
+            self._pattern = re.compile(self.regex)
+        return self._pattern.fullmatch(text) is not None
+
+
+GrammarBinding = Callable[[Grammar], Dict[str, Any]]
+
+GRAMMAR_BINDINGS: Mapping[str, GrammarBinding] = {
+    "llama.cpp": _bind_llama_cpp,
+    "vllm": _bind_vllm,
+}
+
+
+def to_grammar(node: Object, encoder: Encoder) -> Grammar:
+    """Compile the grammar of the outputs of a schema encoded with an encoder.
+
+    Args:
+        node: the schema, as described to the model
+        encoder: the encoder used to decode the output, a JSONEncoder or
+                 a CSVEncoder
+
+    Returns:
+        the grammar
+    """
+    if isinstance(encoder, JSONEncoder):
+        gbnf, regex = _to_json_grammar(node, encoder)
+    elif isinstance(encoder, CSVEncoder):
+        gbnf, regex = _to_csv_grammar(node, encoder)
+    else:
+        raise NotImplementedError(
+            f"Grammars are not supported for encoder {type(encoder).__name__}."
+        )
+    return Grammar(gbnf, regex)
+
+
+def get_grammar_binding(binding: Union[str, GrammarBinding]) -> GrammarBinding:
+    """Get a grammar binding by name, or return the given binding.
+
+    Args:
+        binding: the name of a binding ("llama.cpp" or "vllm"), or a function
+                 that maps a grammar to keyword arguments of the model
+
+    Returns:
+        the binding
+    """
+    if isinstance(binding, str):
+        if binding not in GRAMMAR_BINDINGS:
+            raise ValueError(
+                f"Unknown grammar binding {binding!r}, expected one of"
+                f" {sorted(GRAMMAR_BINDINGS)} or a function."
+            )
+        return GRAMMAR_BINDINGS[binding]
+    return binding
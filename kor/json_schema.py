@@ -0,0 +1,139 @@
+"""Generate JSON Schemas from schemas.
+
+The JSON Schema of a schema describes the data that the extraction chain
+produces, so it can be used to constrain the output of models that support
+structured output or tool calling:
+
+.. code-block:: python
+
+    schema = Object(
+        id="person",
+        many=True,
+        attributes=[
+            Text(id="name", description="The name of the person"),
+            Selection(id="pet", options=[Option(id="cat"), Option(id="dog")]),
+        ],
+    )
+    to_json_schema(schema)
+    # {
+    #     "type": "array",
+    #     "items": {
+    #         "type": "object",
+    #         "properties": {
+    #             "name": {"type": "string", "description": "The name of the person"},
+    #             "pet": {"type": "string", "enum": ["cat", "dog"]},
+    #         },
+    #         "additionalProperties": False,
+    #     },
+    # }
+
+Attributes are never required, since the text may not mention them.
+"""
+from typing import Any, Dict, List
+
+from kor.nodes import (
+    AbstractSchemaNode,
+    AbstractVisitor,
+    Bool,
+    Number,
+    Object,
+    Selection,
+    Text,
+)
+
+
+class _JSONSchemaVisitor(AbstractVisitor[Dict[str, Any]]):
+    """Generate the JSON Schema of a node."""
+
+    def _wrap(self, node: AbstractSchemaNode, schema: Dict[str, Any]) -> Dict[str, Any]:
+        """Add the description of a node and make it an array if many."""
+        if node.many:
+            schema = {"type": "array", "items": schema}
+        if node.description:
+            schema["description"] = node.description
+        return schema
+
+    def visit_text(self, node: Text, **kwargs: Any) -> Dict[str, Any]:
+        """Text is a string."""
+        return self._wrap(node, {"type": "string"})
+
+    def visit_number(self, node: Number, **kwargs: Any) -> Dict[str, Any]:
+        """Number is a number."""
+        return self._wrap(node, {"type": "number"})
+
+    def visit_bool(self, node: Bool, **kwargs: Any) -> Dict[str, Any]:
+        """Bool is a boolean."""
+        return self._wrap(node, {"type": "boolean"})
+
+    def visit_selection(self, node: Selection, **kwargs: Any) -> Dict[str, Any]:
+        """Selection is an enum of the option ids."""
+        schema = self._wrap(
+            node, {"type": "string", "enum": [option.id for option in node.options]}
+        )
+        described: List[str] = [
+            f"{option.id}: {option.description}"
+            for option in node.options
+            if option.description
+        ]
+        if described:
+            description = "; ".join(described)
+            if node.description:
+                description = f"{node.description} ({description})"
+            schema["description"] = description
+        return schema
+
+    def visit_object(self, node: Object, **kwargs: Any) -> Dict[str, Any]:
+        """Object is an object with one property per attribute."""
+        properties = {
+            attribute.id: attribute.accept(self) for attribute in node.attributes
+        }
+        return self._wrap(
+            node,
+            {
+                "type": "object",
+                "properties": properties,
+                "additionalProperties": False,
+            },
+        )
+
+
+# PUBLIC API
+
+
+def to_json_schema(node: AbstractSchemaNode) -> Dict[str, Any]:
+    """Generate the JSON Schema of the data of a node.
+
+    Args:
+        node: the schema
+
+    Returns:
+        the JSON Schema, an array schema for nodes with many=True
+    """
+    return node.accept(_JSONSchemaVisitor())
+
+
+def to_tool(node: Object) -> Dict[str, Any]:
+    """Generate a tool definition for extracting data with a schema.
+
+    The arguments of the tool have the shape of the data of an extraction,
+    i.e., the data of the schema under the id of the schema.
+
+    Args:
+        node: the schema
+
+    Returns:
+        the tool in the OpenAI function format, accepted by `bind_tools`
+    """
+    return {
+        "type": "function",
+        "function": {
+            "name": node.id,
+            "description": node.description
+            or f"Record the extracted {node.id} information.",
+            "parameters": {
+                "type": "object",
+                "properties": {node.id: to_json_schema(node)},
+                "required": [node.id],
+            },
+        },
+    }
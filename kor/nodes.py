@@ -127,7 +127,10 @@ class ExtractionSchemaNode(AbstractSchemaNode, abc.ABC):
     def parse_obj(cls, data: dict) -> ExtractionSchemaNode:
         """Parse an object."""
         if PYDANTIC_MAJOR_VERSION != 1:
-            raise NotImplementedError("Only supported for pydantic 1.x")
+            raise NotImplementedError(
+                "Only supported for pydantic 1.x, use"
+                " `kor.serialization.schema_from_dict` instead."
+            )
         type_ = data.pop(TYPE_DISCRIMINATOR_FIELD, None)
         if type_ is None:
             raise ValueError(f"Need to specify type ({TYPE_DISCRIMINATOR_FIELD})")
@@ -278,7 +281,8 @@ class Object(AbstractSchemaNode):
         """Parse raw data."""
         if PYDANTIC_MAJOR_VERSION != 1:
             raise NotImplementedError(
-                f"parse_raw is not supported for pydantic {PYDANTIC_MAJOR_VERSION}"
+                f"parse_raw is not supported for pydantic {PYDANTIC_MAJOR_VERSION},"
+                " use `kor.serialization.schema_from_json` instead."
             )
         return super().parse_raw(*args, **kwargs)
 
@@ -287,6 +291,7 @@ class Object(AbstractSchemaNode):
         """Parse an object."""
         if PYDANTIC_MAJOR_VERSION != 1:
             raise NotImplementedError(
-                f"parse_obj is not supported for pydantic {PYDANTIC_MAJOR_VERSION}"
+                f"parse_obj is not supported for pydantic {PYDANTIC_MAJOR_VERSION},"
+                " use `kor.serialization.schema_from_dict` instead."
             )
         return super().parse_obj(*args, **kwargs)
@@ -1,16 +1,23 @@
 """Code to dynamically generate appropriate LLM prompts."""
 from __future__ import annotations
 
-from typing import Any, List, Optional, Tuple
+from typing import Any, List, Optional, Tuple, Union
 
 from langchain_core.messages import AIMessage, BaseMessage, HumanMessage, SystemMessage
 from langchain_core.prompt_values import PromptValue
 from langchain_core.prompts import BasePromptTemplate, PromptTemplate
-from pydantic import ConfigDict
+from pydantic import ConfigDict, PrivateAttr
 
+from kor.compiled import CompiledSchema, compile_schema
 from kor.encoders import Encoder
 from kor.encoders.encode import InputFormatter, encode_examples, format_text
 from kor.examples import generate_examples
+from kor.extraction.metrics import (
+    FORMAT_PROMPT_SECONDS,
+    PROMPT_CHARACTERS,
+    MetricsSink,
+    timed,
+)
 from kor.extraction.parser import KorParser
 from kor.nodes import Object
 from kor.type_descriptors import TypeDescriptor
@@ -58,6 +65,15 @@ class ExtractionPromptTemplate(BasePromptTemplate):
     type_descriptor: TypeDescriptor
     input_formatter: InputFormatter
     instruction_template: PromptTemplate
+    metrics_sink: Optional[MetricsSink] = None
+    compiled: Optional[CompiledSchema] = None
+    """The compiled schema, compiled from the node on first use if not provided."""
+
+    # The instruction segment and the encoded examples do not depend on the input
+    # text, so they are only generated once.
+    _prompt_parts: Optional[Tuple[str, List[Tuple[str, str]]]] = PrivateAttr(
+        default=None
+    )
 
     model_config = ConfigDict(
         extra="forbid",
@@ -69,10 +85,14 @@ class ExtractionPromptTemplate(BasePromptTemplate):
         text: str,
     ) -> PromptValue:
         """Format the prompt."""
-        text = format_text(text, input_formatter=self.input_formatter)
-        return ExtractionPromptValue(
-            string=self.to_string(text), messages=self.to_messages(text)
-        )
+        with timed(self.metrics_sink, FORMAT_PROMPT_SECONDS):
+            text = format_text(text, input_formatter=self.input_formatter)
+            prompt_value = ExtractionPromptValue(
+                string=self.to_string(text), messages=self.to_messages(text)
+            )
+        if self.metrics_sink is not None:
+            self.metrics_sink.observe(PROMPT_CHARACTERS, len(prompt_value.string))
+        return prompt_value
 
     def format(self, **kwargs: Any) -> str:
         """Implementation of deprecated format method."""
@@ -83,10 +103,20 @@ class ExtractionPromptTemplate(BasePromptTemplate):
         """Prompt type."""
         return "ExtractionPromptTemplate"
 
+    def _get_prompt_parts(self) -> Tuple[str, List[Tuple[str, str]]]:
+        """Get the instruction segment and the encoded examples."""
+        if self._prompt_parts is None:
+            if self.compiled is None:
+                self.compiled = compile_schema(self.node)
+            self._prompt_parts = (
+                self.format_instruction_segment(self.compiled.prompt_node),
+                self.generate_encoded_examples(self.compiled),
+            )
+        return self._prompt_parts
+
     def to_string(self, text: str) -> str:
         """Format the template to a string."""
-        instruction_segment = self.format_instruction_segment(self.node)
-        encoded_examples = self.generate_encoded_examples(self.node)
+        instruction_segment, encoded_examples = self._get_prompt_parts()
         formatted_examples: List[str] = []
 
         for in_example, output in encoded_examples:
@@ -103,10 +133,9 @@ class ExtractionPromptTemplate(BasePromptTemplate):
 
     def to_messages(self, text: str) -> List[BaseMessage]:
         """Format the template to chat messages."""
-        instruction_segment = self.format_instruction_segment(self.node)
+        instruction_segment, encoded_examples = self._get_prompt_parts()
 
         messages: List[BaseMessage] = [SystemMessage(content=instruction_segment)]
-        encoded_examples = self.generate_encoded_examples(self.node)
 
         for example_input, example_output in encoded_examples:
             messages.extend(
@@ -119,17 +148,23 @@ class ExtractionPromptTemplate(BasePromptTemplate):
         messages.append(HumanMessage(content=text))
         return messages
 
-    def generate_encoded_examples(self, node: Object) -> List[Tuple[str, str]]:
+    def generate_encoded_examples(
+        self, node: Union[Object, CompiledSchema]
+    ) -> List[Tuple[str, str]]:
         """Generate encoded examples."""
         examples = generate_examples(node)
         return encode_examples(
             examples, self.encoder, input_formatter=self.input_formatter
         )
 
+    def get_format_instructions(self) -> str:
+        """Get the instructions on how to format the output."""
+        return self.encoder.get_instruction_segment()
+
     def format_instruction_segment(self, node: Object) -> str:
         """Generate the instruction segment of the extraction."""
         type_description = self.type_descriptor.describe(node)
-        format_instructions = self.encoder.get_instruction_segment()
+        format_instructions = self.get_format_instructions()
         input_variables = self.instruction_template.input_variables
 
         formatting_kwargs = {}
@@ -154,14 +189,20 @@ def create_langchain_prompt(
     validator: Optional[Validator] = None,
     input_formatter: InputFormatter = None,
     instruction_template: Optional[PromptTemplate] = None,
+    metrics_sink: Optional[MetricsSink] = None,
+    compiled: Optional[CompiledSchema] = None,
 ) -> ExtractionPromptTemplate:
     """Create a langchain style prompt with specified encoder."""
     return ExtractionPromptTemplate(
         input_variables=["text"],
-        output_parser=KorParser(encoder=encoder, validator=validator, schema_=schema),
+        output_parser=KorParser(
+            encoder=encoder, validator=validator, schema_=schema, compiled=compiled
+        ),
         encoder=encoder,
         node=schema,
+        compiled=compiled,
         input_formatter=input_formatter,
         type_descriptor=type_descriptor,
         instruction_template=instruction_template or DEFAULT_INSTRUCTION_TEMPLATE,
+        metrics_sink=metrics_sink,
     )
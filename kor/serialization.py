@@ -0,0 +1,204 @@
+"""Serialize schemas to JSON or bytes and load them back.
+
+Every node is serialized with a `$type` discriminator holding the name of its
+class, so that schemas can be shipped as data and loaded without Python code:
+
+.. code-block:: JSON
+
+    {
+        "$type": "Object",
+        "id": "person",
+        "description": "",
+        "many": false,
+        "attributes": [
+            {"$type": "Text", "id": "name", "description": "", "many": false}
+        ]
+    }
+
+When loading, the discriminator can be omitted for `Object` nodes (recognized by
+their `attributes`), `Selection` nodes (recognized by their `options`) and the
+options of a selection, as in the format of pydantic 1 `Object.parse_raw`.
+
+The binary form is the compact JSON form compressed with zlib, behind a short
+header identifying the format and its version.
+
+Use `kor.compiled.SchemaLoader` to load many schemas with caching.
+"""
+import inspect
+import json
+import zlib
+from typing import Any, Dict, List, Mapping, Optional, Type
+
+from kor._pydantic import PYDANTIC_MAJOR_VERSION
+from kor.nodes import (
+    TYPE_DISCRIMINATOR_FIELD,
+    AbstractSchemaNode,
+    Object,
+    Option,
+    Selection,
+)
+
+# Header of the binary form, followed by one byte for the version of the format.
+BINARY_HEADER = b"KOR"
+BINARY_VERSION = 1
+
+
+def _get_field_names(node: AbstractSchemaNode) -> List[str]:
+    """Get the names of the fields of a node in declaration order."""
+    if PYDANTIC_MAJOR_VERSION == 1:
+        return list(type(node).__fields__)  # type: ignore[call-overload]
+    return list(type(node).model_fields)
+
+
+def _get_node_types() -> Dict[str, Type[AbstractSchemaNode]]:
+    """Get the concrete node classes by name, including user defined ones."""
+    node_types: Dict[str, Type[AbstractSchemaNode]] = {}
+    stack = list(AbstractSchemaNode.__subclasses__())
+    while stack:
+        cls = stack.pop()
+        stack.extend(cls.__subclasses__())
+        if not inspect.isabstract(cls):
+            node_types[cls.__name__] = cls
+    return node_types
+
+
+def _to_data(value: Any) -> Any:
+    """Convert a value to plain JSON compatible data."""
+    if isinstance(value, AbstractSchemaNode):
+        return schema_to_dict(value)
+    if isinstance(value, Mapping):
+        return {str(key): _to_data(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_to_data(item) for item in value]
+    return value
+
+
+def _from_data(
+    data: Mapping[str, Any],
+    node_types: Mapping[str, Type[AbstractSchemaNode]],
+    default_type: Optional[Type[AbstractSchemaNode]],
+) -> AbstractSchemaNode:
+    """Build a node from its serialized form."""
+    if not isinstance(data, Mapping):
+        raise TypeError(f"Expected a mapping for a node, got {type(data)}")
+    fields = dict(data)
+    type_name = fields.pop(TYPE_DISCRIMINATOR_FIELD, None)
+    if type_name is not None:
+        if type_name not in node_types:
+            raise TypeError(f"Unknown node type: {type_name}")
+        node_type = node_types[type_name]
+    elif "attributes" in fields:
+        node_type = Object
+    elif "options" in fields:
+        node_type = Selection
+    elif default_type is not None:
+        node_type = default_type
+    else:
+        raise ValueError(
+            f"Need to specify type ({TYPE_DISCRIMINATOR_FIELD}) of node"
+            f" {fields.get('id')!r}"
+        )
+
+    if "attributes" in fields:
+        fields["attributes"] = [
+            _from_data(attribute, node_types, None)
+            for attribute in fields["attributes"]
+        ]
+    if "options" in fields:
+        fields["options"] = [
+            _from_data(option, node_types, Option) for option in fields["options"]
+        ]
+    return node_type(**fields)
+
+
+# PUBLIC API
+
+
+def schema_to_dict(node: AbstractSchemaNode) -> Dict[str, Any]:
+    """Serialize a schema to a dictionary with `$type` discriminators.
+
+    Args:
+        node: the schema
+
+    Returns:
+        a dictionary that can be serialized to JSON if the examples can
+    """
+    data = {name: _to_data(getattr(node, name)) for name in _get_field_names(node)}
+    return {TYPE_DISCRIMINATOR_FIELD: type(node).__name__, **data}
+
+
+def schema_from_dict(data: Mapping[str, Any]) -> Object:
+    """Load a schema from its dictionary form.
+
+    Args:
+        data: the output of `schema_to_dict`, or equivalent data
+
+    Returns:
+        the schema
+    """
+    node = _from_data(data, _get_node_types(), Object)
+    if not isinstance(node, Object):
+        raise TypeError(f"Expected an Object schema, got {type(node)}")
+    return node
+
+
+def schema_to_json(node: AbstractSchemaNode, **kwargs: Any) -> str:
+    """Serialize a schema to JSON.
+
+    Args:
+        node: the schema
+        **kwargs: keyword arguments for `json.dumps`, e.g., `indent`
+
+    Returns:
+        the JSON form of the schema
+    """
+    kwargs.setdefault("ensure_ascii", False)
+    return json.dumps(schema_to_dict(node), **kwargs)
+
+
+def schema_from_json(text: str) -> Object:
+    """Load a schema from JSON.
+
+    Args:
+        text: the JSON form of the schema
+
+    Returns:
+        the schema
+    """
+    return schema_from_dict(json.loads(text))
+
+
+def schema_to_bytes(node: AbstractSchemaNode) -> bytes:
+    """Serialize a schema to a compact binary form.
+
+    Args:
+        node: the schema
+
+    Returns:
+        the compressed compact JSON form of the schema, behind a header
+    """
+    text = schema_to_json(node, separators=(",", ":"))
+    return (
+        BINARY_HEADER
+        + bytes([BINARY_VERSION])
+        + zlib.compress(text.encode("utf-8"), level=9)
+    )
+
+
+def schema_from_bytes(data: bytes) -> Object:
+    """Load a schema from its binary form.
+
+    Args:
+        data: the output of `schema_to_bytes`
+
+    Returns:
+        the schema
+    """
+    header_length = len(BINARY_HEADER)
+    if data[:header_length] != BINARY_HEADER:
+        raise ValueError("Not a serialized kor schema")
+    version = data[header_length]
+    if version != BINARY_VERSION:
+        raise ValueError(f"Unsupported version of the binary format: {version}")
+    text = zlib.decompress(data[header_length + 1 :]).decode("utf-8")
+    return schema_from_json(text)
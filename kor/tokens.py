@@ -0,0 +1,32 @@
+"""Light-weight token counting utilities.
+
+Kor does not depend on any particular tokenizer. Whenever a token count is needed
+(e.g., for metrics, cost estimates or for sizing chunks), a token counter can be
+provided. A token counter is any callable that takes a string and returns the number
+of tokens in it, for example `llm.get_num_tokens`.
+
+When no token counter is provided, a cheap heuristic is used instead. The heuristic
+is good enough for budgeting purposes, but should not be used for billing.
+"""
+from typing import Callable
+
+# Use to denote a function that counts the number of tokens in a string.
+TokenCounter = Callable[[str], int]
+
+# Rough average number of characters per token for English text with
+# BPE style tokenizers.
+CHARACTERS_PER_TOKEN = 4
+
+# PUBLIC API
+
+
+def estimate_num_tokens(text: str) -> int:
+    """Estimate the number of tokens in the given text.
+
+    Args:
+        text: the text to estimate the number of tokens for
+
+    Returns:
+        an estimate of the number of tokens (rounded up)
+    """
+    return -(-len(text) // CHARACTERS_PER_TOKEN)
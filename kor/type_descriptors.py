@@ -8,7 +8,8 @@ using inheritance and over-loading and provide the type-descriptors to
 the create_extraction_chain function.
 """
 import abc
-from typing import Any, Iterable, List, TypeVar, Union
+from collections import Counter
+from typing import Any, Dict, Iterable, List, TypeVar, Union
 
 from kor.nodes import (
     AbstractSchemaNode,
@@ -22,6 +23,46 @@ from kor.nodes import (
 
 T = TypeVar("T")
 
+# Short type names used by the compact descriptor.
+_COMPACT_TYPE_NAMES = {Text: "str", Number: "num", Bool: "bool"}
+
+
+def _collapse_whitespace(text: str) -> str:
+    """Collapse runs of whitespace into single spaces."""
+    return " ".join(text.split())
+
+
+class _CompactContext:
+    """State of a compact description.
+
+    The description is generated in two passes: the first pass renders every
+    object in full to find repeated definitions, the second one renders the
+    description with repeated definitions replaced by a type name.
+    """
+
+    def __init__(self) -> None:
+        """Initialize the state for the first pass."""
+        self.first_pass = True
+        self.bodies: Dict[int, str] = {}
+        self.counts: Counter = Counter()
+        self.type_names: Dict[str, str] = {}
+        self.definitions: List[str] = []
+
+    def get_type_name(self, node: Object, body: str) -> str:
+        """Get the type name of a repeated object definition."""
+        if body not in self.type_names:
+            name = "".join(part.capitalize() for part in node.id.split("_"))
+            suffix = 1
+            taken = set(self.type_names.values())
+            candidate = name
+            while candidate in taken:
+                suffix += 1
+                candidate = f"{name}{suffix}"
+            self.type_names[body] = candidate
+            self.definitions.append(f"{candidate}={body}")
+        return self.type_names[body]
+
+
 # PUBLIC API
 
 
@@ -120,6 +161,74 @@ class TypeScriptDescriptor(TypeDescriptor[Iterable[str]]):
         return f"```TypeScript\n\n{code}\n```\n"
 
 
+class CompactDescriptor(TypeDescriptor[str]):
+    """Generate a minified schema description to save prompt tokens.
+
+    Compared to the TypeScript description: no indentation, code fences or empty
+    descriptions, short type names (`str`, `num`, `bool`), `[]` for lists, and
+    object definitions that are repeated in the schema are described once and
+    referred to by name.
+
+    For example:
+
+    .. code-block:: text
+
+        Address={city:str;zip:num}
+        person:{name:str(The name);home:Address;offices:Address[]}[]
+    """
+
+    def _describe_field(self, node: AbstractSchemaNode, **kwargs: Any) -> str:
+        """Describe a node as a field of an object."""
+        type_ = node.accept(self, **kwargs)
+        description = _collapse_whitespace(node.description)
+        if description:
+            type_ = f"{type_}({description})"
+        return f"{node.id}:{type_}"
+
+    def visit_default(self, node: "AbstractSchemaNode", **kwargs: Any) -> str:
+        """Describe the type of a node."""
+        if isinstance(node, Selection):
+            options = []
+            for option in node.options:
+                description = _collapse_whitespace(option.description)
+                options.append(
+                    f"{option.id}({description})" if description else option.id
+                )
+            type_ = "|".join(options)
+            if node.many and len(options) > 1:
+                type_ = f"({type_})"
+        else:
+            type_ = _COMPACT_TYPE_NAMES.get(type(node), type(node).__name__.lower())
+        return f"{type_}[]" if node.many else type_
+
+    def visit_object(self, node: Object, **kwargs: Any) -> str:
+        """Describe the type of an object node."""
+        context: _CompactContext = kwargs["context"]
+        fields = ";".join(
+            self._describe_field(child, context=context) for child in node.attributes
+        )
+        body = "{" + fields + "}"
+        type_ = body
+        if context.first_pass:
+            context.bodies[id(node)] = body
+            context.counts[body] += 1
+        elif not kwargs.get("is_root"):
+            full_body = context.bodies[id(node)]
+            if context.counts[full_body] > 1 and len(full_body) > len(node.id) + 1:
+                type_ = context.get_type_name(node, body)
+        return f"{type_}[]" if node.many else type_
+
+    def describe(self, node: Object) -> str:
+        """Describe the node type in compact notation."""
+        if not isinstance(node, Object):
+            raise TypeError(f"Expecting an Object node got {node}")
+        context = _CompactContext()
+        self._describe_field(node, context=context, is_root=True)
+        context.first_pass = False
+        root = self._describe_field(node, context=context, is_root=True)
+        return "\n".join(context.definitions + [root])
+
+
 def initialize_type_descriptors(
     type_descriptor: Union[TypeDescriptor, str]
 ) -> TypeDescriptor:
@@ -129,9 +238,11 @@ def initialize_type_descriptors(
             return BulletPointDescriptor()
         elif type_descriptor == "typescript":
             return TypeScriptDescriptor()
+        elif type_descriptor == "compact":
+            return CompactDescriptor()
         else:
             raise ValueError(
                 f"Unknown type descriptor: {type_descriptor}. Use one of: bullet_point,"
-                " typescript or else provide an instance of TypeDescriptor."
+                " typescript, compact or else provide an instance of TypeDescriptor."
             )
     return type_descriptor
@@ -1,5 +1,6 @@
 """Define validator interface and provide built-in validators for common-use cases."""
 import abc
+import functools
 from typing import Any, List, Mapping, Optional, Tuple, Type, Union
 
 from pydantic import BaseModel, ValidationError
@@ -7,6 +8,14 @@ from pydantic import BaseModel, ValidationError
 from ._pydantic import PYDANTIC_MAJOR_VERSION
 
 
+@functools.lru_cache(maxsize=512)
+def _get_list_adapter(model_class: Type[BaseModel]) -> Any:
+    """Get a TypeAdapter that validates a list of models in a single call."""
+    from pydantic import TypeAdapter
+
+    return TypeAdapter(List[model_class])  # type: ignore[valid-type]
+
+
 class Validator(abc.ABC):
     @abc.abstractmethod
     def clean_data(
@@ -36,6 +45,12 @@ class PydanticValidator(Validator):
         """
         self.model_class = model_class
         self.many = many
+        # Adapters are shared by all the validators of a model class.
+        self._list_adapter = (
+            _get_list_adapter(model_class)
+            if many and PYDANTIC_MAJOR_VERSION != 1
+            else None
+        )
 
     def clean_data(
         self, data: Any
@@ -51,6 +66,13 @@ class PydanticValidator(Validator):
         model_ = self.model_class  # a proxy to make code fit in char limit
 
         if self.many:
+            if self._list_adapter is not None and isinstance(data, list):
+                try:
+                    return self._list_adapter.validate_python(data), []
+                except ValidationError:
+                    # Validate the records one by one to keep the valid ones.
+                    pass
+
             exceptions: List[Exception] = []
             records: List[BaseModel] = []
 
@@ -0,0 +1,99 @@
+"""Test the removal of boilerplate from HTML pages."""
+import pickle
+
+from langchain_core.documents import Document
+
+from kor.documents.boilerplate import (
+    TOKEN_SAVINGS_KEY,
+    MainContentHTMLProcessor,
+    find_repeated_lines,
+)
+
+ARTICLE = """
+<p>The quick brown fox, who lives in the forest, jumps over the lazy dog every
+morning before breakfast, and then goes back to sleep.</p>
+<p>Foxes are small to medium-sized, omnivorous mammals, belonging to several
+genera of the family Canidae, and have a flattened skull.</p>
+"""
+
+
+def _make_page(content: str) -> str:
+    """Make a page with navigation, a sidebar, a cookie banner and a footer."""
+    return f"""
+    <html>
+    <head><title>Foxes</title><script>var x = 1;</script></head>
+    <body>
+    <div class="top-menu"><a href="/">Home</a> <a href="/about">About</a></div>
+    <nav><ul><li><a href="/a">Animals</a></li><li><a href="/b">Birds</a></li></ul></nav>
+    <div id="cookie-banner">We use cookies to improve your experience.</div>
+    <div class="layout">
+      <div class="content">{content}</div>
+      <div class="links">
+        <a href="/1">Wolves are great</a> <a href="/2">Dogs are great too</a>
+        <a href="/3">Cats are not canines at all</a>
+      </div>
+    </div>
+    <p class="site-notice">Copyright notice of the site repeated on every page.</p>
+    <footer>Contact us at example@example.com</footer>
+    </body>
+    </html>
+    """
+
+
+def test_main_content_is_kept() -> None:
+    """Boilerplate is removed and the main content is kept."""
+    processor = MainContentHTMLProcessor()
+    document = processor.process(
+        Document(page_content=_make_page(ARTICLE), metadata={"uid": "1"})
+    )
+    content = document.page_content
+    assert "quick brown fox" in content
+    assert "flattened skull" in content
+    for boilerplate in ["Home", "Animals", "cookies", "Wolves", "Contact", "var x"]:
+        assert boilerplate not in content
+
+    assert document.metadata["uid"] == "1"
+    savings = document.metadata[TOKEN_SAVINGS_KEY]
+    assert savings["saved"] == savings["original"] - savings["processed"]
+    assert savings["saved"] > 0
+
+
+def test_main_and_article_tags_are_preferred() -> None:
+    """Pages that mark their main content are not scored."""
+    processor = MainContentHTMLProcessor()
+    html = (
+        "<div><p>A paragraph that is long enough to be scored, outside.</p></div>"
+        "<article><h1>Title</h1><p>The article of the page.</p></article>"
+    )
+    assert (
+        processor.get_main_content(html) == "Title\n=====\n\nThe article of the page."
+    )
+
+
+def test_duplicate_lines_are_dropped() -> None:
+    """Lines repeated in a document or across a site are dropped."""
+    line = "Subscribe to receive the latest news about foxes"
+    html = f"<article><p>{line}</p><p>Foxes sleep.</p><p>{line}</p></article>"
+    assert MainContentHTMLProcessor().get_main_content(html) == (
+        f"{line}\n\nFoxes sleep."
+    )
+
+    pages = [
+        f"<article><p>Page {idx} is about foxes.</p><p>Shared line.</p></article>"
+        for idx in range(3)
+    ]
+    sample = MainContentHTMLProcessor().process_batch(
+        [Document(page_content=page) for page in pages], executor=None, max_workers=1
+    )
+    repeated_lines = find_repeated_lines(sample)
+    assert repeated_lines == frozenset(["Shared line."])
+
+    processor = MainContentHTMLProcessor(repeated_lines=repeated_lines)
+    assert processor.get_main_content(pages[0]) == "Page 0 is about foxes."
+
+
+def test_processor_is_picklable() -> None:
+    """The processor can be sent to worker processes."""
+    processor = MainContentHTMLProcessor(repeated_lines=["a"])
+    restored = pickle.loads(pickle.dumps(processor))
+    assert restored.repeated_lines == frozenset(["a"])
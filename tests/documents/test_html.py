@@ -3,7 +3,7 @@ from typing import Optional, Tuple
 import pytest
 from langchain_core.documents import Document
 
-from kor.documents.html import MarkdownifyHTMLProcessor
+from kor.documents.html import MarkdownifyHTMLProcessor, get_html_tables
 
 
 @pytest.mark.parametrize(
@@ -44,3 +44,83 @@ def test_markdownify_html_preprocessor(
     assert isinstance(processed_document, Document)
     assert processed_document.page_content == expected
     assert processed_document.metadata == {"a": 1}
+
+
+def test_nested_tags_and_stylesheets_are_removed() -> None:
+    """Nested unwanted tags and stylesheets are removed in a single pass."""
+    html = """
+    <html>
+    <head><link rel="stylesheet" href="a.css"><link rel="icon" href="a.ico"></head>
+    <body>
+    <div><script>outer<script>inner</script></script><p>Keep <b>me</b></p></div>
+    <svg><style>nested</style></svg>
+    </body>
+    </html>
+    """
+    processor = MarkdownifyHTMLProcessor(
+        tags_to_remove=("script", "svg", "style"), parser="html.parser"
+    )
+    content = processor.process(Document(page_content=html)).page_content
+    assert content == "Keep **me**"
+
+
+def test_parser_defaults_to_html_parser() -> None:
+    """The parser of the standard library is used unless another is requested."""
+    assert MarkdownifyHTMLProcessor().parser == "html.parser"
+    pytest.importorskip("lxml")
+    processor = MarkdownifyHTMLProcessor(parser="lxml")
+    assert processor.parser == "lxml"
+    document = Document(page_content="<p>Keep <b>me</b></p><script>x</script>")
+    assert processor.process(document).page_content == "Keep **me**"
+
+
+def test_matches_markdownify_on_serialized_html() -> None:
+    """Converting the parse tree gives the same markdown as re-parsing the HTML."""
+    import markdownify
+
+    from kor.documents.html import CONSECUTIVE_NEW_LINES, _parse_html
+
+    html = (
+        "<h1>Header</h1><ul><li>one</li><li>two</li></ul>"
+        "<table><tr><td>a</td><td>b</td></tr></table><img src='x.png'>"
+        "<p>A <a href='https://x.com'>link</a> and <i>style</i></p>"
+    )
+    processor = MarkdownifyHTMLProcessor(parser="html.parser")
+    expected = markdownify.markdownify(
+        str(_parse_html(html, tags_to_remove=processor.tags_to_remove))
+    )
+    expected = CONSECUTIVE_NEW_LINES.sub("\n\n", expected).strip()
+    assert processor.process(Document(page_content=html)).page_content == expected
+
+
+TABLE_HTML = """
+<p>Intro</p>
+<table>
+<thead><tr><th>Name</th><th>Age</th></tr></thead>
+<tbody>
+<tr><td>Alice</td><td>30</td></tr>
+<tr><td>Bob | Jr.</td><td colspan="1"><b>4</b></td></tr>
+<tr><td colspan="2">Total</td></tr>
+</tbody>
+</table>
+<p>Outro</p>
+"""
+
+
+def test_compact_tables() -> None:
+    """Tables are serialized with the delimiter of the CSV encoder."""
+    processor = MarkdownifyHTMLProcessor(compact_tables=True)
+    content = processor.process(Document(page_content=TABLE_HTML)).page_content
+    assert content == ('Intro\n\nName|Age\nAlice|30\n"Bob | Jr."|4\nTotal|\n\nOutro')
+    markdown = MarkdownifyHTMLProcessor().process(Document(page_content=TABLE_HTML))
+    assert len(content) < len(markdown.page_content)
+
+
+def test_get_html_tables() -> None:
+    """Tables are read as rows of cells, nested tables are flattened."""
+    assert get_html_tables(TABLE_HTML) == [
+        [["Name", "Age"], ["Alice", "30"], ["Bob | Jr.", "4"], ["Total", ""]]
+    ]
+    html = "<table><tr><td>a<table><tr><td>b</td></tr></table></td></tr></table>"
+    assert get_html_tables(html) == [[["a b"]]]
+    assert get_html_tables("<table></table>") == []
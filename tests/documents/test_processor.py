@@ -0,0 +1,86 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from typing import Iterator
+
+import pytest
+from langchain_core.documents import Document
+
+from kor import Object, Text, create_extraction_chain, extract_from_documents
+from kor.documents.html import MarkdownifyHTMLProcessor
+from kor.documents.typedefs import AbstractDocumentProcessor
+from kor.extraction.metrics import DOCUMENT_PROCESSING_SECONDS, InMemoryMetricsSink
+
+from ..utils import ToyChatModel
+
+
+class UpperCaseProcessor(AbstractDocumentProcessor):
+    """Upper case the content of documents."""
+
+    def process(self, document: Document) -> Document:
+        """Upper case the content."""
+        return Document(page_content=document.page_content.upper())
+
+
+def _make_documents(num_documents: int) -> Iterator[Document]:
+    """Lazily make documents."""
+    for idx in range(num_documents):
+        yield Document(page_content=f"<p>document {idx}</p>")
+
+
+@pytest.mark.parametrize("chunksize", [1, 3, 100])
+def test_process_batch_with_executor(chunksize: int) -> None:
+    """Documents are processed in order with an explicit executor."""
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        documents = UpperCaseProcessor().process_batch(
+            _make_documents(10), executor=executor, max_workers=2, chunksize=chunksize
+        )
+    assert [document.page_content for document in documents] == [
+        f"<P>DOCUMENT {idx}</P>" for idx in range(10)
+    ]
+
+
+def test_process_iter_with_process_pool() -> None:
+    """The HTML processor can be used with the default process pool."""
+    documents = list(
+        MarkdownifyHTMLProcessor().process_iter(
+            _make_documents(20), max_workers=2, chunksize=4
+        )
+    )
+    assert [document.page_content for document in documents] == [
+        f"document {idx}" for idx in range(20)
+    ]
+
+
+def test_process_iter_rejects_invalid_chunksize() -> None:
+    """Chunks must contain at least one document."""
+    with pytest.raises(ValueError):
+        UpperCaseProcessor().process_batch([], chunksize=0)
+
+
+def test_aprocess() -> None:
+    """Documents can be processed without blocking the event loop."""
+    document = asyncio.run(UpperCaseProcessor().aprocess(Document(page_content="a")))
+    assert document.page_content == "A"
+
+
+def test_extract_from_documents_pipelines_processing() -> None:
+    """Documents are processed in the executor before extraction."""
+    sink = InMemoryMetricsSink()
+    chain = create_extraction_chain(
+        ToyChatModel(response="name\nalice\n"),
+        Object(id="obj", attributes=[Text(id="name")], many=True),
+    )
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        results = asyncio.run(
+            extract_from_documents(
+                chain,
+                list(_make_documents(5)),
+                executor=executor,
+                document_processor=MarkdownifyHTMLProcessor(),
+                metrics_sink=sink,
+            )
+        )
+    assert all(isinstance(result, dict) for result in results)
+    summary = sink.get_summary(DOCUMENT_PROCESSING_SECONDS)
+    assert summary is not None
+    assert summary.count == 5
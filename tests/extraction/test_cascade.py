@@ -0,0 +1,154 @@
+"""Test cascades of models."""
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional
+
+import pytest
+from langchain_core.documents import Document
+from langchain_core.messages.ai import UsageMetadata
+
+from kor import Object, Text, create_extraction_chain, extract_from_documents
+from kor.exceptions import ParseError
+from kor.extraction.cascade import EscalationPolicy, ExtractionCascade
+from kor.extraction.metrics import DOCUMENT_COST, LLM_SECONDS, InMemoryMetricsSink
+from kor.extraction.prefilter import SchemaPrefilter
+from kor.extraction.usage import ModelPricing
+
+from ..utils import FunctionChatModel, ToyChatModel
+
+SCHEMA = Object(
+    id="obj",
+    attributes=[Text(id="name", description="The name of the cookie")],
+)
+
+GOOD = '<json>{"obj": {"name": "oreo"}}</json>'
+BAD = "<json>{ not json }</json>"
+EMPTY = "<json>{}</json>"
+
+
+def _extraction(data: dict, error: Optional[Exception] = None) -> dict:
+    """Make an extraction."""
+    return {
+        "data": data,
+        "raw": "",
+        "validated_data": {},
+        "errors": [error] if error else [],
+    }
+
+
+def test_escalation_policy() -> None:
+    """The policy escalates on errors and optionally on empty results."""
+    policy = EscalationPolicy()
+    assert policy.should_escalate("", _extraction({}, ParseError()))  # type: ignore
+    assert policy.should_escalate("", _extraction({}, ValueError()))  # type: ignore
+    assert not policy.should_escalate("", _extraction({}))  # type: ignore
+    assert not policy.should_escalate("", _extraction({"obj": {}}))  # type: ignore
+
+    policy = EscalationPolicy(
+        on_validation_error=False,
+        on_empty_result=True,
+        prefilter=SchemaPrefilter(SCHEMA),
+    )
+    assert not policy.should_escalate("", _extraction({}, ValueError()))  # type: ignore
+    assert policy.should_escalate("a cookie", _extraction({}))  # type: ignore
+    assert not policy.should_escalate("the weather", _extraction({}))  # type: ignore
+
+
+@pytest.mark.parametrize("small_response,tier", [(GOOD, 0), (BAD, 1)])
+def test_cascade_escalates_on_failure(small_response: str, tier: int) -> None:
+    """The next model only runs when the first one fails."""
+    large_llm = FunctionChatModel(respond=lambda text: GOOD, calls=[])
+    chain = create_extraction_chain(
+        [ToyChatModel(response=small_response), large_llm],
+        SCHEMA,
+        encoder_or_encoder_class="json",
+    )
+    assert isinstance(chain, ExtractionCascade)
+    for extraction in [chain.invoke("hello"), asyncio.run(chain.ainvoke("hello"))]:
+        assert extraction["data"] == {"obj": {"name": "oreo"}}
+        assert extraction["tier"] == tier
+    assert len(large_llm.calls) == 2 * tier
+
+
+def test_cascade_escalates_on_empty_result() -> None:
+    """Empty results are escalated for texts that pass the prefilter."""
+    chain = create_extraction_chain(
+        [ToyChatModel(response=EMPTY), ToyChatModel(response=GOOD)],
+        SCHEMA,
+        encoder_or_encoder_class="json",
+        escalation_policy=EscalationPolicy(
+            on_empty_result=True, prefilter=SchemaPrefilter(SCHEMA)
+        ),
+    )
+    assert chain.invoke("the name of a cookie")["tier"] == 1
+    assert chain.invoke("the weather")["tier"] == 0
+
+
+@pytest.mark.parametrize("use_executor", [False, True])
+def test_extract_from_documents_with_cascade(use_executor: bool) -> None:
+    """Documents record the tier, and usage and metrics are tracked per tier."""
+    usage_metadata: UsageMetadata = {
+        "input_tokens": 100,
+        "output_tokens": 10,
+        "total_tokens": 110,
+    }
+    sink = InMemoryMetricsSink()
+    chain = create_extraction_chain(
+        [
+            ToyChatModel(response=BAD, usage_metadata=usage_metadata),
+            ToyChatModel(response=GOOD, usage_metadata=usage_metadata),
+        ],
+        SCHEMA,
+        encoder_or_encoder_class="json",
+        metrics_sink=sink,
+    )
+    with ThreadPoolExecutor() as executor:
+        results = asyncio.run(
+            extract_from_documents(
+                chain,
+                [Document(page_content="hello")],
+                metrics_sink=sink,
+                pricing=[
+                    ModelPricing(input=1, output=1),
+                    ModelPricing(input=10, output=10),
+                ],
+                executor=executor if use_executor else None,
+            )
+        )
+
+    result = results[0]
+    assert isinstance(result, dict)
+    assert result["tier"] == 1
+    assert result["data"] == {"obj": {"name": "oreo"}}
+    assert result["usage"]["input_tokens"] == 200
+    assert result["usage"]["cost"] == pytest.approx(110e-6 + 1100e-6)
+
+    for tier in ["0", "1"]:
+        summary = sink.get_summary(LLM_SECONDS, labels={"tier": tier})
+        assert summary is not None and summary.count == 1
+    cost = sink.get_summary(DOCUMENT_COST, labels={"tier": "1"})
+    assert cost is not None
+    assert cost.total == pytest.approx(1210e-6)
+
+
+def test_pricing_requires_every_tier() -> None:
+    """A sequence of pricing must match the tiers of the cascade."""
+    chain = create_extraction_chain(
+        [ToyChatModel(response=BAD), ToyChatModel(response=GOOD)],
+        SCHEMA,
+        encoder_or_encoder_class="json",
+    )
+    with pytest.raises(ValueError):
+        asyncio.run(
+            extract_from_documents(
+                chain,
+                [Document(page_content="hello")],
+                pricing=[ModelPricing(input=1, output=1)],
+            )
+        )
+
+
+def test_cascade_requires_models() -> None:
+    """An empty cascade is rejected."""
+    with pytest.raises(ValueError):
+        create_extraction_chain([], SCHEMA)
@@ -0,0 +1,283 @@
+"""Test chunking of long documents."""
+import asyncio
+import time
+
+import pytest
+from langchain_core.documents import Document
+
+from kor import (
+    Object,
+    Text,
+    create_extraction_chain,
+    extract_from_documents,
+    extract_from_documents_sync,
+)
+from kor.extraction.chunking import TokenChunker, merge_chunk_extractions
+from kor.extraction.typedefs import Extraction, TextChunk
+from kor.tokens import estimate_num_tokens
+
+from ..utils import FunctionChatModel, ToyChatModel
+
+MANY_SCHEMA = Object(
+    id="obj",
+    attributes=[Text(id="name"), Text(id="age")],
+    many=True,
+)
+
+
+def _make_extraction(data: dict) -> Extraction:
+    """Make an extraction result."""
+    return {"data": data, "raw": str(data), "validated_data": {}, "errors": []}
+
+
+def _make_chunk(start: int, end: int) -> TextChunk:
+    """Make a chunk."""
+    return {"text": "", "start": start, "end": end}
+
+
+@pytest.mark.parametrize("overlap", [0, 10])
+def test_split_into_overlapping_chunks(overlap: int) -> None:
+    """Chunks should cover the text, respect the size and overlap."""
+    text = "".join(f"line number {idx} with some words\n" for idx in range(200))
+    chunker = TokenChunker(context_window=100, overlap=overlap)
+    chunks = chunker.split(text, chunk_size=50)
+
+    assert len(chunks) > 1
+    assert chunks[0]["start"] == 0
+    assert chunks[-1]["end"] == len(text)
+    for chunk in chunks:
+        assert chunk["text"] == text[chunk["start"] : chunk["end"]]
+        assert estimate_num_tokens(chunk["text"]) <= 50 + 1
+
+    for previous, current in zip(chunks, chunks[1:]):
+        if overlap:
+            assert current["start"] < previous["end"]
+        else:
+            assert current["start"] == previous["end"]
+
+
+def test_split_long_lines_and_words() -> None:
+    """Lines and words that do not fit in a chunk are split further."""
+    text = "word " * 100 + "x" * 400
+    chunks = TokenChunker(context_window=100).split(text, chunk_size=20)
+    assert "".join(chunk["text"] for chunk in chunks) == text
+    assert all(estimate_num_tokens(chunk["text"]) <= 21 for chunk in chunks)
+
+
+def test_get_chunk_size() -> None:
+    """The chunk size accounts for the prompt prefix and the output."""
+    chunker = TokenChunker(context_window=1000, max_output_tokens=200)
+    assert chunker.get_chunk_size("a" * 400) == 700
+    with pytest.raises(ValueError):
+        chunker.get_chunk_size("a" * 4000)
+
+
+def test_merge_many_records() -> None:
+    """Records are concatenated and de-duplicated across chunks."""
+    merged, provenance = merge_chunk_extractions(
+        "obj",
+        True,
+        [
+            (_make_chunk(0, 10), _make_extraction({"obj": [{"a": "1"}, {"a": "2"}]})),
+            (_make_chunk(8, 20), _make_extraction({"obj": [{"a": "2"}, {"a": "3"}]})),
+            (_make_chunk(18, 30), _make_extraction({})),
+        ],
+    )
+    assert merged["data"] == {"obj": [{"a": "1"}, {"a": "2"}, {"a": "3"}]}
+    assert merged["errors"] == []
+    assert [chunk["records"] for chunk in provenance] == [[0, 1], [1, 2], []]
+    assert [(chunk["start"], chunk["end"]) for chunk in provenance] == [
+        (0, 10),
+        (8, 20),
+        (18, 30),
+    ]
+
+
+def test_merge_keeps_identical_records() -> None:
+    """Identical records are only dropped at the overlap of neighbouring chunks."""
+    line_item = {"a": "1"}
+    merged, provenance = merge_chunk_extractions(
+        "obj",
+        True,
+        [
+            # Two identical line items within a chunk
+            (_make_chunk(0, 10), _make_extraction({"obj": [line_item, line_item]})),
+            # The overlap repeats the last one
+            (_make_chunk(8, 20), _make_extraction({"obj": [line_item, {"a": "2"}]})),
+            # The same record again, in a chunk that does not overlap
+            (_make_chunk(20, 30), _make_extraction({"obj": [{"a": "2"}]})),
+        ],
+    )
+    assert merged["data"] == {"obj": [line_item, line_item, {"a": "2"}, {"a": "2"}]}
+    assert [chunk["records"] for chunk in provenance] == [[0, 1], [1, 2], [3]]
+
+
+def test_merge_single_record() -> None:
+    """For many=False the first chunk with data wins."""
+    merged, provenance = merge_chunk_extractions(
+        "obj",
+        False,
+        [
+            (_make_chunk(0, 10), _make_extraction({})),
+            (_make_chunk(10, 20), _make_extraction({"obj": {"a": "1"}})),
+            (_make_chunk(20, 30), _make_extraction({"obj": {"a": "2"}})),
+        ],
+    )
+    assert merged["data"] == {"obj": {"a": "1"}}
+    assert [chunk["records"] for chunk in provenance] == [[], [0], []]
+
+
+def test_merge_single_record_prefers_chunks_without_errors() -> None:
+    """For many=False a chunk without errors replaces one with errors."""
+    failed = _make_extraction({"obj": {"a": "1"}})
+    failed["errors"] = [ValueError("bad")]
+    merged, provenance = merge_chunk_extractions(
+        "obj",
+        False,
+        [
+            (_make_chunk(0, 10), failed),
+            (_make_chunk(10, 20), _make_extraction({"obj": {"a": "2"}})),
+        ],
+    )
+    assert merged["data"] == {"obj": {"a": "2"}}
+    assert [chunk["records"] for chunk in provenance] == [[], [0]]
+
+
+def test_extract_from_documents_with_chunker() -> None:
+    """Long documents are chunked and the results merged."""
+    chain = create_extraction_chain(
+        ToyChatModel(response="name|age\nalice|1\nbob|2\n"),
+        MANY_SCHEMA,
+        encoder_or_encoder_class="csv",
+    )
+    chunker = TokenChunker(context_window=500, max_output_tokens=100, overlap=10)
+    text = "".join(f"line {idx} of the document\n" for idx in range(300))
+    documents = [Document(page_content=text)]
+
+    for results in [
+        asyncio.run(
+            extract_from_documents(
+                chain, documents, chunker=chunker, chunk_concurrency=2
+            )
+        ),
+        extract_from_documents_sync(chain, documents, chunker=chunker),
+    ]:
+        result = results[0]
+        assert isinstance(result, dict)
+        assert result["data"] == {
+            "obj": [{"name": "alice", "age": "1"}, {"name": "bob", "age": "2"}]
+        }
+        chunks = result["chunks"]
+        assert len(chunks) > 1
+        assert all(chunk["records"] == [0, 1] for chunk in chunks)
+        assert chunks[-1]["end"] == len(text)
+
+
+SINGLE_SCHEMA = Object(id="obj", attributes=[Text(id="name")])
+NEEDLE_DOCUMENT = "".join(
+    f"line {idx} {'NEEDLE' if idx == 150 else ''}\n" for idx in range(300)
+)
+
+
+def _respond_to_needle(text: str) -> str:
+    """Only the chunk with the needle yields a result."""
+    if "NEEDLE" in text:
+        return '<json>{"obj": {"name": "needle"}}</json>'
+    return "<json>{}</json>"
+
+
+@pytest.mark.parametrize("prioritize", [False, True])
+def test_early_stopping(prioritize: bool) -> None:
+    """Chunks after the first result are skipped."""
+    llm = FunctionChatModel(respond=_respond_to_needle, calls=[])
+    chain = create_extraction_chain(llm, SINGLE_SCHEMA, encoder_or_encoder_class="json")
+    chunker = TokenChunker(context_window=400, max_output_tokens=50)
+    results = asyncio.run(
+        extract_from_documents(
+            chain,
+            [Document(page_content=NEEDLE_DOCUMENT)],
+            chunker=chunker,
+            early_stopping=True,
+            chunk_priority=(lambda chunk: "NEEDLE" in chunk["text"])
+            if prioritize
+            else None,
+        )
+    )
+    result = results[0]
+    assert isinstance(result, dict)
+    assert result["data"] == {"obj": {"name": "needle"}}
+    num_chunks = len(
+        chunker.split(
+            NEEDLE_DOCUMENT,
+            chunker.get_chunk_size(chain.first.to_string("")),  # type: ignore
+        )
+    )
+    assert result["chunks_skipped"] == num_chunks - len(llm.calls)
+    assert result["chunks_skipped"] > 0
+    if prioritize:
+        assert len(llm.calls) == 1
+
+
+def test_early_stopping_cancels_chunks_in_flight() -> None:
+    """Slow chunk requests are cancelled once a result arrives."""
+    llm = FunctionChatModel(
+        respond=_respond_to_needle,
+        delay=lambda text: 0.0 if "NEEDLE" in text else 5.0,
+        calls=[],
+    )
+    chain = create_extraction_chain(llm, SINGLE_SCHEMA, encoder_or_encoder_class="json")
+    chunker = TokenChunker(context_window=400, max_output_tokens=50)
+    started = time.perf_counter()
+    results = asyncio.run(
+        extract_from_documents(
+            chain,
+            [Document(page_content=NEEDLE_DOCUMENT)],
+            chunker=chunker,
+            chunk_concurrency=100,
+            early_stopping=True,
+        )
+    )
+    assert time.perf_counter() - started < 2.0
+    result = results[0]
+    assert isinstance(result, dict)
+    assert result["data"] == {"obj": {"name": "needle"}}
+    assert result["chunks_skipped"] > 0
+    assert len(result["chunks"]) == 1
+    # The prompts of the cancelled requests were already sent.
+    assert len(llm.calls) > 1
+    assert result["usage"]["input_tokens"] == sum(
+        estimate_num_tokens(call) for call in llm.calls
+    )
+
+
+def test_early_stopping_sync() -> None:
+    """The sync runner stops at the first result as well."""
+    llm = FunctionChatModel(respond=_respond_to_needle, calls=[])
+    chain = create_extraction_chain(llm, SINGLE_SCHEMA, encoder_or_encoder_class="json")
+    results = extract_from_documents_sync(
+        chain,
+        [Document(page_content=NEEDLE_DOCUMENT)],
+        chunker=TokenChunker(context_window=400, max_output_tokens=50),
+        early_stopping=True,
+    )
+    result = results[0]
+    assert isinstance(result, dict)
+    assert result["data"] == {"obj": {"name": "needle"}}
+    assert "NEEDLE" in llm.calls[-1]
+
+
+def test_early_stopping_requires_many_false_and_chunker() -> None:
+    """Early stopping is only supported for a single record with a chunker."""
+    chain = create_extraction_chain(
+        ToyChatModel(response=""), MANY_SCHEMA, encoder_or_encoder_class="json"
+    )
+    documents = [Document(page_content="hello")]
+    with pytest.raises(ValueError):
+        extract_from_documents_sync(chain, documents, early_stopping=True)
+    with pytest.raises(ValueError):
+        extract_from_documents_sync(
+            chain,
+            documents,
+            early_stopping=True,
+            chunker=TokenChunker(context_window=1000, max_output_tokens=10),
+        )
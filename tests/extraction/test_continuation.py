@@ -0,0 +1,231 @@
+import asyncio
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, List, Type, Union
+
+import pytest
+from langchain_core.documents import Document
+from langchain_core.messages import AIMessage, HumanMessage
+
+from kor import (
+    Object,
+    Text,
+    create_extraction_chain,
+    extract_from_documents,
+    extract_from_documents_sync,
+)
+from kor.exceptions import ParseError
+from kor.extraction.continuation import (
+    CONTINUATION_INSTRUCTION,
+    is_truncated,
+    stitch_records,
+)
+from kor.extraction.metrics import CONTINUATIONS, InMemoryMetricsSink
+
+from ..utils import ScriptedChatModel
+
+PEOPLE = Object(
+    id="person",
+    many=True,
+    attributes=[Text(id="name")],
+    examples=[("Bob and Jane", [{"name": "Bob"}, {"name": "Jane"}])],
+)
+
+
+def _names(data: dict) -> List[str]:
+    """Get the names of the extracted people."""
+    return [record["name"] for record in data["person"]]
+
+
+@pytest.mark.parametrize("use_async", [False, True])
+def test_unclosed_payload_is_continued(use_async: bool) -> None:
+    """The records of the continuation are stitched after the complete ones."""
+    model = ScriptedChatModel(
+        responses=[
+            AIMessage(content='{"person": [{"name": "A"}, {"name": "B"}, {"na'),
+            AIMessage(content='{"person": [{"name": "B"}, {"name": "C"}]}'),
+        ],
+        calls=[],
+    )
+    chain = create_extraction_chain(
+        model, PEOPLE, encoder_or_encoder_class="json", use_tags=False
+    )
+    documents = [Document(page_content="A, B and C")]
+    if use_async:
+        results = asyncio.run(
+            extract_from_documents(chain, documents, max_continuations=2)
+        )
+    else:
+        results = extract_from_documents_sync(chain, documents, max_continuations=2)
+    result = results[0]
+    assert not isinstance(result, BaseException)
+    assert result["errors"] == []
+    assert _names(result["data"]) == ["A", "B", "C"]
+
+    # The continuation follows the output that was cut off.
+    assert len(model.calls) == 2
+    *_, cut_off, instruction = model.calls[1]
+    assert cut_off == AIMessage(
+        content='{"person": [{"name": "A"}, {"name": "B"}, {"na'
+    )
+    assert instruction == HumanMessage(content=CONTINUATION_INSTRUCTION)
+
+
+def test_truncation_from_finish_reason() -> None:
+    """Tables that decode are continued when the model hit its token budget."""
+    sink = InMemoryMetricsSink()
+    model = ScriptedChatModel(
+        responses=[
+            AIMessage(
+                content="name\nA\nB\nC",
+                response_metadata={"finish_reason": "length"},
+            ),
+            AIMessage(content="name\nC\nD\n"),
+        ],
+        calls=[],
+    )
+    chain = create_extraction_chain(model, PEOPLE, metrics_sink=sink)
+    results = extract_from_documents_sync(
+        chain, [Document(page_content="A, B, C and D")], max_continuations=1
+    )
+    result = results[0]
+    assert not isinstance(result, BaseException)
+    assert _names(result["data"]) == ["A", "B", "C", "D"]
+    assert result["raw"] == "name\nA\nB\nC\nname\nC\nD\n"
+    assert sink.get_counter(CONTINUATIONS) == 1
+
+
+class _CountingExecutor(ThreadPoolExecutor):
+    """A thread pool that counts the work submitted to it."""
+
+    def __init__(self) -> None:
+        super().__init__()
+        self.submitted = 0
+
+    def submit(self, *args: Any, **kwargs: Any) -> Future:
+        self.submitted += 1
+        return super().submit(*args, **kwargs)
+
+
+@pytest.mark.parametrize("executor_class", [_CountingExecutor, ProcessPoolExecutor])
+def test_continuations_are_parsed_in_the_executor(
+    executor_class: Union[Type[_CountingExecutor], Type[ProcessPoolExecutor]],
+) -> None:
+    """Outputs are decoded and parsed in the executor, metrics are kept."""
+    sink = InMemoryMetricsSink()
+    model = ScriptedChatModel(
+        responses=[
+            AIMessage(content='{"person": [{"name": "A"}, {"na'),
+            AIMessage(content='{"person": [{"name": "B"}]}'),
+        ],
+        calls=[],
+    )
+    chain = create_extraction_chain(
+        model,
+        PEOPLE,
+        encoder_or_encoder_class="json",
+        use_tags=False,
+        metrics_sink=sink,
+    )
+    with executor_class() as executor:
+        results = asyncio.run(
+            extract_from_documents(
+                chain,
+                [Document(page_content="A and B")],
+                max_continuations=1,
+                executor=executor,
+            )
+        )
+    result = results[0]
+    assert not isinstance(result, BaseException)
+    assert _names(result["data"]) == ["A", "B"]
+    assert sink.get_counter(CONTINUATIONS) == 1
+    if isinstance(executor, _CountingExecutor):
+        # Two outputs are decoded and the stitched records are parsed.
+        assert executor.submitted == 3
+
+
+def test_continuations_are_bounded() -> None:
+    """The complete records are kept when the output is still cut off."""
+    truncated = {"finish_reason": "length"}
+    model = ScriptedChatModel(
+        responses=[
+            AIMessage(content="name\nA\nB", response_metadata=truncated),
+            AIMessage(content="name\nB\nC", response_metadata=truncated),
+        ],
+        calls=[],
+    )
+    chain = create_extraction_chain(model, PEOPLE)
+    results = extract_from_documents_sync(
+        chain, [Document(page_content="A, B, C and D")], max_continuations=1
+    )
+    result = results[0]
+    assert not isinstance(result, BaseException)
+    assert len(model.calls) == 2
+    assert _names(result["data"]) == ["A", "B"]
+    assert len(result["errors"]) == 1
+    assert isinstance(result["errors"][0], ParseError)
+
+
+def test_complete_output_is_not_continued() -> None:
+    """Complete outputs are parsed as usual."""
+    model = ScriptedChatModel(
+        responses=[AIMessage(content='{"person": [{"name": "A"}]}')], calls=[]
+    )
+    chain = create_extraction_chain(
+        model, PEOPLE, encoder_or_encoder_class="json", use_tags=False
+    )
+    results = extract_from_documents_sync(
+        chain, [Document(page_content="A")], max_continuations=3
+    )
+    result = results[0]
+    assert not isinstance(result, BaseException)
+    assert len(model.calls) == 1
+    assert result["raw"] == '{"person": [{"name": "A"}]}'
+    assert _names(result["data"]) == ["A"]
+
+
+def test_single_records_are_not_continued() -> None:
+    """Only schemas with many=True are continued."""
+    person = Object(id="person", attributes=[Text(id="name")])
+    model = ScriptedChatModel(
+        responses=[AIMessage(content='{"person": {"na')], calls=[]
+    )
+    chain = create_extraction_chain(
+        model, person, encoder_or_encoder_class="json", use_tags=False
+    )
+    results = extract_from_documents_sync(
+        chain, [Document(page_content="A")], max_continuations=3
+    )
+    result = results[0]
+    assert not isinstance(result, BaseException)
+    assert len(model.calls) == 1
+    assert isinstance(result["errors"][0], ParseError)
+
+
+def test_stitch_records() -> None:
+    """Only the records repeated at the seam are dropped."""
+    assert stitch_records([1, 2, 3], [2, 3, 4]) == [1, 2, 3, 4]
+    assert stitch_records([1, 2], [3, 1, 2]) == [1, 2, 3, 1, 2]
+    assert stitch_records([1, 1], [1, 2]) == [1, 1, 2]
+    assert stitch_records([], [1]) == [1]
+    assert stitch_records([{"a": 1}], [{"a": 1}, {"a": 2}]) == [{"a": 1}, {"a": 2}]
+
+
+def test_is_truncated() -> None:
+    """Truncation is detected from the finish reason or the token usage."""
+    assert is_truncated(
+        AIMessage(content="", response_metadata={"finish_reason": "length"})
+    )
+    assert is_truncated(
+        AIMessage(content="", response_metadata={"stop_reason": "max_tokens"})
+    )
+    assert not is_truncated(
+        AIMessage(content="", response_metadata={"finish_reason": "stop"})
+    )
+    message = AIMessage(
+        content="",
+        usage_metadata={"input_tokens": 5, "output_tokens": 10, "total_tokens": 15},
+    )
+    assert is_truncated(message, max_tokens=10)
+    assert not is_truncated(message, max_tokens=11)
+    assert not is_truncated(message)
@@ -1,16 +1,23 @@
 import asyncio
-from typing import List
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, AsyncIterator, Iterator, List, Type, Union
 
 import pytest
 from langchain_core.documents import Document
+from langchain_core.runnables import RunnableLambda
 
 from kor import (
     DocumentExtraction,
+    Extraction,
     Object,
     Text,
     create_extraction_chain,
     extract_from_documents,
+    extract_from_documents_iter,
+    extract_from_documents_sync,
 )
+from kor.documents.html import MarkdownifyHTMLProcessor
+from kor.extraction.metrics import DOCUMENTS, InMemoryMetricsSink
 
 from ..utils import ToyChatModel
 
@@ -92,6 +99,14 @@ def test_extract_from_documents(
             max_concurrency=100,
         )
     )
+    for result in extraction_results:
+        assert isinstance(result, dict)
+        usage = result.pop("usage")  # type: ignore[misc]
+        # The toy model does not report usage, so the usage is estimated.
+        assert usage["estimated"] is True
+        assert usage["input_tokens"] > 0
+        assert usage["output_tokens"] > 0
+        assert usage["cost"] is None
     assert extraction_results == expected_results
 
 
@@ -141,3 +156,229 @@ def test_check_assertion_is_raised_when_using_missing_uuid() -> None:
                 max_concurrency=100,
             )
         )
+
+
+def test_extract_from_documents_sync_matches_async() -> None:
+    """The sync runner should produce the same results as the async one."""
+    chain = create_extraction_chain(
+        ToyChatModel(response='<json>{ "obj": { "text_node": "hello" } }</json>'),
+        SIMPLE_OBJECT_SCHEMA,
+        encoder_or_encoder_class="json",
+    )
+    documents = [
+        Document(page_content="hello", metadata={"uid": "a"}),
+        Document(page_content="goodbye", metadata={"uid": "b"}),
+    ]
+    async_results = asyncio.run(
+        extract_from_documents(chain, documents, use_uid=True, max_concurrency=2)
+    )
+    sync_results = extract_from_documents_sync(
+        chain, documents, use_uid=True, max_concurrency=2
+    )
+    assert sync_results == async_results
+
+
+def test_extract_from_documents_sync_under_concurrent_load() -> None:
+    """Run many documents through many threads to exercise thread-safety."""
+    schema = Object(
+        id="obj",
+        attributes=[Text(id="name"), Text(id="age")],
+        many=True,
+    )
+    chain = create_extraction_chain(
+        ToyChatModel(response="name|age\nalice|1\nbob|2\n"),
+        schema,
+        encoder_or_encoder_class="csv",
+    )
+    documents = [Document(page_content=f"doc {idx}") for idx in range(200)]
+    results = extract_from_documents_sync(chain, documents, max_concurrency=16)
+    assert [result["uid"] for result in results] == [  # type: ignore[index]
+        str(idx) for idx in range(200)
+    ]
+    for result in results:
+        assert isinstance(result, dict)
+        assert result["data"] == {
+            "obj": [{"name": "alice", "age": "1"}, {"name": "bob", "age": "2"}]
+        }
+        assert result["errors"] == []
+
+
+def _fail_on_bad_document(text: str) -> Extraction:
+    """Chain substitute that fails for a specific input."""
+    if text == "bad":
+        raise ValueError("bad document")
+    return {"data": {}, "raw": text, "validated_data": {}, "errors": []}
+
+
+def test_extract_from_documents_sync_return_exceptions() -> None:
+    """Test exception handling in the sync runner."""
+    chain = RunnableLambda(_fail_on_bad_document)
+    documents = [
+        Document(page_content="good"),
+        Document(page_content="bad"),
+        Document(page_content="good"),
+    ]
+    results = extract_from_documents_sync(
+        chain, documents, max_concurrency=2, return_exceptions=True
+    )
+    assert isinstance(results[0], dict)
+    assert isinstance(results[1], ValueError)
+    assert isinstance(results[2], dict)
+
+    with pytest.raises(ValueError):
+        extract_from_documents_sync(chain, documents, max_concurrency=2)
+
+    with pytest.raises(ValueError):
+        extract_from_documents_sync(
+            chain, [Document(page_content="good")], use_uid=True
+        )
+
+
+@pytest.mark.parametrize("executor_class", [ThreadPoolExecutor, ProcessPoolExecutor])
+def test_extract_from_documents_with_executor(
+    executor_class: Union[Type[ThreadPoolExecutor], Type[ProcessPoolExecutor]],
+) -> None:
+    """Offload document processing and parsing to an executor."""
+    sink = InMemoryMetricsSink()
+    chain = create_extraction_chain(
+        ToyChatModel(response='<json>{ "obj": { "text_node": "hello" } }</json>'),
+        SIMPLE_OBJECT_SCHEMA,
+        encoder_or_encoder_class="json",
+        metrics_sink=sink,
+    )
+    documents = [
+        Document(page_content="<html><script>x</script><p>hello</p></html>"),
+        Document(page_content="<p>goodbye</p>"),
+    ]
+
+    with executor_class(max_workers=2) as executor:
+        results = asyncio.run(
+            extract_from_documents(
+                chain,
+                documents,
+                max_concurrency=2,
+                document_processor=MarkdownifyHTMLProcessor(),
+                executor=executor,
+                metrics_sink=sink,
+            )
+        )
+
+    assert [result["data"] for result in results] == [  # type: ignore[index]
+        {"obj": {"text_node": "hello"}},
+        {"obj": {"text_node": "hello"}},
+    ]
+    assert sink.get_counter(DOCUMENTS) == 2
+
+
+def test_extract_from_documents_executor_requires_kor_chain() -> None:
+    """An executor can only be used with a chain that ends with a KorParser."""
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        with pytest.raises(ValueError):
+            asyncio.run(
+                extract_from_documents(
+                    RunnableLambda(_fail_on_bad_document),
+                    [Document(page_content="good")],
+                    executor=executor,
+                )
+            )
+
+
+class _SlowChain:
+    """Tracks how many documents are in flight at the same time."""
+
+    def __init__(self) -> None:
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    async def __call__(self, text: str) -> Extraction:
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        # Later documents finish first.
+        await asyncio.sleep(0.01 if text == "0" else 0.001)
+        self.in_flight -= 1
+        if text == "bad":
+            raise ValueError("bad document")
+        return {"data": {}, "raw": text, "validated_data": {}, "errors": []}
+
+
+def test_extract_from_documents_iter_is_memory_bounded() -> None:
+    """Documents should be pulled lazily and a bounded number kept in flight."""
+    slow_chain = _SlowChain()
+    pulled = 0
+    pulled_when_yielded = []
+
+    def documents() -> Iterator[Document]:
+        nonlocal pulled
+        for idx in range(50):
+            pulled += 1
+            yield Document(page_content=str(idx))
+
+    async def consume() -> List[str]:
+        uids = []
+        async for result in extract_from_documents_iter(
+            RunnableLambda(slow_chain),
+            documents(),
+            max_concurrency=3,
+            max_pending_factor=2,
+        ):
+            assert isinstance(result, dict)
+            pulled_when_yielded.append(pulled)
+            uids.append(result["uid"])
+        return uids
+
+    uids = asyncio.run(consume())
+    assert uids == [str(idx) for idx in range(50)]
+    assert slow_chain.max_in_flight == 3
+    # At most max_pending_factor * max_concurrency documents are scheduled
+    # ahead of the consumer.
+    assert all(
+        num_pulled - num_yielded <= 6
+        for num_yielded, num_pulled in enumerate(pulled_when_yielded)
+    )
+
+
+def test_extract_from_documents_iter_unordered_with_async_iterable() -> None:
+    """Results can be yielded in completion order from an async iterable."""
+
+    async def documents() -> AsyncIterator[Document]:
+        for idx in range(5):
+            yield Document(page_content=str(idx))
+
+    async def consume() -> List[str]:
+        return [
+            result["uid"]  # type: ignore[index]
+            async for result in extract_from_documents_iter(
+                RunnableLambda(_SlowChain()),
+                documents(),
+                max_concurrency=5,
+                preserve_order=False,
+            )
+        ]
+
+    uids = asyncio.run(consume())
+    assert sorted(uids) == ["0", "1", "2", "3", "4"]
+    # The first document is the slowest.
+    assert uids[-1] == "0"
+
+
+def test_extract_from_documents_iter_exceptions() -> None:
+    """Test exception handling when iterating over results."""
+    documents = [Document(page_content=text) for text in ["1", "bad", "2"]]
+
+    async def consume(return_exceptions: bool) -> List[Any]:
+        return [
+            result
+            async for result in extract_from_documents_iter(
+                RunnableLambda(_SlowChain()),
+                documents,
+                max_concurrency=2,
+                return_exceptions=return_exceptions,
+            )
+        ]
+
+    results = asyncio.run(consume(True))
+    assert isinstance(results[1], ValueError)
+    assert [result["uid"] for result in (results[0], results[2])] == ["0", "2"]
+
+    with pytest.raises(ValueError):
+        asyncio.run(consume(False))
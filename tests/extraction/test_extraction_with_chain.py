@@ -154,3 +154,71 @@ def test_get_prompt() -> None:
         "Input: [text]\n"
         "Output:"
     )
+
+
+LONG_IDS_SCHEMA = Object(
+    id="obj",
+    attributes=[
+        Text(id="customer_billing_address", examples=[("at 1 Main St", "1 Main St")])
+    ],
+)
+
+
+@pytest.mark.parametrize(
+    "encoder,response",
+    [
+        ("json", '<json>{"obj": {"a1": "2 Elm St"}}</json>'),
+        ("csv", "a1\n2 Elm St"),
+    ],
+)
+def test_extraction_with_aliases(encoder: str, response: str) -> None:
+    """The prompt uses aliases and the parser restores the ids."""
+    chain = create_extraction_chain(
+        ToyChatModel(response=response),
+        LONG_IDS_SCHEMA,
+        encoder_or_encoder_class=encoder,
+        use_aliases=True,
+        validator=None,
+    )
+    prompt = chain.get_prompts()[0].format_prompt(text="[text]").to_string()
+    assert "a1: string // customer_billing_address" in prompt
+    assert prompt.count("customer_billing_address") == 1
+    data = chain.invoke("at 2 Elm St")["data"]
+    expected = {"customer_billing_address": "2 Elm St"}
+    assert data == {"obj": [expected] if encoder == "csv" else expected}
+
+
+def test_aliases_require_an_encoder_class() -> None:
+    """Encoder instances were created for the schema without aliases."""
+    with pytest.raises(ValueError):
+        create_extraction_chain(
+            ToyChatModel(response="hello"),
+            LONG_IDS_SCHEMA,
+            encoder_or_encoder_class=CSVEncoder(LONG_IDS_SCHEMA),
+            use_aliases=True,
+        )
+
+
+def test_stop_sequences_and_max_tokens_are_bound() -> None:
+    """The model stops at the end of the payload, which is restored."""
+    chain = create_extraction_chain(
+        ToyChatModel(response='<json>{"obj": {"text_node": "hi"}}'),
+        SIMPLE_OBJECT_SCHEMA,
+        encoder_or_encoder_class="json",
+        max_output_records=5,
+    )
+    model = chain.steps[1]  # type: ignore[attr-defined]
+    assert model.kwargs["stop"] == ["</json>"]
+    assert model.kwargs["max_tokens"] > 0
+    extraction = chain.invoke("hi")
+    assert extraction["data"] == {"obj": {"text_node": "hi"}}
+    assert extraction["raw"].endswith("</json>")
+
+    chain = create_extraction_chain(
+        ToyChatModel(response="hello"),
+        SIMPLE_OBJECT_SCHEMA,
+        encoder_or_encoder_class="json",
+        use_stop_sequences=False,
+    )
+    assert chain.steps[1] == ToyChatModel(response="hello")  # type: ignore
+    assert chain.invoke("hi")["data"] == {}
@@ -0,0 +1,130 @@
+"""Test instrumentation of the extraction pipeline."""
+import asyncio
+
+from langchain_core.documents import Document
+
+from kor import Object, Text, create_extraction_chain, extract_from_documents
+from kor.extraction.metrics import (
+    DECODE_SECONDS,
+    DOCUMENT_PARSE_ERRORS,
+    DOCUMENT_SECONDS,
+    DOCUMENTS,
+    FORMAT_PROMPT_SECONDS,
+    LLM_SECONDS,
+    OUTPUT_CHARACTERS,
+    OUTPUT_TOKENS,
+    PARSE_ERRORS,
+    PROMPT_CHARACTERS,
+    PROMPT_TOKENS,
+    InMemoryMetricsSink,
+    to_prometheus_text,
+)
+
+from ..utils import ToyChatModel
+
+SCHEMA = Object(
+    id="obj",
+    description="",
+    attributes=[Text(id="text_node", description="Text Field")],
+    examples=[("hello", {"text_node": "goodbye"})],
+)
+
+
+def test_in_memory_metrics_sink() -> None:
+    """Test aggregation of observations and counters."""
+    sink = InMemoryMetricsSink()
+    sink.observe("latency", 1.0)
+    sink.observe("latency", 3.0)
+    sink.observe("latency", 2.0, labels={"tier": "0"})
+    sink.increment("errors")
+    sink.increment("errors", 2)
+
+    summary = sink.get_summary("latency")
+    assert summary is not None
+    assert (summary.count, summary.total, summary.min, summary.max) == (2, 4, 1, 3)
+    assert summary.mean == 2.0
+    labeled_summary = sink.get_summary("latency", labels={"tier": "0"})
+    assert labeled_summary is not None
+    assert labeled_summary.count == 1
+    assert sink.get_summary("missing") is None
+    assert sink.get_counter("errors") == 3
+    assert sink.get_counter("missing") == 0
+
+    # Summaries are snapshots that later observations do not modify.
+    sink.observe("latency", 5.0)
+    assert (summary.count, summary.total, summary.max) == (2, 4, 3)
+    summary = sink.get_summary("latency")
+    assert summary is not None
+    assert (summary.count, summary.total, summary.max) == (3, 9, 5)
+
+    sink.reset()
+    assert sink.get_summary("latency") is None
+
+
+def test_to_prometheus_text() -> None:
+    """Test the prometheus text exporter."""
+    sink = InMemoryMetricsSink()
+    assert to_prometheus_text(sink) == ""
+    sink.observe("kor_llm_seconds", 0.5)
+    sink.observe("kor_llm_seconds", 0.25, labels={"tier": '"1"'})
+    sink.increment("kor_parse_errors_total")
+    assert to_prometheus_text(sink) == (
+        "# TYPE kor_llm_seconds summary\n"
+        "kor_llm_seconds_count 1\n"
+        "kor_llm_seconds_sum 0.5\n"
+        'kor_llm_seconds_count{tier="\\"1\\""} 1\n'
+        'kor_llm_seconds_sum{tier="\\"1\\""} 0.25\n'
+        "# TYPE kor_parse_errors_total counter\n"
+        "kor_parse_errors_total 1\n"
+    )
+
+
+def test_chain_reports_metrics_for_each_stage() -> None:
+    """Verify that every stage of the chain reports metrics."""
+    sink = InMemoryMetricsSink()
+    response = '<json>{"obj": {"text_node": "hello"}}</json>'
+    chain = create_extraction_chain(
+        ToyChatModel(response=response),
+        SCHEMA,
+        encoder_or_encoder_class="json",
+        metrics_sink=sink,
+    )
+    chain.invoke("hello")
+
+    for name in [
+        FORMAT_PROMPT_SECONDS,
+        PROMPT_CHARACTERS,
+        LLM_SECONDS,
+        PROMPT_TOKENS,
+        OUTPUT_TOKENS,
+        DECODE_SECONDS,
+        OUTPUT_CHARACTERS,
+    ]:
+        summary = sink.get_summary(name)
+        assert summary is not None, name
+        assert summary.count == 1, name
+
+    output_characters = sink.get_summary(OUTPUT_CHARACTERS)
+    assert output_characters is not None
+    assert output_characters.total == len(response)
+    assert sink.get_counter(PARSE_ERRORS) == 0
+
+
+def test_extract_from_documents_reports_document_metrics() -> None:
+    """Verify per document metrics."""
+    sink = InMemoryMetricsSink()
+    chain = create_extraction_chain(
+        ToyChatModel(response="<json>{ not json }</json>"),
+        SCHEMA,
+        encoder_or_encoder_class="json",
+        metrics_sink=sink,
+    )
+    documents = [Document(page_content="a"), Document(page_content="b")]
+    asyncio.run(extract_from_documents(chain, documents, metrics_sink=sink))
+
+    assert sink.get_counter(DOCUMENTS) == 2
+    assert sink.get_counter(PARSE_ERRORS) == 2
+    assert sink.get_counter(DOCUMENT_PARSE_ERRORS) == 2
+    document_seconds = sink.get_summary(DOCUMENT_SECONDS)
+    assert document_seconds is not None
+    assert document_seconds.count == 2
@@ -0,0 +1,212 @@
+"""Test partitioning of large schemas."""
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from langchain_core.documents import Document
+from pydantic import BaseModel
+
+from kor import (
+    Object,
+    Text,
+    create_extraction_chain,
+    extract_from_documents,
+    extract_from_documents_sync,
+)
+from kor.extraction.chunking import TokenChunker
+from kor.extraction.continuation import CONTINUATION_INSTRUCTION
+from kor.extraction.partition import (
+    PartitionedExtractionChain,
+    merge_partial_records,
+    partition_schema,
+)
+from kor.validators import PydanticValidator
+
+from ..utils import FunctionChatModel
+
+SCHEMA = Object(
+    id="person",
+    attributes=[
+        Text(id="name"),
+        Text(id="age"),
+        Text(id="city"),
+        Text(id="job"),
+    ],
+    examples=[("Bob is 3", [{"name": "Bob", "age": "3"}])],
+    many=True,
+)
+
+
+class Person(BaseModel):
+    name: str
+    age: int
+    city: str
+    job: str
+
+
+def _respond(text: str) -> str:
+    """Answer with the attributes that are described in the prompt."""
+    if "age:" in text:
+        return (
+            '<json>{"person": [{"name": "alice", "age": "1", "city": "paris"},'
+            ' {"name": "bob", "age": "2", "city": "rome"}]}</json>'
+        )
+    return (
+        '<json>{"person": [{"name": "Bob", "job": "cook"},'
+        ' {"name": "alice", "job": "pilot"}]}</json>'
+    )
+
+
+def test_partition_schema() -> None:
+    """Attributes are grouped and key attributes are in every group."""
+    nodes = partition_schema(SCHEMA, 2, key_attributes=["name"])
+    assert [[a.id for a in node.attributes] for node in nodes] == [
+        ["name", "age", "city"],
+        ["name", "job"],
+    ]
+    assert all(node.id == "person" and node.many for node in nodes)
+    assert nodes[0].examples == [("Bob is 3", [{"name": "Bob", "age": "3"}])]
+    assert nodes[1].examples == [("Bob is 3", [{"name": "Bob"}])]
+
+    with pytest.raises(ValueError):
+        partition_schema(SCHEMA, 2, key_attributes=["missing"])
+
+
+def test_merge_partial_records() -> None:
+    """Records are aligned on key attributes."""
+    assert merge_partial_records(False, [{"a": 1}, None, {"b": 2}]) == {
+        "a": 1,
+        "b": 2,
+    }
+    assert merge_partial_records(
+        True,
+        [
+            [{"name": "A", "x": 1}, {"name": "", "x": 2}],
+            [{"name": "a ", "y": 3}, {"name": "b", "y": 4}],
+        ],
+        key_attributes=["name"],
+    ) == [
+        {"name": "a ", "x": 1, "y": 3},
+        {"name": "", "x": 2},
+        {"name": "b", "y": 4},
+    ]
+
+
+def test_partitioned_chain() -> None:
+    """Partial extractions are merged before validation."""
+    llm = FunctionChatModel(respond=_respond, calls=[])
+    chain = create_extraction_chain(
+        llm,
+        SCHEMA,
+        encoder_or_encoder_class="json",
+        validator=PydanticValidator(Person, many=True),
+        max_attributes_per_chain=2,
+        key_attributes=["name"],
+    )
+    assert isinstance(chain, PartitionedExtractionChain)
+    assert len(chain.chains) == 2
+
+    for extraction in [chain.invoke("text"), asyncio.run(chain.ainvoke("text"))]:
+        assert extraction["data"] == {
+            "person": [
+                {"name": "alice", "age": "1", "city": "paris", "job": "pilot"},
+                {"name": "Bob", "age": "2", "city": "rome", "job": "cook"},
+            ]
+        }
+        assert extraction["errors"] == []
+        people = extraction["validated_data"]
+        assert isinstance(people, list)
+        assert [person.job for person in people] == [
+            "pilot",
+            "cook",
+        ]
+    assert len(llm.calls) == 4
+
+
+def test_partitioned_chain_with_documents_and_chunker() -> None:
+    """Partitioned chains work with the document runners."""
+    chain = create_extraction_chain(
+        FunctionChatModel(respond=_respond, calls=[]),
+        SCHEMA,
+        encoder_or_encoder_class="json",
+        max_attributes_per_chain=2,
+        key_attributes=["name"],
+    )
+    documents = [Document(page_content="text")]
+    chunker = TokenChunker(context_window=2000, max_output_tokens=100)
+    for results in [
+        asyncio.run(extract_from_documents(chain, documents, chunker=chunker)),
+        extract_from_documents_sync(chain, documents),
+    ]:
+        result = results[0]
+        assert isinstance(result, dict)
+        assert len(result["data"]["person"]) == 2
+
+
+def _respond_truncated(text: str) -> str:
+    """Cut off the output of the first group of attributes."""
+    if CONTINUATION_INSTRUCTION in text:
+        return '<json>{"person": [{"name": "bob", "age": "2", "city": "rome"}]}</json>'
+    if "age:" in text:
+        return (
+            '<json>{"person": [{"name": "alice", "age": "1", "city": "paris"},'
+            ' {"name": "bob", "a'
+        )
+    return _respond(text)
+
+
+@pytest.mark.parametrize("stream", [False, True])
+def test_partitioned_chain_with_continuations_and_executor(stream: bool) -> None:
+    """The options of the document runners apply to every partition."""
+    llm = FunctionChatModel(respond=_respond_truncated, calls=[])
+    chain = create_extraction_chain(
+        llm,
+        SCHEMA,
+        encoder_or_encoder_class="json",
+        validator=PydanticValidator(Person, many=True),
+        max_attributes_per_chain=2,
+        key_attributes=["name"],
+    )
+    documents = [Document(page_content="text")]
+    with ThreadPoolExecutor() as executor:
+        async_results = asyncio.run(
+            extract_from_documents(
+                chain,
+                documents,
+                executor=executor,
+                stream=stream,
+                max_continuations=1,
+            )
+        )
+    sync_results = extract_from_documents_sync(chain, documents, max_continuations=1)
+    for result in [async_results[0], sync_results[0]]:
+        assert isinstance(result, dict)
+        assert result["data"] == {
+            "person": [
+                {"name": "alice", "age": "1", "city": "paris", "job": "pilot"},
+                {"name": "Bob", "age": "2", "city": "rome", "job": "cook"},
+            ]
+        }
+        assert result["errors"] == []
+        assert len(result["validated_data"]) == 2
+    assert len(llm.calls) == 6
+
+
+def test_partitioning_requires_key_attributes_for_many() -> None:
+    """Records cannot be aligned without key attributes."""
+    with pytest.raises(ValueError):
+        create_extraction_chain(
+            FunctionChatModel(respond=_respond, calls=[]),
+            SCHEMA,
+            max_attributes_per_chain=2,
+        )
+
+
+def test_small_schemas_are_not_partitioned() -> None:
+    """Schemas within the limit yield a regular chain."""
+    chain = create_extraction_chain(
+        FunctionChatModel(respond=_respond, calls=[]),
+        SCHEMA,
+        max_attributes_per_chain=10,
+    )
+    assert not isinstance(chain, PartitionedExtractionChain)
@@ -0,0 +1,148 @@
+"""Test the schema-derived prefilter."""
+import asyncio
+import re
+
+import pytest
+from langchain_core.documents import Document
+
+from kor import (
+    Number,
+    Object,
+    Option,
+    Selection,
+    Text,
+    create_extraction_chain,
+    extract_from_documents,
+    extract_from_documents_sync,
+)
+from kor.extraction.metrics import DOCUMENTS_SKIPPED, InMemoryMetricsSink
+from kor.extraction.prefilter import SchemaPrefilter, compile_keywords
+
+from ..utils import FunctionChatModel
+
+SCHEMA = Object(
+    id="cookie",
+    description="Information about a cookie.",
+    attributes=[
+        Text(id="cookieName", description="The name of the cookie"),
+        Number(id="unit_price", description="Price of the cookie"),
+        Selection(
+            id="flavor",
+            options=[
+                Option(id="chocolate", examples=["cocoa"]),
+                Option(id="vanilla"),
+            ],
+        ),
+    ],
+    examples=[("I bought a Snickerdoodle", {"cookieName": "Snickerdoodle"})],
+)
+
+
+def test_keywords_are_derived_from_the_schema() -> None:
+    """Keywords come from ids, descriptions, options and example outputs."""
+    keywords = SchemaPrefilter(SCHEMA).keywords
+    for keyword in [
+        "cookie",
+        "name",
+        "unit",
+        "price",
+        "flavor",
+        "chocolate",
+        "cocoa",
+        "vanilla",
+        "snickerdoodle",
+        "information",
+    ]:
+        assert keyword in keywords
+    # Stop words and the text of the examples are excluded.
+    assert "the" not in keywords
+    assert "bought" not in keywords
+
+    without_examples = SchemaPrefilter(SCHEMA, include_examples=False)
+    assert "snickerdoodle" not in without_examples.keywords
+
+
+@pytest.mark.parametrize(
+    "text,expected",
+    [
+        ("A box of Cookies", True),
+        ("prices went up", True),
+        ("I like COCOA", True),
+        ("The weather is nice today", False),
+        # Keywords match at word boundaries.
+        ("the keyname was lost", False),
+    ],
+)
+def test_matches(text: str, expected: bool) -> None:
+    """Documents with any keyword match."""
+    assert SchemaPrefilter(SCHEMA).matches(text) is expected
+
+
+def test_user_patterns_and_keywords() -> None:
+    """User patterns and keywords are matched along with the schema keywords."""
+    prefilter = SchemaPrefilter(
+        SCHEMA,
+        patterns=[r"\$\d+", re.compile(r"biscuits?")],
+        keywords=["shortbread"],
+    )
+    assert prefilter.search("It cost $10") == "$10"
+    assert prefilter.matches("Two Biscuits")
+    assert prefilter.matches("shortbread is tasty")
+    assert prefilter.search("The weather is nice today") is None
+
+
+def test_compile_keywords() -> None:
+    """The trie shaped pattern matches exactly the keywords (as prefixes)."""
+    keywords = ["car", "cart", "care", "cat", "dog", "a.b"]
+    pattern = compile_keywords(keywords)
+    for keyword in keywords:
+        assert pattern.fullmatch(keyword)
+        assert pattern.search(f"x {keyword.upper()} y")
+    for text in ["ca", "do", "axb", "scar"]:
+        assert pattern.search(text) is None
+
+
+def test_empty_prefilter_matches_everything() -> None:
+    """A prefilter without signal does not skip documents."""
+    prefilter = SchemaPrefilter(
+        Object(id="x", attributes=[Text(id="y")]), min_keyword_length=5
+    )
+    assert prefilter.keywords == []
+    assert prefilter.matches("anything")
+
+
+def test_extract_from_documents_skips_documents_without_signal() -> None:
+    """Skipped documents are not sent to the LLM."""
+    llm = FunctionChatModel(
+        respond=lambda text: '<json>{"cookie": {"cookieName": "oreo"}}</json>',
+        calls=[],
+    )
+    chain = create_extraction_chain(llm, SCHEMA, encoder_or_encoder_class="json")
+    documents = [
+        Document(page_content="An oreo cookie"),
+        Document(page_content="The weather is nice today"),
+    ]
+    sink = InMemoryMetricsSink()
+    prefilter = SchemaPrefilter(SCHEMA)
+
+    for results in [
+        asyncio.run(
+            extract_from_documents(
+                chain, documents, prefilter=prefilter, metrics_sink=sink
+            )
+        ),
+        extract_from_documents_sync(
+            chain, documents, prefilter=prefilter, metrics_sink=sink
+        ),
+    ]:
+        matched, skipped = results
+        assert isinstance(matched, dict) and isinstance(skipped, dict)
+        assert matched["skipped"] is False
+        assert matched["data"] == {"cookie": {"cookieName": "oreo"}}
+        assert skipped["skipped"] is True
+        assert skipped["data"] == {}
+        assert skipped["source_uid"] == "1"
+        assert skipped["usage"]["input_tokens"] == 0
+
+    assert len(llm.calls) == 2
+    assert sink.get_counter(DOCUMENTS_SKIPPED) == 2
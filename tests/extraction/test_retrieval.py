@@ -0,0 +1,138 @@
+"""Test retrieval of the chunks that are relevant to the schema."""
+import asyncio
+from typing import List
+
+import pytest
+from langchain_core.documents import Document
+
+from kor import Number, Object, Text, create_extraction_chain, extract_from_documents
+from kor.extraction.chunking import TokenChunker
+from kor.extraction.retrieval import ChunkRetriever, measure_recall
+from kor.extraction.typedefs import TextChunk
+
+from ..utils import FunctionChatModel
+
+SCHEMA = Object(
+    id="cookie",
+    description="Cookies and their prices",
+    attributes=[
+        Text(id="name", description="The name of the cookie"),
+        Number(id="price", description="The price of the cookie"),
+    ],
+    many=True,
+)
+
+
+def _make_chunks(texts: List[str]) -> List[TextChunk]:
+    """Make chunks from texts."""
+    chunks: List[TextChunk] = []
+    start = 0
+    for text in texts:
+        chunks.append({"text": text, "start": start, "end": start + len(text)})
+        start += len(text)
+    return chunks
+
+
+def test_score() -> None:
+    """Chunks that mention the schema score higher."""
+    chunks = _make_chunks(
+        [
+            "the weather is nice today and the sun is shining",
+            "a chocolate cookie and its price",
+            "the cookie price list: cookies and prices",
+            "we went to the beach",
+        ]
+    )
+    scores = ChunkRetriever(SCHEMA, top_k=2).score(chunks)
+    assert scores[0] == scores[3] == 0
+    assert scores[2] > scores[1] > 0
+
+
+def test_select_top_k_and_budget() -> None:
+    """Selection respects top_k and the token budget and drops irrelevant chunks."""
+    chunks = _make_chunks(
+        [
+            "nothing relevant here",
+            "cookie " * 10,
+            "cookie price " * 10,
+            "price",
+        ]
+    )
+    assert ChunkRetriever(SCHEMA, top_k=1).select(chunks) == [chunks[2]]
+    assert ChunkRetriever(SCHEMA, top_k=10).select(chunks) == [
+        chunks[2],
+        chunks[1],
+        chunks[3],
+    ]
+    # The top chunk is always selected, even if it exceeds the budget.
+    assert ChunkRetriever(SCHEMA, token_budget=1).select(chunks) == [chunks[2]]
+
+    with pytest.raises(ValueError):
+        ChunkRetriever(SCHEMA)
+
+
+def test_measure_recall() -> None:
+    """Recall is the fraction of the reference records that were found."""
+    usage = {
+        "input_tokens": 0,
+        "output_tokens": 0,
+        "cached_tokens": 0,
+        "estimated": False,
+        "cost": None,
+    }
+
+    def _result(uid: str, records: list) -> dict:
+        return {
+            "uid": uid,
+            "source_uid": uid,
+            "data": {"cookie": records} if records else {},
+            "raw": "",
+            "validated_data": {},
+            "errors": [],
+            "usage": usage,
+        }
+
+    reference = [
+        _result("0", [{"name": "a"}, {"name": "b"}]),
+        _result("1", [{"name": "c"}]),
+        ValueError(),
+    ]
+    candidate = [_result("0", [{"name": "b"}]), _result("1", [{"name": "c"}])]
+    assert measure_recall(reference, candidate) == pytest.approx(2 / 3)  # type: ignore
+    assert measure_recall([], []) == 1.0
+
+
+def test_extract_from_documents_with_retriever() -> None:
+    """Only the retrieved chunks are sent to the LLM."""
+    llm = FunctionChatModel(
+        respond=lambda text: "name|price\noreo|2\n" if "oreo" in text else "",
+        calls=[],
+    )
+    chain = create_extraction_chain(llm, SCHEMA)
+    text = "".join(
+        "An oreo cookie costs a price of 2 dollars.\n"
+        if idx == 150
+        else f"line {idx} about something else\n"
+        for idx in range(300)
+    )
+    chunker = TokenChunker(context_window=500, max_output_tokens=100)
+
+    results = asyncio.run(
+        extract_from_documents(
+            chain,
+            [Document(page_content=text)],
+            chunker=chunker,
+            retriever=ChunkRetriever(SCHEMA, top_k=1),
+        )
+    )
+    result = results[0]
+    assert isinstance(result, dict)
+    assert result["data"] == {"cookie": [{"name": "oreo", "price": "2"}]}
+    assert len(llm.calls) == 1
+    assert len(result["chunks"]) == 1
+    assert result["chunks_skipped"] > 0
+
+    full_results = asyncio.run(
+        extract_from_documents(chain, [Document(page_content=text)], chunker=chunker)
+    )
+    assert measure_recall(full_results, results) == 1.0
@@ -0,0 +1,141 @@
+import asyncio
+from typing import List, Optional
+
+from langchain_core.documents import Document
+from langchain_core.runnables import RunnableSequence
+
+from kor import Object, Text, create_extraction_chain, extract_from_documents
+from kor.encoders import JSONEncoder
+from kor.extraction.metrics import (
+    LATENCY_SAVED_SECONDS,
+    LLM_ERRORS,
+    STREAMS_CANCELLED,
+    InMemoryMetricsSink,
+)
+from kor.extraction.streaming import astream_payload, get_max_tokens
+
+from ..utils import StreamingChatModel
+
+SCHEMA = Object(
+    id="obj",
+    attributes=[Text(id="name")],
+    examples=[("Bob", {"name": "Bob"})],
+)
+
+CHUNKS = [
+    '{"obj": ',
+    '{"name": "Alice"}',
+    "}",
+    "\n\nThe text",
+    " mentions",
+    " Alice.",
+]
+
+
+def _make_model(max_tokens: Optional[int] = None) -> StreamingChatModel:
+    """Make a model that keeps talking after the payload."""
+    return StreamingChatModel(chunks=CHUNKS, max_tokens=max_tokens, streamed=[])
+
+
+def test_stream_is_closed_once_the_payload_is_complete() -> None:
+    """The rest of the output is not generated."""
+    model = _make_model(max_tokens=100)
+    sink = InMemoryMetricsSink()
+    chain = create_extraction_chain(
+        model, SCHEMA, encoder_or_encoder_class="json", use_tags=False
+    )
+    results = asyncio.run(
+        extract_from_documents(
+            chain, [Document(page_content="Alice")], stream=True, metrics_sink=sink
+        )
+    )
+    result = results[0]
+    assert not isinstance(result, BaseException)
+    assert result["data"] == {"obj": {"name": "Alice"}}
+    assert result["raw"] == '{"obj": {"name": "Alice"}}'
+    assert model.streamed == CHUNKS[:3]
+    assert result["latency_saved"] >= 0
+    assert sink.get_counter(STREAMS_CANCELLED) == 1
+    summary = sink.get_summary(LATENCY_SAVED_SECONDS)
+    assert summary is not None and summary.count == 1
+    # The usage of the closed stream is estimated.
+    assert result["usage"]["estimated"]
+    assert result["usage"]["input_tokens"] > 0
+    assert result["usage"]["output_tokens"] > 0
+
+
+def test_closed_stream_is_not_an_llm_error() -> None:
+    """Cancelling the stream is not reported as an LLM error."""
+    sink = InMemoryMetricsSink()
+    chain = create_extraction_chain(
+        _make_model(),
+        SCHEMA,
+        encoder_or_encoder_class="json",
+        use_tags=False,
+        metrics_sink=sink,
+    )
+    asyncio.run(
+        extract_from_documents(chain, [Document(page_content="Alice")], stream=True)
+    )
+    assert sink.get_counter(LLM_ERRORS) == 0
+
+
+def test_latency_saved_requires_a_token_budget() -> None:
+    """Without a token budget, the latency saved is unknown."""
+    chain = create_extraction_chain(
+        _make_model(), SCHEMA, encoder_or_encoder_class="json", use_tags=False
+    )
+    results = asyncio.run(
+        extract_from_documents(chain, [Document(page_content="Alice")], stream=True)
+    )
+    result = results[0]
+    assert not isinstance(result, BaseException)
+    assert result["data"] == {"obj": {"name": "Alice"}}
+    assert "latency_saved" not in result
+
+
+def test_incomplete_payload_is_streamed_to_the_end() -> None:
+    """The stream runs to the end when the payload is never closed."""
+    chunks = ['{"obj": ', '{"name": "Alice"}']
+    model = StreamingChatModel(chunks=chunks, max_tokens=100, streamed=[])
+    chain = create_extraction_chain(
+        model, SCHEMA, encoder_or_encoder_class="json", use_tags=False
+    )
+    assert isinstance(chain, RunnableSequence)
+    llm_chain = chain.steps[0] | chain.steps[1] | chain.steps[2]
+    streamed = asyncio.run(
+        astream_payload(llm_chain, JSONEncoder(use_tags=False), "Alice")
+    )
+    assert streamed == {
+        "output": "".join(chunks),
+        "cancelled": False,
+        "latency_saved": None,
+    }
+    assert model.streamed == chunks
+
+
+def test_get_max_tokens() -> None:
+    """The token budget is found on bindings and on the model."""
+    assert get_max_tokens(_make_model()) is None
+    assert get_max_tokens(_make_model(max_tokens=20)) == 20
+    chain = create_extraction_chain(
+        _make_model(), SCHEMA, encoder_or_encoder_class="json", max_output_records=2
+    )
+    max_tokens = get_max_tokens(chain)
+    assert isinstance(max_tokens, int) and max_tokens > 0
+
+
+def test_stream_with_tags_and_no_stop_sequences() -> None:
+    """The closing tag ends the payload when the model does not stop on it."""
+    chunks: List[str] = ['<json>{"obj": {"name": "Alice"}}', "</json>", " Done."]
+    model = StreamingChatModel(chunks=chunks, streamed=[])
+    chain = create_extraction_chain(
+        model, SCHEMA, encoder_or_encoder_class="json", use_stop_sequences=False
+    )
+    results = asyncio.run(
+        extract_from_documents(chain, [Document(page_content="Alice")], stream=True)
+    )
+    result = results[0]
+    assert not isinstance(result, BaseException)
+    assert result["data"] == {"obj": {"name": "Alice"}}
+    assert model.streamed == chunks[:2]
@@ -0,0 +1,77 @@
+"""Test the extraction of records from HTML tables without a model."""
+
+from pydantic import BaseModel
+
+from kor import Number, Object, Text
+from kor.encoders import CSVEncoder
+from kor.extraction.tables import (
+    extract_from_html_tables,
+    extract_from_table,
+    map_columns,
+)
+from kor.validators import PydanticValidator
+
+SCHEMA = Object(
+    id="person",
+    attributes=[Text(id="first_name"), Number(id="age")],
+    many=True,
+)
+
+HTML = """
+<table><tr><th>Country</th></tr><tr><td>France</td></tr></table>
+<table>
+<tr><th>First Name</th><th>City</th><th>AGE</th></tr>
+<tr><td>Alice</td><td>Paris</td><td>30</td></tr>
+<tr><td>Bob</td><td>Rome</td><td>4</td></tr>
+</table>
+"""
+
+
+class Person(BaseModel):
+    first_name: str
+    age: int
+
+
+def test_map_columns() -> None:
+    """Attributes are matched to columns ignoring case and punctuation."""
+    assert map_columns(SCHEMA, ["Age ", "first-name", "city"]) == {
+        "first_name": 1,
+        "age": 0,
+    }
+    assert map_columns(SCHEMA, ["first name"]) is None
+    nested = Object(id="obj", attributes=[Text(id="tags", many=True)])
+    assert map_columns(nested, ["tags"]) is None
+
+
+def test_extract_from_html_tables() -> None:
+    """Records are read from the tables that map onto the schema."""
+    extraction = extract_from_html_tables(
+        SCHEMA, HTML, validator=PydanticValidator(Person, many=True)
+    )
+    assert extraction is not None
+    assert extraction["data"] == {
+        "person": [
+            {"first_name": "Alice", "age": "30"},
+            {"first_name": "Bob", "age": "4"},
+        ]
+    }
+    assert extraction["errors"] == []
+    validated = extraction["validated_data"]
+    assert isinstance(validated, list)
+    assert [person.age for person in validated] == [30, 4]
+
+    # The raw output can be decoded by the CSV encoder.
+    decoded = CSVEncoder(SCHEMA).decode(extraction["raw"])
+    assert [record["First Name"] for record in decoded["person"]] == ["Alice", "Bob"]
+
+    assert extract_from_html_tables(SCHEMA, "<p>No tables</p>") is None
+
+
+def test_extract_from_table_for_a_single_record() -> None:
+    """Schemas for a single record need tables with a single row."""
+    node = Object(id="person", attributes=[Text(id="first_name")])
+    rows = [["first_name"], ["Alice"]]
+    extraction = extract_from_table(node, rows)
+    assert extraction is not None
+    assert extraction["data"] == {"person": {"first_name": "Alice"}}
+    assert extract_from_table(node, rows + [["Bob"]]) is None
@@ -0,0 +1,137 @@
+"""Test extraction through tool calling."""
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from langchain_core.documents import Document
+from langchain_core.language_models.fake import FakeListLLM
+from langchain_core.messages import AIMessage, ToolMessage
+from langchain_core.runnables import RunnableSequence
+from pydantic import BaseModel
+
+from kor import Object, Text, from_pydantic
+from kor.exceptions import ParseError
+from kor.extraction import create_extraction_chain, extract_from_documents
+from kor.extraction.tools import ToolCallParser, ToolCallPromptTemplate
+from tests.utils import ToolCallingChatModel, ToyChatModel
+
+
+class Person(BaseModel):
+    name: str
+    age: int
+
+
+SCHEMA, VALIDATOR = from_pydantic(
+    Person,
+    many=True,
+    examples=[("Alice is 30", [{"name": "Alice", "age": 30}])],
+)
+
+
+def test_tool_calling_chain() -> None:
+    """The tool call arguments are validated without parsing."""
+    model = ToolCallingChatModel(
+        tool_args={"person": [{"name": "Bob", "age": "41"}]}, calls=[], bound=[]
+    )
+    chain = create_extraction_chain(
+        model, SCHEMA, validator=VALIDATOR, use_tool_calling=True
+    )
+    assert isinstance(chain, RunnableSequence)
+    assert isinstance(chain.first, ToolCallPromptTemplate)
+    assert isinstance(chain.last, ToolCallParser)
+
+    extraction = chain.invoke("Bob is 41")
+    assert extraction["errors"] == []
+    assert extraction["validated_data"] == [Person(name="Bob", age=41)]
+    assert extraction["data"] == {"person": [{"name": "Bob", "age": "41"}]}
+
+    (kwargs,) = model.bound
+    assert kwargs["tool_choice"] == "person"
+    assert kwargs["tools"][0]["function"]["name"] == "person"
+
+    # The examples are rendered as tool calls.
+    messages = model.calls[0]
+    assert "Call the `person` tool" in str(messages[0].content)
+    example_call = messages[2]
+    assert isinstance(example_call, AIMessage)
+    assert example_call.tool_calls[0]["args"] == {
+        "person": [{"name": "Alice", "age": 30}]
+    }
+    assert isinstance(messages[3], ToolMessage)
+    assert messages[-1].content == "Bob is 41"
+    # The string form of the prompt uses JSON examples.
+    prompt = chain.first.format_prompt(text="x").to_string()
+    assert 'Output: {"person": [{"name": "Alice", "age": 30}]}' in prompt
+
+
+def test_tool_calling_without_tool_call() -> None:
+    """Text answers are decoded as JSON, otherwise a parse error is reported."""
+    model = ToolCallingChatModel(content="", calls=[], bound=[])
+    chain = create_extraction_chain(model, SCHEMA, use_tool_calling=True)
+    extraction = chain.invoke("nothing")
+    assert extraction["data"] == {}
+    assert isinstance(extraction["errors"][0], ParseError)
+
+    model = ToolCallingChatModel(
+        content='{"person": [{"name": "Eve"}]}', calls=[], bound=[]
+    )
+    chain = create_extraction_chain(model, SCHEMA, use_tool_calling=True)
+    assert chain.invoke("Eve")["data"] == {"person": [{"name": "Eve"}]}
+
+
+def test_tool_calling_with_aliases() -> None:
+    """The tool uses the aliases and the ids are restored."""
+    schema = Object(id="obj", attributes=[Text(id="customer_name")])
+    model = ToolCallingChatModel(tool_args={"obj": {"a1": "Bob"}}, calls=[], bound=[])
+    chain = create_extraction_chain(
+        model, schema, use_tool_calling=True, use_aliases=True
+    )
+    assert chain.invoke("Bob")["data"] == {"obj": {"customer_name": "Bob"}}
+    parameters = model.bound[0]["tools"][0]["function"]["parameters"]
+    assert list(parameters["properties"]["obj"]["properties"]) == ["a1"]
+
+
+def test_tool_calling_with_executor() -> None:
+    """Tool call messages are parsed outside of the chain with an executor."""
+    model = ToolCallingChatModel(
+        tool_args={"person": [{"name": "Bob", "age": 41}]}, calls=[], bound=[]
+    )
+    chain = create_extraction_chain(
+        model, SCHEMA, validator=VALIDATOR, use_tool_calling=True
+    )
+    with ThreadPoolExecutor() as executor:
+        results = asyncio.run(
+            extract_from_documents(
+                chain, [Document(page_content="Bob is 41")], executor=executor
+            )
+        )
+    result = results[0]
+    assert not isinstance(result, Exception)
+    assert result["validated_data"] == [Person(name="Bob", age=41)]
+
+
+def test_tool_calling_requires_chat_models() -> None:
+    """Plain language models cannot call tools."""
+    with pytest.raises(ValueError):
+        create_extraction_chain(
+            FakeListLLM(responses=[""]), SCHEMA, use_tool_calling=True
+        )
+    # Chat models that do not support tools raise when binding.
+    with pytest.raises(NotImplementedError):
+        create_extraction_chain(
+            ToyChatModel(response=""), SCHEMA, use_tool_calling=True
+        )
+
+
+def test_tool_calling_binds_max_tokens() -> None:
+    """The output budget is bound along with the tool."""
+    model = ToolCallingChatModel(
+        tool_args={"person": [{"name": "Bob", "age": 41}]}, calls=[], bound=[]
+    )
+    chain = create_extraction_chain(
+        model, SCHEMA, use_tool_calling=True, max_output_records=3
+    )
+    chain.invoke("Bob is 41")
+    (kwargs,) = model.bound
+    assert kwargs["tool_choice"] == "person"
+    assert isinstance(kwargs["max_tokens"], int) and kwargs["max_tokens"] > 0
@@ -0,0 +1,123 @@
+"""Test token and cost accounting."""
+import asyncio
+
+import pytest
+from langchain_core.documents import Document
+
+from kor import Object, Text, create_extraction_chain, extract_from_documents
+from kor.extraction.typedefs import TokenUsage
+from kor.extraction.usage import ModelPricing, aggregate_usage
+from kor.tokens import estimate_num_tokens
+
+from ..utils import ToyChatModel
+
+SCHEMA = Object(
+    id="obj",
+    description="",
+    attributes=[Text(id="text_node", description="Text Field")],
+)
+
+RESPONSE = '<json>{"obj": {"text_node": "hello"}}</json>'
+
+
+def test_model_pricing() -> None:
+    """Test computing the cost of token usage."""
+    usage: TokenUsage = {
+        "input_tokens": 1_000_000,
+        "output_tokens": 500_000,
+        "cached_tokens": 200_000,
+        "estimated": False,
+        "cost": None,
+    }
+    assert ModelPricing(input=1, output=4).get_cost(usage) == pytest.approx(3.0)
+    assert ModelPricing(input=1, output=4, cached_input=0.5).get_cost(
+        usage
+    ) == pytest.approx(2.9)
+
+
+def test_usage_is_captured_from_usage_metadata() -> None:
+    """Test that provider usage is attached to every document extraction."""
+    chain = create_extraction_chain(
+        ToyChatModel(
+            response=RESPONSE,
+            usage_metadata={
+                "input_tokens": 100,
+                "output_tokens": 10,
+                "total_tokens": 110,
+                "input_token_details": {"cache_read": 40},
+            },
+        ),
+        SCHEMA,
+        encoder_or_encoder_class="json",
+    )
+    documents = [Document(page_content="a"), Document(page_content="b")]
+    results = asyncio.run(
+        extract_from_documents(
+            chain,
+            documents,
+            pricing=ModelPricing(input=1, output=2, cached_input=0.5),
+        )
+    )
+    for result in results:
+        assert isinstance(result, dict)
+        assert result["usage"] == {
+            "input_tokens": 100,
+            "output_tokens": 10,
+            "cached_tokens": 40,
+            "estimated": False,
+            "cost": pytest.approx(100e-6),
+        }
+
+    assert aggregate_usage(results) == {
+        "input_tokens": 200,
+        "output_tokens": 20,
+        "cached_tokens": 80,
+        "estimated": False,
+        "cost": pytest.approx(200e-6),
+    }
+
+
+def test_usage_is_estimated_when_missing() -> None:
+    """Test the fallback estimate when the provider does not report usage."""
+    chain = create_extraction_chain(
+        ToyChatModel(response=RESPONSE),
+        SCHEMA,
+        encoder_or_encoder_class="json",
+    )
+    documents = [Document(page_content="a" * 400)]
+    results = asyncio.run(extract_from_documents(chain, documents))
+    result = results[0]
+    assert isinstance(result, dict)
+    usage = result["usage"]
+    assert usage["estimated"] is True
+    # The prompt contains the document.
+    assert usage["input_tokens"] > 100
+    assert usage["output_tokens"] == estimate_num_tokens(RESPONSE)
+    assert usage["cost"] is None
+
+
+def test_aggregate_usage_ignores_exceptions_and_unknown_cost() -> None:
+    """Test aggregation with exceptions and missing cost."""
+    usage: TokenUsage = {
+        "input_tokens": 1,
+        "output_tokens": 2,
+        "cached_tokens": 0,
+        "estimated": True,
+        "cost": None,
+    }
+    result = {
+        "uid": "0",
+        "source_uid": "0",
+        "data": {},
+        "raw": "",
+        "validated_data": {},
+        "errors": [],
+        "usage": usage,
+    }
+    assert aggregate_usage([result, ValueError()]) == {  # type: ignore[list-item]
+        "input_tokens": 1,
+        "output_tokens": 2,
+        "cached_tokens": 0,
+        "estimated": True,
+        "cost": None,
+    }
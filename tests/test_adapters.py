@@ -1,5 +1,5 @@
 import enum
-from typing import List, Union, get_type_hints
+from typing import Any, List, Union, get_type_hints
 
 import pydantic
 import pytest
@@ -8,6 +8,7 @@ from pydantic.fields import Field
 from kor.adapters import (
     _is_many,
     _translate_pydantic_to_kor,
+    clear_from_pydantic_cache,
     from_pydantic,
 )
 from kor.nodes import Bool, Number, Object, Option, Optional, Selection, Text
@@ -195,3 +196,55 @@ def test_from_pydantic() -> None:
         id="toy",
         attributes=[Text(id="a"), Number(id="b")],
     )
+
+
+def test_from_pydantic_is_cached(monkeypatch: pytest.MonkeyPatch) -> None:
+    """Repeated translations return the same schema and validator."""
+    calls = []
+
+    def _translate(*args: Any, **kwargs: Any) -> Object:
+        calls.append(args)
+        return _translate_pydantic_to_kor(*args, **kwargs)
+
+    monkeypatch.setattr("kor.adapters._translate_pydantic_to_kor", _translate)
+
+    class Toy(pydantic.BaseModel):
+        a: str
+
+    examples = [("hello", {"a": "hello"})]
+    node, validator = from_pydantic(Toy, examples=examples, many=True)
+    assert from_pydantic(Toy, examples=list(examples), many=True) == (
+        node,
+        validator,
+    )
+    cached_node, cached_validator = from_pydantic(Toy, examples=examples, many=True)
+    assert cached_node is node
+    assert cached_validator is validator
+    assert len(calls) == 1
+
+    assert from_pydantic(Toy, many=True)[0] is not node
+    assert from_pydantic(Toy, examples=examples)[0] is not node
+    assert len(calls) == 3
+
+    clear_from_pydantic_cache()
+    assert from_pydantic(Toy, examples=examples, many=True)[0] is not node
+    assert len(calls) == 4
+
+
+def test_convert_nested_lists_and_optionals() -> None:
+    """Nested lists and optionals of models are unwrapped."""
+
+    class Child(pydantic.BaseModel):
+        a: str
+
+    class Parent(pydantic.BaseModel):
+        children: Optional[List[Child]] = None
+        tags: List[Optional[str]] = []
+        maybe_child: Optional[Child] = None
+
+    node = _translate_pydantic_to_kor(Parent)
+    assert [(attr.id, type(attr), attr.many) for attr in node.attributes] == [
+        ("children", Object, True),
+        ("tags", Text, True),
+        ("maybe_child", Object, False),
+    ]
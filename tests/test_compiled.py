@@ -0,0 +1,179 @@
+"""Test compiled schemas."""
+import pickle
+from typing import Any, Tuple
+
+import pytest
+
+from kor import JSONEncoder, Number, Object, Option, Selection, Text
+from kor.compiled import compile_schema, get_fingerprint
+from kor.examples import generate_examples
+from kor.prompts import create_langchain_prompt
+from kor.type_descriptors import TypeDescriptor, TypeScriptDescriptor
+
+
+def _make_schema(description: str = "A person") -> Object:
+    """Make a nested schema."""
+    return Object(
+        id="person",
+        description=description,
+        many=True,
+        attributes=[
+            Text(id="name", examples=[("Alice", "Alice")]),
+            Object(
+                id="address",
+                attributes=[Text(id="city"), Number(id="zip", many=True)],
+                examples=[("in Paris", {"city": "Paris"})],
+            ),
+            Selection(
+                id="pet",
+                options=[Option(id="cat"), Option(id="dog", examples=["a dog"])],
+            ),
+        ],
+    )
+
+
+def test_compile_schema() -> None:
+    """Indexes, field order and options are precomputed."""
+    compiled = compile_schema(_make_schema())
+    assert compiled.root.attribute_ids == ("name", "address", "pet")
+    assert compiled.root.many
+    zip_code = compiled.get_node(["person", "address", "zip"])
+    assert zip_code is not None
+    assert zip_code.kind == "Number" and zip_code.many
+    pet = compiled.root.get_attribute("pet")
+    assert pet is not None and pet.option_ids == frozenset(["cat", "dog"])
+    assert compiled.get_node(["person", "missing"]) is None
+    assert len(compiled.index) == 6
+    assert generate_examples(compiled) == generate_examples(_make_schema())
+
+
+def test_compiled_schema_is_immutable() -> None:
+    """Attributes cannot be changed and the schema is a snapshot."""
+    schema = _make_schema()
+    compiled = compile_schema(schema)
+    with pytest.raises(AttributeError):
+        compiled.fingerprint = "x"  # type: ignore[misc]
+    with pytest.raises(AttributeError):
+        compiled.root.many = False  # type: ignore[misc]
+    with pytest.raises(AttributeError):
+        compiled.root.extra = 1  # type: ignore[attr-defined]
+    schema.description = "changed"
+    assert compiled.root.description == "A person"
+
+
+def test_fingerprint() -> None:
+    """The fingerprint is stable and depends on the content only."""
+    fingerprint = get_fingerprint(_make_schema())
+    assert fingerprint == get_fingerprint(_make_schema())
+    assert fingerprint != get_fingerprint(_make_schema("Another person"))
+    assert compile_schema(_make_schema()) == compile_schema(_make_schema())
+    assert len({compile_schema(_make_schema())}) == 1
+
+    restored = pickle.loads(pickle.dumps(compile_schema(_make_schema())))
+    assert restored.fingerprint == fingerprint
+    assert restored.root.attribute_ids == ("name", "address", "pet")
+
+
+class CountingDescriptor(TypeScriptDescriptor):
+    """Count the number of descriptions."""
+
+    def __init__(self) -> None:
+        """Initialize the counter."""
+        self.count = 0
+
+    def describe(self, node: Object) -> str:
+        """Describe the node and count."""
+        self.count += 1
+        return super().describe(node)
+
+
+@pytest.mark.parametrize("fmt", ["string", "messages"])
+def test_prompt_parts_are_generated_once(fmt: str) -> None:
+    """The schema is described once per prompt template."""
+    descriptor = CountingDescriptor()
+    prompt = create_langchain_prompt(_make_schema(), JSONEncoder(), descriptor)
+    formatted: Tuple[Any, ...] = tuple(
+        getattr(prompt.format_prompt(text), f"to_{fmt}")()
+        for text in ["first", "second"]
+    )
+    assert descriptor.count == 1
+    assert prompt.compiled is not None
+    assert "first" in str(formatted[0]) and "second" in str(formatted[1])
+    assert isinstance(descriptor, TypeDescriptor)
+
+
+def test_aliases() -> None:
+    """Long ids are replaced by aliases in the prompt node and restored after."""
+    schema = Object(
+        id="order",
+        attributes=[
+            Text(id="customer_name", description="The customer"),
+            Number(id="id"),
+            Selection(
+                id="payment_method",
+                options=[Option(id="credit_card"), Option(id="a1")],
+            ),
+        ],
+        examples=[
+            ("Bob, by card", {"customer_name": "Bob", "payment_method": "credit_card"})
+        ],
+    )
+    compiled = compile_schema(schema, use_aliases=True)
+    aliased = compiled.prompt_node
+    # `id` is not longer than an alias and `a1` is taken by an option.
+    assert [attribute.id for attribute in aliased.attributes] == ["a2", "id", "a3"]
+    assert aliased.attributes[0].description == "customer_name: The customer"
+    selection = aliased.attributes[2]
+    assert isinstance(selection, Selection)
+    # Options keep their ids, the model picks them by meaning.
+    assert [option.id for option in selection.options] == ["credit_card", "a1"]
+    assert compiled.examples == (
+        ("Bob, by card", {"order": {"a2": "Bob", "a3": "credit_card"}}),
+    )
+
+    data = {"customer_name": "Bob", "id": 1, "payment_method": "credit_card"}
+    assert compiled.to_aliases(data) == {"a2": "Bob", "id": 1, "a3": "credit_card"}
+    assert compiled.from_aliases(compiled.to_aliases(data)) == data
+    assert compiled.from_aliases([{"a3": "a1", "other": "x"}]) == [
+        {"payment_method": "a1", "other": "x"}
+    ]
+    assert compiled != compile_schema(schema)
+    assert compile_schema(schema).from_aliases({"a2": "Bob"}) == {"a2": "Bob"}
+    # The original schema is not changed.
+    assert schema.attributes[0].id == "customer_name"
+
+    restored = pickle.loads(pickle.dumps(compiled))
+    assert restored == compiled
+    assert restored.from_aliases({"a2": "Bob"}) == {"customer_name": "Bob"}
+
+
+def test_aliases_of_nested_objects() -> None:
+    """Aliases are assigned to the attributes of nested objects."""
+    compiled = compile_schema(_make_schema(), use_aliases=True)
+    address = compiled.get_node(["person", "address"])
+    assert address is not None and address.alias == "a2"
+    assert [attribute.alias for attribute in address.attributes] == ["a3", "a4"]
+    data = [{"name": "Alice", "address": {"city": "Paris", "zip": [1]}}]
+    aliased = compiled.to_aliases(data)
+    assert aliased == [{"a1": "Alice", "a2": {"a3": "Paris", "a4": [1]}}]
+    assert compiled.from_aliases(aliased) == data
+
+
+def test_aliased_selection_renders_option_ids() -> None:
+    """The default descriptor shows the real option ids of aliased selections."""
+    schema = Object(
+        id="person",
+        attributes=[
+            Selection(
+                id="favorite_color",
+                options=[Option(id="dark_red"), Option(id="light_blue")],
+            )
+        ],
+    )
+    compiled = compile_schema(schema, use_aliases=True)
+    prompt = create_langchain_prompt(
+        schema, JSONEncoder(), TypeScriptDescriptor(), compiled=compiled
+    )
+    text = prompt.format_prompt(text="").to_string()
+    assert 'a1: "dark_red" | "light_blue" // favorite_color' in text
+    assert compiled.from_aliases({"a1": "dark_red"}) == {"favorite_color": "dark_red"}
@@ -2,8 +2,16 @@ from typing import Any
 
 import pytest
 
-from kor.encoders import Encoder, JSONEncoder, XMLEncoder, encode_examples
+from kor.encoders import (
+    CSVEncoder,
+    Encoder,
+    JSONEncoder,
+    XMLEncoder,
+    encode_examples,
+    estimate_max_output_tokens,
+)
 from kor.nodes import AbstractSchemaNode, Number, Object, Option, Selection, Text
+from kor.tokens import estimate_num_tokens
 
 
 def _get_schema() -> AbstractSchemaNode:
@@ -89,3 +97,76 @@ def test_encode_examples() -> None:
         ('"""\ninput\n"""', "output"),
         ('"""\ninput2\n"""', "output2"),
     ]
+
+
+PEOPLE = Object(
+    id="person",
+    many=True,
+    attributes=[Text(id="name"), Number(id="age")],
+    examples=[
+        ("Alice 30, Bob 4", [{"name": "Alice", "age": 30}, {"name": "Bob", "age": 4}])
+    ],
+)
+
+
+def test_stop_sequences() -> None:
+    """Encoders using tags stop at the closing tag."""
+    assert JSONEncoder().get_stop_sequences() == ["</json>"]
+    assert JSONEncoder(use_tags=False).get_stop_sequences() == []
+    assert CSVEncoder(PEOPLE, use_tags=True).get_stop_sequences() == ["</csv>"]
+    assert CSVEncoder(PEOPLE).get_stop_sequences() == []
+    assert XMLEncoder().get_stop_sequences() == []
+
+
+def test_get_payload_end() -> None:
+    """The end of the payload is found once it is closed."""
+    json_encoder = JSONEncoder(use_tags=False)
+    assert json_encoder.get_payload_end('{"person": [{"name": "Bob"}') is None
+    assert json_encoder.get_payload_end('{"person": "}"') is None
+    text = ' {"person": []}\n'
+    assert json_encoder.get_payload_end(text) == 15
+    assert JSONEncoder().get_payload_end('<json>{"a": 1}') is None
+    assert JSONEncoder().get_payload_end('<json>{"a": 1}</json> ok') == 21
+    assert CSVEncoder(PEOPLE, use_tags=True).get_payload_end("<csv>a\n</csv>") == 13
+    assert CSVEncoder(PEOPLE).get_payload_end("name\nBob\n") is None
+    assert XMLEncoder().get_payload_end("<person></person>") is None
+
+
+def test_decode_partial() -> None:
+    """The complete records of an output that was cut off are recovered."""
+    text = '{"person": [{"name": "Bob", "pets": ["]"]}, {"name": "Al'
+    expected = {"person": [{"name": "Bob", "pets": ["]"]}]}
+    assert JSONEncoder(use_tags=False).decode_partial(text) == expected
+    assert JSONEncoder().decode_partial("<json>" + text) == expected
+    assert JSONEncoder().decode_partial(text) is None
+    assert JSONEncoder(use_tags=False).decode_partial('{"person": {"na') is None
+
+    csv_encoder = CSVEncoder(PEOPLE)
+    assert csv_encoder.decode_partial("name|age\nBob|3\nAl") == {
+        "person": [{"name": "Bob", "age": "3"}]
+    }
+    assert csv_encoder.decode_partial("name|a") == {"person": []}
+    assert XMLEncoder().decode_partial("<person>") is None
+
+
+@pytest.mark.parametrize("encoder", [JSONEncoder(), CSVEncoder(PEOPLE)])
+def test_estimate_max_output_tokens(encoder: Encoder) -> None:
+    """The estimate grows with the number of records."""
+    overhead = estimate_num_tokens(encoder.encode({"person": []}))
+    one = estimate_max_output_tokens(PEOPLE, encoder, margin=1) - overhead
+    ten = estimate_max_output_tokens(PEOPLE, encoder, expected_records=10, margin=1)
+    # The largest record of the examples has a few tokens in both encodings.
+    assert 2 <= one <= 7
+    assert 10 * (one - 1) <= ten - overhead <= 10 * one
+    assert estimate_max_output_tokens(PEOPLE, encoder, expected_records=10) > ten
+
+    # Without examples, the size of a record is estimated from the schema.
+    attributes = PEOPLE.attributes
+    no_examples = Object(id="person", many=True, attributes=attributes)
+    assert estimate_max_output_tokens(no_examples, encoder) > overhead
+
+    # A single record is expected for schemas with many=False.
+    single = Object(id="person", attributes=attributes)
+    assert estimate_max_output_tokens(
+        single, encoder, expected_records=10
+    ) == estimate_max_output_tokens(single, encoder)
@@ -0,0 +1,148 @@
+"""Test the grammars of the outputs of the encoders."""
+import re
+from typing import List, Set
+
+import pytest
+from langchain_core.runnables import RunnableBinding
+
+from kor import (
+    Bool,
+    CSVEncoder,
+    JSONEncoder,
+    Number,
+    Object,
+    Option,
+    Selection,
+    Text,
+    XMLEncoder,
+)
+from kor.encoders import Encoder
+from kor.extraction import create_extraction_chain
+from kor.grammars import Grammar, to_grammar
+from kor.prompts import create_langchain_prompt
+from kor.type_descriptors import TypeScriptDescriptor
+from tests.utils import ToyChatModel
+
+SCHEMA = Object(
+    id="person",
+    many=True,
+    attributes=[
+        Text(id="name", examples=[("Alice", 'Al"ice|x')]),
+        Number(id="age", examples=[("30 years", 30)]),
+        Bool(id="adult"),
+        Selection(
+            id="pet", options=[Option(id="cat"), Option(id="dog", examples=["a dog"])]
+        ),
+    ],
+    examples=[
+        ("Bob 3", [{"name": "Bob", "age": 3.5, "adult": True}]),
+        ("Eve 4", [{"name": "Eve", "age": "4"}]),  # Numbers are often strings
+    ],
+)
+
+ENCODERS: List[Encoder] = [
+    JSONEncoder(),
+    JSONEncoder(use_tags=False),
+    JSONEncoder(ensure_ascii=True),
+    CSVEncoder(SCHEMA),
+    CSVEncoder(SCHEMA, use_tags=True),
+]
+
+
+def _get_undefined_rules(gbnf: str) -> Set[str]:
+    """Get the rules that are referenced but not defined."""
+    defined = set()
+    referenced = set()
+    for line in gbnf.strip().splitlines():
+        name, body = line.split(" ::= ", 1)
+        defined.add(name)
+        # Remove literals and character classes before looking for rule names.
+        body = re.sub(r'"(?:[^"\\]|\\.)*"|\[(?:[^\]\\]|\\.)*\]', " ", body)
+        referenced.update(re.findall(r"[a-z][a-z0-9-]*", body))
+    return referenced - defined
+
+
+@pytest.mark.parametrize("encoder", ENCODERS)
+def test_encoded_examples_match_the_grammar(encoder: Encoder) -> None:
+    """The outputs of the examples are accepted."""
+    grammar = to_grammar(SCHEMA, encoder)
+    assert grammar.gbnf.startswith("root ::= ")
+    assert _get_undefined_rules(grammar.gbnf) == set()
+    prompt = create_langchain_prompt(SCHEMA, encoder, TypeScriptDescriptor())
+    encoded_examples = prompt.generate_encoded_examples(SCHEMA)
+    assert len(encoded_examples) == 5
+    for _, output in encoded_examples:
+        assert grammar.matches(output), output
+
+
+@pytest.mark.parametrize(
+    "output",
+    [
+        '<json>{"person": [{"nickname": "Bob"}]}</json>',  # Unknown attribute
+        '<json>{"person": [{"age": "three"}]}</json>',  # Not a number
+        '<json>{"person": [{"age": "3}]}</json>',  # Unclosed quote
+        '<json>{"person": [{"pet": "bird"}]}</json>',  # Not an option
+        '<json>{"person": {"name": "Bob"}}</json>',  # Not a list
+        '{"person": [{"name": "Bob"}]}',  # No tags
+        '<json>{"person": []}</json> The person is Bob.',  # Explanations
+    ],
+)
+def test_invalid_json_does_not_match(output: str) -> None:
+    """Outputs that do not follow the schema are rejected."""
+    grammar = to_grammar(SCHEMA, JSONEncoder())
+    assert grammar.matches('<json>{"person": [{"name": "Bob", "pet": null}]}</json>')
+    assert not grammar.matches(output)
+
+
+@pytest.mark.parametrize(
+    "output",
+    [
+        "name|adult|age|pet\nBob|||",  # Wrong header
+        "name|age|adult|pet\nBob|three||",  # Not a number
+        "name|age|adult|pet\nBob||yes|",  # Not a boolean
+        "name|age|adult|pet\nBob|||bird",  # Not an option
+        "name|age|adult|pet\nBob||",  # Missing column
+        "Here is the table:\nname|age|adult|pet\nBob|||",  # Explanations
+    ],
+)
+def test_invalid_csv_does_not_match(output: str) -> None:
+    """Outputs that do not follow the schema are rejected."""
+    grammar = to_grammar(SCHEMA, CSVEncoder(SCHEMA))
+    assert grammar.matches("name|age|adult|pet\nBob|3|False|cat\n|||")
+    assert not grammar.matches(output)
+
+
+def test_unsupported_encoder() -> None:
+    """Only JSON and CSV are supported."""
+    with pytest.raises(NotImplementedError):
+        to_grammar(SCHEMA, XMLEncoder())
+
+
+def test_create_extraction_chain_with_grammar() -> None:
+    """The grammar is bound to the model."""
+    chain = create_extraction_chain(
+        ToyChatModel(response='<json>{"person": []}</json>'),
+        SCHEMA,
+        encoder_or_encoder_class="json",
+        grammar="llama.cpp",
+    )
+    model = chain.steps[1]  # type: ignore[attr-defined]
+    assert isinstance(model, RunnableBinding)
+    grammar = model.kwargs["extra_body"]["grammar"]
+    assert grammar == to_grammar(SCHEMA, JSONEncoder()).gbnf
+    assert chain.invoke("nobody")["data"] == {"person": []}
+
+    grammars: List[Grammar] = []
+    create_extraction_chain(
+        ToyChatModel(response=""),
+        SCHEMA,
+        grammar=lambda grammar: grammars.append(grammar) or {},  # type: ignore
+    )
+    assert grammars[0].matches("name|age|adult|pet\n")
+
+    with pytest.raises(ValueError):
+        create_extraction_chain(ToyChatModel(response=""), SCHEMA, grammar="unknown")
+    with pytest.raises(ValueError):
+        create_extraction_chain(
+            ToyChatModel(response=""), SCHEMA, grammar="vllm", use_tool_calling=True
+        )
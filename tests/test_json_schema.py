@@ -0,0 +1,62 @@
+"""Test the generation of JSON Schemas."""
+from kor import Bool, Number, Object, Option, Selection, Text
+from kor.json_schema import to_json_schema, to_tool
+
+SCHEMA = Object(
+    id="person",
+    description="A person",
+    many=True,
+    attributes=[
+        Text(id="name", description="The name"),
+        Number(id="ages", many=True),
+        Bool(id="adult"),
+        Selection(
+            id="pet",
+            description="The pet",
+            options=[Option(id="cat", description="A cat"), Option(id="dog")],
+        ),
+        Object(id="address", attributes=[Text(id="city")]),
+    ],
+)
+
+
+def test_to_json_schema() -> None:
+    """Nodes map to JSON Schema types, arrays for many=True."""
+    assert to_json_schema(SCHEMA) == {
+        "type": "array",
+        "description": "A person",
+        "items": {
+            "type": "object",
+            "properties": {
+                "name": {"type": "string", "description": "The name"},
+                "ages": {"type": "array", "items": {"type": "number"}},
+                "adult": {"type": "boolean"},
+                "pet": {
+                    "type": "string",
+                    "enum": ["cat", "dog"],
+                    "description": "The pet (cat: A cat)",
+                },
+                "address": {
+                    "type": "object",
+                    "properties": {"city": {"type": "string"}},
+                    "additionalProperties": False,
+                },
+            },
+            "additionalProperties": False,
+        },
+    }
+
+
+def test_to_tool() -> None:
+    """The arguments of the tool are the data under the id of the schema."""
+    tool = to_tool(SCHEMA)
+    assert tool["type"] == "function"
+    function = tool["function"]
+    assert function["name"] == "person"
+    assert function["description"] == "A person"
+    assert function["parameters"] == {
+        "type": "object",
+        "properties": {"person": to_json_schema(SCHEMA)},
+        "required": ["person"],
+    }
+    assert to_tool(Object(id="x", attributes=[Text(id="y")]))["function"]["description"]
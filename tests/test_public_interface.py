@@ -11,6 +11,7 @@ def test_kor__all__() -> None:
         "Bool",
         "BulletPointDescriptor",
         "CSVEncoder",
+        "CompactDescriptor",
         "DocumentExtraction",
         "Extraction",
         "JSONEncoder",
@@ -25,5 +26,7 @@ def test_kor__all__() -> None:
         "__version__",
         "create_extraction_chain",
         "extract_from_documents",
+        "extract_from_documents_iter",
+        "extract_from_documents_sync",
         "from_pydantic",
     ]
@@ -3,9 +3,18 @@ from typing import Any, Type
 
 import pytest
 
-from kor import Bool, Number, Object, Selection, Text
+from kor import Bool, Number, Object, Option, Selection, Text
 from kor._pydantic import PYDANTIC_MAJOR_VERSION
+from kor.compiled import SchemaLoader
 from kor.nodes import ExtractionSchemaNode
+from kor.serialization import (
+    schema_from_bytes,
+    schema_from_dict,
+    schema_from_json,
+    schema_to_bytes,
+    schema_to_dict,
+    schema_to_json,
+)
 
 
 @pytest.fixture(params=ExtractionSchemaNode.__subclasses__())
@@ -242,3 +251,90 @@ def test_extractionschemanode_without_type_cannot_be_deserialized() -> None:
 
     with pytest.raises(exception_class):
         Object.parse_raw(json)
+
+
+def _make_schema() -> Object:
+    """Make a schema with every type of node."""
+    return Object(
+        id="root",
+        description="root-object",
+        many=True,
+        attributes=[
+            Number(id="number", examples=[("1 apple", 1)]),
+            Text(id="text", many=True, examples=[("a, b", ["a", "b"])]),
+            Bool(id="bool"),
+            Selection(
+                id="selection",
+                options=[Option(id="a", examples=["first"]), Option(id="b")],
+                null_examples=["none"],
+            ),
+            Object(id="nested", attributes=[Text(id="text")]),
+        ],
+        examples=[("text", [{"number": 1, "text": ["x"]}])],
+    )
+
+
+def test_schema_round_trip() -> None:
+    """Schemas can be serialized as dicts, JSON and bytes and loaded back."""
+    schema = _make_schema()
+    data = schema_to_dict(schema)
+    assert data["$type"] == "Object"
+    assert [attribute["$type"] for attribute in data["attributes"]] == [
+        "Number",
+        "Text",
+        "Bool",
+        "Selection",
+        "Object",
+    ]
+    assert data["attributes"][3]["options"][0]["$type"] == "Option"
+
+    assert schema_to_dict(schema_from_dict(data)) == data
+    assert schema_to_dict(schema_from_json(schema_to_json(schema))) == data
+    binary = schema_to_bytes(schema)
+    assert schema_to_dict(schema_from_bytes(binary)) == data
+    assert len(binary) < len(schema_to_json(schema))
+
+
+def test_schema_from_json_without_discriminators() -> None:
+    """Objects, selections and options can omit the discriminator."""
+    schema = schema_from_json(
+        """
+        {
+            "id": "root",
+            "attributes": [
+                {"id": "nested", "attributes": [{"$type": "Text", "id": "text"}]},
+                {"id": "selection", "options": [{"id": "a"}]}
+            ]
+        }
+        """
+    )
+    assert isinstance(schema.attributes[0], Object)
+    assert isinstance(schema.attributes[0].attributes[0], Text)
+    assert isinstance(schema.attributes[1], Selection)
+    assert schema.attributes[1].options[0].id == "a"
+
+    with pytest.raises(ValueError):
+        schema_from_json('{"id": "root", "attributes": [{"id": "number"}]}')
+    with pytest.raises(TypeError):
+        schema_from_json('{"id": "root", "attributes": [{"$type": "X", "id": "x"}]}')
+    with pytest.raises(ValueError):
+        schema_from_bytes(b"not a schema")
+
+
+def test_schema_loader_caches_by_content() -> None:
+    """Loading the same payload again returns the cached compiled schema."""
+    loader = SchemaLoader(maxsize=2)
+    payload = schema_to_bytes(_make_schema())
+    compiled = loader.load(payload)
+    assert schema_to_dict(compiled.node) == schema_to_dict(_make_schema())
+    assert loader.load(payload) is compiled
+    assert (loader.hits, loader.misses) == (1, 1)
+
+    from_json = loader.load(schema_to_json(_make_schema()))
+    assert from_json is not compiled
+    assert from_json.fingerprint == compiled.fingerprint
+    assert loader.load(schema_to_dict(_make_schema())).fingerprint == (
+        compiled.fingerprint
+    )
+    assert len(loader) == 2
+    assert loader.load(payload) is not compiled  # Evicted
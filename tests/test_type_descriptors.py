@@ -2,7 +2,11 @@ import pytest
 
 from kor import Number, Object, Text
 from kor.nodes import Bool, Option, Selection
-from kor.type_descriptors import BulletPointDescriptor, TypeScriptDescriptor
+from kor.type_descriptors import (
+    BulletPointDescriptor,
+    CompactDescriptor,
+    TypeScriptDescriptor,
+)
 
 OPTION_1 = Option(id="blue", description="Option Description", examples=["blue"])
 OPTION_2 = Option(id="red", description="Red color", examples=["red"])
@@ -94,3 +98,38 @@ def test_bullet_point_descriptions(node: Object, description: str) -> None:
 def test_typescript_description(node: Object, description: str) -> None:
     """Verify typescript descriptions."""
     assert TypeScriptDescriptor().describe(node) == description
+
+
+def test_compact_description() -> None:
+    """Verify compact descriptions."""
+    assert CompactDescriptor().describe(OBJ) == (
+        "object:{number:num(Number Description);text:str(Text Description);"
+        "selection:blue(Option Description)(Selection Description);"
+        "selection2:(blue(Option Description)|red(Red color))[]"
+        "(Selection2 Description);bool:bool(Bool Description)}(Object Description)"
+    )
+
+
+def test_compact_description_deduplicates_objects() -> None:
+    """Repeated object definitions are described once."""
+    address = Object(id="address", attributes=[Text(id="city"), Number(id="zip")])
+    billing_address = address.replace(id="billing_address")
+    assert isinstance(billing_address, Object)
+    node = Object(
+        id="order",
+        many=True,
+        description="An   order",
+        attributes=[
+            billing_address,
+            Object(id="shipping_address", many=True, attributes=address.attributes),
+            Object(id="store", attributes=[Text(id="name")]),
+        ],
+    )
+    assert CompactDescriptor().describe(node) == (
+        "BillingAddress={city:str;zip:num}\n"
+        "order:{billing_address:BillingAddress;shipping_address:BillingAddress[];"
+        "store:{name:str}}[](An order)"
+    )
+    assert len(CompactDescriptor().describe(node)) < len(
+        TypeScriptDescriptor().describe(node)
+    )
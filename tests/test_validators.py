@@ -36,3 +36,23 @@ def test_pydantic_validator() -> None:
     assert clean_data is None
     assert len(exceptions) == 1
     assert isinstance(exceptions[0], ValidationError)
+
+
+def test_pydantic_validator_many() -> None:
+    """Valid records are kept when some records are invalid."""
+
+    class ToyModel(BaseModel):
+        name: str
+        age: int
+
+    validator = PydanticValidator(ToyModel, many=True)
+    records = [{"name": "a", "age": 1}, {"name": "b", "age": 2}]
+    assert validator.clean_data(records) == (
+        [ToyModel(name="a", age=1), ToyModel(name="b", age=2)],
+        [],
+    )
+
+    cleaned, exceptions = validator.clean_data(records + [{"name": "c"}])
+    assert cleaned == [ToyModel(name="a", age=1), ToyModel(name="b", age=2)]
+    assert len(exceptions) == 1
+    assert isinstance(exceptions[0], ValidationError)
@@ -1,17 +1,27 @@
-from typing import Any, List, Optional
+import asyncio
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional, Sequence
 
 from langchain_core.callbacks import (
     AsyncCallbackManagerForLLMRun,
     CallbackManagerForLLMRun,
 )
-from langchain_core.language_models import BaseChatModel
-from langchain_core.messages import AIMessage, BaseMessage
-from langchain_core.outputs import ChatGeneration, ChatResult
+from langchain_core.language_models import BaseChatModel, LanguageModelInput
+from langchain_core.messages import (
+    AIMessage,
+    AIMessageChunk,
+    BaseMessage,
+    get_buffer_string,
+)
+from langchain_core.messages.ai import UsageMetadata
+from langchain_core.messages.tool import ToolCall
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+from langchain_core.runnables import Runnable
 from pydantic import ConfigDict
 
 
 class ToyChatModel(BaseChatModel):
     response: str
+    usage_metadata: Optional[UsageMetadata] = None
 
     model_config = ConfigDict(
         extra="forbid",
@@ -26,7 +36,7 @@ class ToyChatModel(BaseChatModel):
         **kwargs: Any,
     ) -> ChatResult:
         """Top Level call"""
-        message = AIMessage(content=self.response)
+        message = AIMessage(content=self.response, usage_metadata=self.usage_metadata)
         generation = ChatGeneration(message=message)
         return ChatResult(generations=[generation])
 
@@ -38,7 +48,7 @@ class ToyChatModel(BaseChatModel):
         **kwargs: Any,
     ) -> ChatResult:
         """Async version of _generate."""
-        message = AIMessage(content=self.response)
+        message = AIMessage(content=self.response, usage_metadata=self.usage_metadata)
         generation = ChatGeneration(message=message)
         return ChatResult(generations=[generation])
 
@@ -46,3 +56,176 @@ class ToyChatModel(BaseChatModel):
     def _llm_type(self) -> str:
         """Return the type of llm this is."""
         return "toy_chat_model"
+
+
+def _no_delay(text: str) -> float:
+    """Respond immediately."""
+    return 0.0
+
+
+class FunctionChatModel(BaseChatModel):
+    """A chat model that computes its response from the prompt."""
+
+    respond: Callable[[str], str]
+    delay: Callable[[str], float] = _no_delay
+    calls: List[str] = []
+
+    model_config = ConfigDict(
+        extra="forbid",
+        arbitrary_types_allowed=True,
+    )
+
+    def _generate(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[CallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ) -> ChatResult:
+        """Top Level call"""
+        text = get_buffer_string(messages)
+        self.calls.append(text)
+        message = AIMessage(content=self.respond(text))
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+    async def _agenerate(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[AsyncCallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ) -> ChatResult:
+        """Async version of _generate."""
+        text = get_buffer_string(messages)
+        self.calls.append(text)
+        await asyncio.sleep(self.delay(text))
+        message = AIMessage(content=self.respond(text))
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+    @property
+    def _llm_type(self) -> str:
+        """Return the type of llm this is."""
+        return "function_chat_model"
+
+
+class ToolCallingChatModel(BaseChatModel):
+    """A chat model that calls the first bound tool with fixed arguments."""
+
+    tool_args: Optional[Dict[str, Any]] = None
+    """Arguments of the tool call, the model answers with `content` if None."""
+    content: str = ""
+    calls: List[List[BaseMessage]] = []
+    bound: List[Dict[str, Any]] = []
+
+    model_config = ConfigDict(
+        extra="forbid",
+        arbitrary_types_allowed=True,
+    )
+
+    def bind_tools(
+        self,
+        tools: Sequence[Any],
+        *,
+        tool_choice: Optional[str] = None,
+        **kwargs: Any,
+    ) -> Runnable[LanguageModelInput, BaseMessage]:
+        """Bind the tools as keyword arguments of the calls."""
+        return self.bind(tools=list(tools), tool_choice=tool_choice, **kwargs)
+
+    def _generate(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[CallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ) -> ChatResult:
+        """Call the tool chosen by the caller."""
+        self.calls.append(messages)
+        self.bound.append(kwargs)
+        tool_calls = []
+        if self.tool_args is not None:
+            tool_calls.append(
+                ToolCall(name=kwargs["tool_choice"], args=self.tool_args, id="call_0")
+            )
+        message = AIMessage(content=self.content, tool_calls=tool_calls)
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+    @property
+    def _llm_type(self) -> str:
+        """Return the type of llm this is."""
+        return "tool_calling_chat_model"
+
+
+class StreamingChatModel(BaseChatModel):
+    """A chat model that streams its response in fixed chunks."""
+
+    chunks: List[str]
+    delay: float = 0.0
+    max_tokens: Optional[int] = None
+    streamed: List[str] = []
+    """Chunks that were produced, to check when the stream was closed."""
+
+    model_config = ConfigDict(
+        extra="forbid",
+        arbitrary_types_allowed=True,
+    )
+
+    def _generate(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[CallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ) -> ChatResult:
+        """Top Level call"""
+        message = AIMessage(content="".join(self.chunks))
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+    async def _astream(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[AsyncCallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ) -> AsyncIterator[ChatGenerationChunk]:
+        """Stream the chunks of the response."""
+        for chunk in self.chunks:
+            await asyncio.sleep(self.delay)
+            self.streamed.append(chunk)
+            if run_manager is not None:
+                await run_manager.on_llm_new_token(chunk)
+            yield ChatGenerationChunk(message=AIMessageChunk(content=chunk))
+
+    @property
+    def _llm_type(self) -> str:
+        """Return the type of llm this is."""
+        return "streaming_chat_model"
+
+
+class ScriptedChatModel(BaseChatModel):
+    """A chat model that returns the given messages in order."""
+
+    responses: List[AIMessage]
+    calls: List[List[BaseMessage]] = []
+
+    model_config = ConfigDict(
+        extra="forbid",
+        arbitrary_types_allowed=True,
+    )
+
+    def _generate(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[CallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ) -> ChatResult:
+        """Return the next message."""
+        message = self.responses[len(self.calls)]
+        self.calls.append(messages)
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+    @property
+    def _llm_type(self) -> str:
+        """Return the type of llm this is."""
+        return "scripted_chat_model"